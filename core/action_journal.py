@@ -0,0 +1,341 @@
+# core/action_journal.py
+"""
+Persistent undo/redo journal for file actions.
+
+Creating and deleting files and folders and moving between folders are
+recorded here, whatever the input source. Deleted items are moved into a
+trash folder instead of being removed, so undoing a delete (or redoing
+one) is a rename, not a restore. Undoing a create moves the item to the
+trash as well, which is what makes redo possible. The trash is on the
+item's own volume: the one next to the journal if that is the same
+volume, otherwise VOLUME_TRASH at the volume's root, so nothing is
+copied between drives.
+
+Entries belong to an owner (the local user, or one remote session) with
+its own undo and redo order. The journal keeps at most MAX_ENTRIES and
+MAX_TRASH_BYTES of trashed items; the oldest entries are dropped beyond
+that, and whatever they had in the trash is deleted for good.
+
+The journal is a small JSON file that several processes (the app, the
+daemon, a batch run) may share. Every change holds a lock file, re-reads
+the journal and writes it back before letting go, so no process
+overwrites another's entries or purges trash they still reference.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Set, Tuple
+
+from core.file_lock import locked_file
+
+DEFAULT_DIR = Path.home() / ".orbitos"
+MAX_ENTRIES = 100
+MAX_TRASH_BYTES = 1024 * 1024 * 1024
+VOLUME_TRASH = ".orbitos-trash"
+
+CREATE = ("create_file", "create_folder")
+DELETE = ("delete_file", "delete_folder")
+NAVIGATE = "navigate"
+
+
+@dataclass
+class JournalEntry:
+    id: str
+    kind: str                       # create_file, delete_folder, navigate, ...
+    owner: str
+    path: str                       # the item, or the folder moved into
+    previous: Optional[str] = None  # navigate: the folder moved out of
+    trash: Optional[str] = None     # where the item is while it is trashed
+    size: int = 0                   # bytes in the trash
+    done: bool = True               # False once undone (waiting for redo)
+    time: float = 0.0
+
+    @property
+    def noun(self) -> str:
+        return "folder" if self.kind.endswith("folder") else "file"
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+
+def _size(path: str) -> int:
+    if not os.path.isdir(path) or os.path.islink(path):
+        return os.lstat(path).st_size
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.lstat(os.path.join(root, f)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _volume_root(path: str) -> str:
+    path = os.path.abspath(path)
+    while not os.path.ismount(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+class ActionJournal:
+    def __init__(
+        self,
+        base_dir: Path | str = DEFAULT_DIR,
+        max_entries: int = MAX_ENTRIES,
+        max_trash_bytes: int = MAX_TRASH_BYTES,
+    ):
+        base_dir = Path(base_dir)
+        self.file = base_dir / "journal.json"
+        self.lock_file = base_dir / "journal.lock"
+        self.trash_dir = base_dir / "trash"
+        self.max_entries = max_entries
+        self.max_trash_bytes = max_trash_bytes
+        self._entries: List[JournalEntry] = []
+        # every trash folder used so far, for the orphan sweep
+        self._trash_dirs: Set[str] = set()
+        # skills of different sessions run on different threads
+        self._lock = threading.Lock()
+        self.load()
+
+    # ---------- persistence ----------
+    @contextmanager
+    def _locked(self):
+        """Hold the journal against other threads and processes, freshly read."""
+        with self._lock, locked_file(self.lock_file):
+            self._read()
+            yield
+
+    def _read(self):
+        self._entries = []
+        self._trash_dirs = {str(self.trash_dir)}
+        if not self.file.exists():
+            return
+        try:
+            data = json.loads(self.file.read_text(encoding="utf-8"))
+            self._entries = [JournalEntry(**e) for e in data.get("entries", [])]
+            self._trash_dirs.update(data.get("trash_dirs", []))
+        except Exception as e:
+            print("Journal unreadable, starting empty:", repr(e))
+
+    def load(self):
+        self.trash_dir.mkdir(parents=True, exist_ok=True)
+        with self._locked():
+            # an entry whose trashed item is gone can't be undone or redone
+            self._entries = [e for e in self._entries if not e.trash or os.path.lexists(e.trash)]
+
+            # items left in the trash by a crash; every process's entries are
+            # in the file, so anything unreferenced is nobody's
+            kept = {e.trash for e in self._entries if e.trash}
+            for trash in list(self._trash_dirs):
+                if not os.path.isdir(trash):
+                    self._trash_dirs.discard(trash)
+                    continue
+                for item in os.listdir(trash):
+                    path = os.path.join(trash, item)
+                    if path not in kept:
+                        self._purge(path)
+            self._save()
+
+    def _save(self):
+        payload = {
+            "entries": [asdict(e) for e in self._entries],
+            "trash_dirs": sorted(self._trash_dirs),
+        }
+        tmp = self.file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.file)
+
+    # ---------- trash ----------
+    def _trash_for(self, path: str) -> str:
+        """The trash folder on `path`'s volume."""
+        parent = os.path.dirname(os.path.abspath(path))
+        try:
+            if os.stat(parent).st_dev == os.stat(self.trash_dir).st_dev:
+                return str(self.trash_dir)
+        except OSError:
+            pass
+        trash = os.path.join(_volume_root(parent), VOLUME_TRASH)
+        try:
+            os.makedirs(trash, exist_ok=True)
+        except OSError:
+            # read-only volume root: the move below copies instead
+            return str(self.trash_dir)
+        self._trash_dirs.add(trash)
+        return trash
+
+    def _purge(self, path: str):
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _to_trash(self, entry: JournalEntry):
+        slot = os.path.join(self._trash_for(entry.path), f"{entry.id}-{entry.name}")
+        shutil.move(entry.path, slot)
+        entry.trash = slot
+        entry.size = _size(slot)
+
+    def _from_trash(self, entry: JournalEntry):
+        shutil.move(entry.trash, entry.path)  # type: ignore[arg-type]
+        entry.trash = None
+        entry.size = 0
+
+    # ---------- recording ----------
+    def _push(self, entry: JournalEntry):
+        # a new action ends the owner's redo chain
+        for e in [e for e in self._entries if e.owner == entry.owner and not e.done]:
+            self._drop(e)
+        self._entries.append(entry)
+        self._trim(entry)
+        self._save()
+
+    def _trim(self, keep: JournalEntry):
+        """Drop the oldest entries beyond the limits; `keep` always stays."""
+        while len(self._entries) > self.max_entries:
+            self._drop(self._entries[0])
+        total = sum(e.size for e in self._entries if e.trash)
+        for e in list(self._entries):
+            if total <= self.max_trash_bytes:
+                break
+            if e.trash and e is not keep:
+                total -= e.size
+                self._drop(e)
+
+    def _drop(self, entry: JournalEntry):
+        self._entries.remove(entry)
+        if entry.trash:
+            self._purge(entry.trash)
+
+    def _new(self, kind: str, path: str, owner: str, previous: Optional[str] = None) -> JournalEntry:
+        return JournalEntry(
+            id=uuid.uuid4().hex[:12],
+            kind=kind,
+            owner=owner,
+            path=os.path.abspath(path),
+            previous=previous,
+            time=time.time(),
+        )
+
+    def track(self, kind: str, path: str, owner: str, action: Callable[[], str]) -> str:
+        """Run a create action; record it if it created `path`."""
+        existed = os.path.lexists(path)
+        result = action()
+        if not existed and os.path.lexists(path):
+            with self._locked():
+                self._push(self._new(kind, path, owner))
+        return result
+
+    def trash(self, kind: str, path: str, owner: str):
+        """Delete `path` by moving it to the trash (file_control's `remove`)."""
+        with self._locked():
+            entry = self._new(kind, path, owner)
+            self._to_trash(entry)
+            self._push(entry)
+
+    def navigated(self, owner: str, previous: str, path: str):
+        with self._locked():
+            self._push(self._new(NAVIGATE, path, owner, previous=previous))
+
+    def forget(self, owner: str):
+        """Drop an owner's history (a remote session that went away)."""
+        with self._locked():
+            for e in [e for e in self._entries if e.owner == owner]:
+                self._drop(e)
+            self._save()
+
+    # ---------- undo / redo ----------
+    # Both return (message, entry); entry is None if nothing changed. For a
+    # navigate entry the caller moves the owner to entry.previous (undo) or
+    # entry.path (redo).
+    def undo(self, owner: str) -> Tuple[str, Optional[JournalEntry]]:
+        with self._locked():
+            done = [e for e in self._entries if e.owner == owner and e.done]
+            if not done:
+                return "There is nothing to undo.", None
+            entry = done[-1]
+
+            if entry.kind == NAVIGATE:
+                if not os.path.isdir(entry.previous or ""):
+                    self._drop(entry)
+                    self._save()
+                    return f"The folder {os.path.basename(entry.previous or '')} no longer exists.", None
+                message = f"I have moved back to the folder {os.path.basename(entry.previous or '')}."
+            elif entry.kind in CREATE:
+                if not os.path.lexists(entry.path):
+                    self._drop(entry)
+                    self._save()
+                    return f"The {entry.noun} {entry.name} no longer exists.", None
+                self._to_trash(entry)
+                self._trim(entry)
+                message = f"I have removed the {entry.noun} {entry.name} again."
+            else:
+                if os.path.lexists(entry.path):
+                    return f"I cannot restore {entry.name}, something with that name already exists.", None
+                self._from_trash(entry)
+                message = f"I have restored the {entry.noun} {entry.name}."
+
+            entry.done = False
+            self._save()
+            return message, entry
+
+    def redo(self, owner: str) -> Tuple[str, Optional[JournalEntry]]:
+        with self._locked():
+            undone = [e for e in self._entries if e.owner == owner and not e.done]
+            if not undone:
+                return "There is nothing to redo.", None
+            # undo walks backwards, so the first undone entry was undone last
+            entry = undone[0]
+
+            if entry.kind == NAVIGATE:
+                if not os.path.isdir(entry.path):
+                    self._drop(entry)
+                    self._save()
+                    return f"The folder {entry.name} no longer exists.", None
+                message = f"I have moved into the folder {entry.name} again."
+            elif entry.kind in CREATE:
+                if os.path.lexists(entry.path):
+                    return f"I cannot bring back {entry.name}, something with that name already exists.", None
+                self._from_trash(entry)
+                message = f"I have brought back the {entry.noun} {entry.name}."
+            else:
+                if not os.path.lexists(entry.path):
+                    self._drop(entry)
+                    self._save()
+                    return f"The {entry.noun} {entry.name} no longer exists.", None
+                self._to_trash(entry)
+                self._trim(entry)
+                message = f"I have deleted the {entry.noun} {entry.name} again."
+
+            entry.done = True
+            self._save()
+            return message, entry
+
+    def history(self, owner: str) -> List[dict]:
+        with self._locked():
+            return [asdict(e) for e in self._entries if e.owner == owner]
+
+    def stats(self) -> dict:
+        with self._locked():
+            trashed = [e for e in self._entries if e.trash]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "trashed": len(trashed),
+                "trash_bytes": sum(e.size for e in trashed),
+                "max_trash_bytes": self.max_trash_bytes,
+            }
@@ -1,8 +1,50 @@
+import itertools
 import json
+import os
+import threading
+import time
 import uuid
-from dataclasses import dataclass, asdict
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from core.chat_search import TITLE, ChatSearchIndex, SearchHit
+from core.file_lock import locked_file
+
+# The store is an append-only JSONL log; one line per change:
+#   {"op": "gen", "id": ...}                             first line, changes on compaction
+#   {"op": "chat", "id": ..., "title": ..., "t": ...}    new chat
+#   {"op": "msg", "chat": ..., "role": ..., "content": ..., "t": ...}
+#   {"op": "title", "chat": ..., "title": ...}
+#   {"op": "delete", "chat": ...}
+#   {"op": "summary", "chat": ..., "upto": n, "text": ...}   rolling summary of messages [0, n)
+#   {"op": "cache", "chat": ..., "enabled": false}       opt out of the LLM reply cache
+# Adding a message appends (and fsyncs) one line instead of rewriting every
+# chat. Renames and deletes leave dead lines behind; once the log is
+# COMPACT_RATIO times larger than the live data it is rewritten as a
+# snapshot, atomically (temp file + rename).
+#
+# Only chat headers are kept in memory, with the byte offset of each of
+# their messages in the log; messages are read when a chat is opened. The
+# headers and offsets are checkpointed to an index file, so startup reads
+# the index and only the part of the log written after it.
+#
+# Another process (the daemon next to the app) may share the log. Before
+# reading or appending, the store checks the file: if it was replaced by a
+# compaction elsewhere the offsets are stale and everything is reloaded,
+# if it grew the new records are applied. Appends, compaction and loading
+# (which may cut off a torn line) hold LOCK_NAME, so no process loses
+# another's records or truncates a line still being written.
+LOG_NAME = "ai_chats.jsonl"
+INDEX_NAME = "ai_chats.index.json"
+LOCK_NAME = "ai_chats.lock"
+LEGACY_NAME = "ai_chats.json"
+COMPACT_MIN_RECORDS = 200
+COMPACT_RATIO = 2.0
+# checkpoint the index after this many appended records
+INDEX_EVERY = 500
+PAGE_SIZE = 50
 
 
 @dataclass
@@ -18,67 +60,512 @@ class AIChat:
     messages: List[AIMessage]
 
 
+@dataclass
+class AIChatHeader:
+    id: str
+    title: str
+    created: float = 0.0
+    updated: float = 0.0
+    count: int = 0
+    # rolling summary of the first summary_upto messages (see context_builder)
+    summary: str = ""
+    summary_upto: int = 0
+    # replies may come from (and go to) the LLM reply cache
+    cache: bool = True
+
+
+def _fsync_dir(path: Path):
+    # makes a rename durable; not possible (nor needed) on Windows
+    if os.name != "posix":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _line(rec: dict) -> bytes:
+    return (json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _file_id(path: Path) -> Optional[tuple]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_dev, st.st_ino
+
+
 class AIChatStore:
     def __init__(self, base_dir: Path):
         self.base_dir = base_dir
-        self.file = self.base_dir / "ai_chats.json"
-        self.chats: List[AIChat] = []
+        self.file = self.base_dir / LOG_NAME
+        self.index_file = self.base_dir / INDEX_NAME
+        self.legacy_file = self.base_dir / LEGACY_NAME
+        self.lock_file = self.base_dir / LOCK_NAME
+
+        # oldest first (insertion order); headers() lists newest first
+        self._headers: Dict[str, AIChatHeader] = {}
+        self._offsets: Dict[str, List[int]] = {}
+        self._gen: Optional[str] = None
+        self._records = 0  # lines in the log, live or dead
+        self._since_index = 0
+        # which log file the offsets point into, and how much of it is applied
+        self._file_id: Optional[tuple] = None
+        self._size = 0
+        self._lock = threading.RLock()
+        # nesting of _locked() on this store; the file lock is taken once
+        self._lock_depth = 0
+        # full-text search; built from the log on first use, without holding
+        # the store lock, so changes made meanwhile are queued and replayed
+        self._search = ChatSearchIndex()
+        self._search_pending: Optional[list] = None
+        self._build_lock = threading.Lock()
         self.load()
 
+    @contextmanager
+    def _locked(self):
+        """Hold the log against other threads and other processes."""
+        with self._lock:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            with locked_file(self.lock_file):
+                self._lock_depth = 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth = 0
+
+    # ---------- loading ----------
     def load(self):
-        if not self.file.exists():
-            self.chats = []
+        with self._locked():
+            self._reset()
+            if not self.file.exists():
+                if self.legacy_file.exists():
+                    self._migrate()
+                return
+
+            start = self._load_index()
+            replayed = self._scan(start)
+            if start == 0 or replayed >= INDEX_EVERY:
+                self._save_index()
+            if self._needs_compaction():
+                self.compact()
+
+    def _reset(self):
+        self._headers, self._offsets = {}, {}
+        self._gen = None
+        self._records = 0
+        self._since_index = 0
+        self._file_id = None
+        self._size = 0
+
+    def _sync(self):
+        """Catch up with what another process did to the log."""
+        file_id = _file_id(self.file)
+        if file_id is None:
             return
+        size = self.file.stat().st_size
+        if file_id != self._file_id or size < self._size:
+            # compacted elsewhere: our offsets point into the old file
+            self.load()
+            self._search = ChatSearchIndex()
+        elif size > self._size:
+            self._since_index += self._scan(self._size, truncate=False)
+            self._search = ChatSearchIndex()
+
+    def _log_gen(self) -> Optional[str]:
+        with open(self.file, "rb") as f:
+            first = f.readline()
         try:
-            data = json.loads(self.file.read_text(encoding="utf-8"))
-            self.chats = [
-                AIChat(
-                    id=chat["id"],
-                    title=chat.get("title", "New chat"),
-                    messages=[AIMessage(**m) for m in chat.get("messages", [])],
+            rec = json.loads(first)
+        except ValueError:
+            return None
+        return rec.get("id") if rec.get("op") == "gen" else None
+
+    def _load_index(self) -> int:
+        """Restore the checkpoint; returns the log offset to scan from."""
+        try:
+            idx = json.loads(self.index_file.read_text(encoding="utf-8"))
+            # stale after a compaction or a truncated log: rebuild
+            if idx["gen"] != self._log_gen() or idx["log_size"] > self.file.stat().st_size:
+                return 0
+            for h in idx["chats"]:
+                self._headers[h["id"]] = AIChatHeader(
+                    h["id"], h["title"], h["created"], h["updated"], len(h["offsets"]),
+                    h.get("summary", ""), h.get("summary_upto", 0), h.get("cache", True),
                 )
-                for chat in data
-            ]
-        except Exception:
-            self.chats = []
-
-    def save(self):
-        payload = [
-            {
-                "id": c.id,
-                "title": c.title,
-                "messages": [asdict(m) for m in c.messages],
-            }
-            for c in self.chats
-        ]
-        self.file.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
-
-    def create_chat(self, title: str = "New chat") -> AIChat:
-        chat = AIChat(id=str(uuid.uuid4()), title=title, messages=[])
-        self.chats.insert(0, chat)
-        self.save()
-        return chat
+                self._offsets[h["id"]] = h["offsets"]
+            self._gen = idx["gen"]
+            self._records = idx["records"]
+            return idx["log_size"]
+        except FileNotFoundError:
+            return 0
+        except (ValueError, KeyError, TypeError) as e:
+            print("Rebuilding chat index:", repr(e))
+            self._reset()
+            return 0
+
+    def _save_index(self):
+        # what was applied, not the file size: another process may be ahead
+        payload = {
+            "gen": self._gen,
+            "log_size": self._size,
+            "records": self._records,
+            "chats": [
+                {
+                    "id": h.id,
+                    "title": h.title,
+                    "created": h.created,
+                    "updated": h.updated,
+                    "offsets": self._offsets[h.id],
+                    "summary": h.summary,
+                    "summary_upto": h.summary_upto,
+                    "cache": h.cache,
+                }
+                for h in self._headers.values()
+            ],
+        }
+        # only a cache of the log: no fsync, a bad index is rebuilt
+        tmp = self.index_file.with_name(INDEX_NAME + ".tmp")
+        tmp.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.index_file)
+        self._since_index = 0
+
+    def _scan(self, start: int, truncate: bool = True) -> int:
+        """
+        Apply the log from `start`; returns the number of records read. A
+        torn last line is cut off, unless `truncate` is False (catching up
+        while another process may be mid-append).
+        """
+        count = 0
+        self._file_id = _file_id(self.file)
+        with open(self.file, "r+b") as f:
+            f.seek(start)
+            offset = good_end = start
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    # torn last write (crash mid-append): drop it
+                    break
+                try:
+                    self._apply(json.loads(raw), offset)
+                except (ValueError, KeyError, TypeError) as e:
+                    print("Skipping bad chat log line:", repr(e))
+                offset += len(raw)
+                good_end = offset
+                self._records += 1
+                count += 1
+            f.seek(0, os.SEEK_END)
+            if truncate and good_end < f.tell():
+                f.truncate(good_end)
+        self._size = good_end
+        return count
+
+    def _apply(self, rec: dict, offset: int):
+        op = rec["op"]
+        if op == "gen":
+            self._gen = rec["id"]
+        elif op == "chat":
+            t = rec.get("t", 0.0)
+            self._headers[rec["id"]] = AIChatHeader(rec["id"], rec.get("title", "New chat"), t, t)
+            self._offsets[rec["id"]] = []
+        elif op == "msg":
+            header = self._headers.get(rec["chat"])
+            if header:
+                self._offsets[header.id].append(offset)
+                header.count += 1
+                header.updated = rec.get("t", header.updated)
+        elif op == "title":
+            header = self._headers.get(rec["chat"])
+            if header:
+                header.title = rec["title"]
+        elif op == "summary":
+            header = self._headers.get(rec["chat"])
+            if header:
+                header.summary = rec["text"]
+                header.summary_upto = rec["upto"]
+        elif op == "cache":
+            header = self._headers.get(rec["chat"])
+            if header:
+                header.cache = rec["enabled"]
+        elif op == "delete":
+            self._headers.pop(rec["chat"], None)
+            self._offsets.pop(rec["chat"], None)
+
+    def _migrate(self):
+        """One-time import of the old single-file ai_chats.json."""
+        try:
+            data = json.loads(self.legacy_file.read_text(encoding="utf-8"))
+        except Exception as e:
+            print("Could not read old chat file:", repr(e))
+            return
+
+        def records() -> Iterator[dict]:
+            # the old file is newest first
+            for chat in reversed(data):
+                yield {"op": "chat", "id": chat["id"], "title": chat.get("title", "New chat")}
+                for m in chat.get("messages", []):
+                    yield {"op": "msg", "chat": chat["id"], "role": m["role"], "content": m["content"]}
+
+        self._rewrite(records())
+        # kept as a backup; the log is the store from now on
+        self.legacy_file.replace(self.legacy_file.with_name(LEGACY_NAME + ".bak"))
+        print(f"Migrated {len(self._headers)} chats to {self.file.name}")
+
+    # ---------- writing ----------
+    def _append(self, rec: dict):
+        with self._locked():
+            self._sync()
+            line = _line(rec)
+            new = not self.file.exists()
+            with open(self.file, "ab") as f:
+                if new:
+                    f.write(_line({"op": "gen", "id": uuid.uuid4().hex}))
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+                end = f.tell()
+            if new:
+                self._reset()
+                self._scan(0)
+                self._since_index = INDEX_EVERY
+            elif end - len(line) == self._size:
+                self._apply(rec, self._size)
+                self._records += 1
+                self._since_index += 1
+                self._size = end
+            else:
+                # appended in between by a process not taking the lock
+                self._since_index += self._scan(self._size, truncate=False)
+                self._search = ChatSearchIndex()
+
+            if self._needs_compaction():
+                self.compact()
+            elif self._since_index >= INDEX_EVERY:
+                self._save_index()
+
+    def _needs_compaction(self) -> bool:
+        live = len(self._headers) + sum(h.count for h in self._headers.values())
+        return self._records >= COMPACT_MIN_RECORDS and self._records > COMPACT_RATIO * live
+
+    def _rewrite(self, records: Iterable[dict]):
+        """Replace the log with `records` (temp file + atomic rename)."""
+        tmp = self.file.with_name(LOG_NAME + ".tmp")
+        state = (self._headers, self._offsets, self._gen, self._records)
+        self._reset()
+        try:
+            with open(tmp, "wb") as f:
+                for rec in itertools.chain([{"op": "gen", "id": uuid.uuid4().hex}], records):
+                    offset = f.tell()
+                    f.write(_line(rec))
+                    self._apply(rec, offset)
+                    self._records += 1
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            self._headers, self._offsets, self._gen, self._records = state
+            raise
+        os.replace(tmp, self.file)
+        _fsync_dir(self.base_dir)
+        self._file_id = _file_id(self.file)
+        self._size = self.file.stat().st_size
+        self._save_index()
+
+    def compact(self):
+        """Rewrite the log as a snapshot of the live chats."""
+        with self._locked():
+            self._sync()
+            headers = list(self._headers.values())
+            offsets = self._offsets
+
+            def records() -> Iterator[dict]:
+                with open(self.file, "rb") as old:
+                    for h in headers:
+                        yield {"op": "chat", "id": h.id, "title": h.title, "t": h.created}
+                        for off in offsets[h.id]:
+                            old.seek(off)
+                            yield json.loads(old.readline())
+                        if h.summary:
+                            yield {"op": "summary", "chat": h.id, "upto": h.summary_upto, "text": h.summary}
+                        if not h.cache:
+                            yield {"op": "cache", "chat": h.id, "enabled": False}
+
+            self._rewrite(records())
+
+    def close(self):
+        """Checkpoint the index so the next start reads no log tail."""
+        with self._lock:
+            if self._since_index and self.file.exists():
+                self._save_index()
+
+    # ---------- chats ----------
+    def headers(self) -> List[AIChatHeader]:
+        """All chats, newest first, without their messages."""
+        with self._lock:
+            self._sync()
+            return list(reversed(self._headers.values()))
+
+    def get_header(self, chat_id: str) -> Optional[AIChatHeader]:
+        return self._headers.get(chat_id)
+
+    # the search index is updated under the store lock; during a build the
+    # change is queued for it instead
+    def _index(self, method: str, *args):
+        if self._search.built:
+            getattr(self._search, method)(*args)
+        elif self._search_pending is not None:
+            self._search_pending.append((method, args))
+
+    def create_chat(self, title: str = "New chat") -> AIChatHeader:
+        chat_id = str(uuid.uuid4())
+        with self._lock:
+            self._append({"op": "chat", "id": chat_id, "title": title, "t": time.time()})
+            self._index("set_title", chat_id, title)
+        return self._headers[chat_id]
 
     def delete_chat(self, chat_id: str):
-        self.chats = [c for c in self.chats if c.id != chat_id]
-        self.save()
+        with self._locked():
+            self._sync()
+            if chat_id in self._headers:
+                self._append({"op": "delete", "chat": chat_id})
+                self._index("remove_chat", chat_id)
 
     def rename_chat(self, chat_id: str, new_title: str):
-        for c in self.chats:
-            if c.id == chat_id:
-                c.title = new_title
-                break
-        self.save()
+        with self._locked():
+            self._sync()
+            if chat_id in self._headers:
+                self._append({"op": "title", "chat": chat_id, "title": new_title})
+                self._index("set_title", chat_id, new_title)
 
     def add_message(self, chat_id: str, role: str, content: str):
-        for c in self.chats:
-            if c.id == chat_id:
-                c.messages.append(AIMessage(role=role, content=content))
-                break
-        self.save()
+        with self._locked():
+            # up to date and locked: the new message is the chat's last
+            self._sync()
+            if chat_id in self._headers:
+                self._append({"op": "msg", "chat": chat_id, "role": role, "content": content, "t": time.time()})
+                self._index("add", chat_id, self._headers[chat_id].count - 1, content)
+
+    def set_summary(self, chat_id: str, upto: int, text: str):
+        """Store the rolling summary of messages [0, upto)."""
+        with self._locked():
+            self._sync()
+            if chat_id in self._headers:
+                self._append({"op": "summary", "chat": chat_id, "upto": upto, "text": text})
+
+    def set_cache(self, chat_id: str, enabled: bool):
+        """Allow or forbid cached LLM replies for this chat."""
+        with self._locked():
+            self._sync()
+            header = self._headers.get(chat_id)
+            if header and header.cache != enabled:
+                self._append({"op": "cache", "chat": chat_id, "enabled": enabled})
+
+    # ---------- messages ----------
+    def get_messages(self, chat_id: str, start: int = 0, limit: Optional[int] = None) -> List[AIMessage]:
+        """Messages [start, start + limit) of a chat, read from the log."""
+        with self._lock:
+            while True:
+                self._sync()
+                offsets = self._offsets.get(chat_id, [])
+                end = len(offsets) if limit is None else start + limit
+                wanted = offsets[max(start, 0):end]
+                messages = []
+                with open(self.file, "rb") as f:
+                    st = os.fstat(f.fileno())
+                    if (st.st_dev, st.st_ino) != self._file_id:
+                        # compacted elsewhere since _sync: offsets are stale
+                        continue
+                    for off in wanted:
+                        f.seek(off)
+                        rec = json.loads(f.readline())
+                        messages.append(AIMessage(role=rec["role"], content=rec["content"]))
+                return messages
+
+    def last_page(self, chat_id: str, size: int = PAGE_SIZE) -> tuple[int, List[AIMessage]]:
+        """(start, messages) of the newest `size` messages."""
+        with self._lock:
+            self._sync()
+            header = self._headers.get(chat_id)
+            start = max((header.count if header else 0) - size, 0)
+            return start, self.get_messages(chat_id, start, size)
 
     def get_chat(self, chat_id: str) -> AIChat | None:
-        for c in self.chats:
-            if c.id == chat_id:
-                return c
-        return None
+        """The chat with all its messages."""
+        header = self._headers.get(chat_id)
+        if not header:
+            return None
+        return AIChat(id=header.id, title=header.title, messages=self.get_messages(chat_id))
+
+    # ---------- search ----------
+    def _build_search(self):
+        with self._build_lock:
+            with self._lock:
+                self._sync()
+                if self._search.built:
+                    return
+                current = self._search
+                self._search_pending = []
+                titles = [(h.id, h.title) for h in self._headers.values()]
+                where = {off: (chat_id, i) for chat_id, offs in self._offsets.items() for i, off in enumerate(offs)}
+                log = open(self.file, "rb") if self.file.exists() else None
+                end = self._size
+
+            def docs() -> Iterator[tuple]:
+                for chat_id, title in titles:
+                    yield chat_id, TITLE, title
+                if log is None:
+                    return
+                # one sequential read of the log instead of a seek per message;
+                # the open file stays readable even if it is compacted meanwhile
+                offset = 0
+                for raw in log:
+                    if offset >= end:
+                        break
+                    doc = where.get(offset)
+                    offset += len(raw)
+                    if doc is not None:
+                        yield doc[0], doc[1], json.loads(raw)["content"]
+
+            start = time.perf_counter()
+            index = ChatSearchIndex()
+            try:
+                index.build(docs())
+            finally:
+                if log is not None:
+                    log.close()
+
+            with self._lock:
+                pending, self._search_pending = self._search_pending or [], None
+                # reset by another process's changes meanwhile: built for nothing
+                if self._search is not current:
+                    return
+                for method, args in pending:
+                    getattr(index, method)(*args)
+                self._search = index
+            print(f"Indexed {len(index)} chat documents in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def warm_search(self) -> threading.Thread:
+        """Build the search index in the background."""
+        thread = threading.Thread(target=self._build_search, name="chat-search", daemon=True)
+        thread.start()
+        return thread
+
+    def search(self, query: str, limit: int = 20) -> List[SearchHit]:
+        """Ranked title and message hits, best first, with title and snippet."""
+        self._build_search()
+        hits = self._search.search(query, limit)
+        for hit in hits:
+            header = self._headers.get(hit.chat_id)
+            hit.title = header.title if header else ""
+            if hit.message_index == TITLE:
+                hit.snippet = hit.title
+            else:
+                found = self.get_messages(hit.chat_id, hit.message_index, 1)
+                hit.snippet = found[0].content if found else ""
+        return hits
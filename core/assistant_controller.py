@@ -1,35 +1,77 @@
+import asyncio
+import atexit
+import queue
+import re
 import threading
-from typing import Callable, Optional
+import time
+from concurrent.futures import Future
+from typing import Callable, Iterable, Optional
 
 import os
 from pathlib import Path
 
 from core.command_engine import process_command
-from core.voice_engine import listen_once
-from core.speech_engine import speak
+from core.event_loop import EventLoopThread
+from core.command_queue import CommandRejected
+from core.skill_executor import SkillExecutor, SkillBusy, SkillTimeout
+from core.tracing import Trace, get_tracer, span
+from core.voice_engine import listen_once, listen_streaming
+from core.speech_engine import (
+    speak,
+    speak_stream,
+    stop_speaking,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    PRIORITY_HIGH,
+    PRIORITY_URGENT,
+)
 from core.wakeword_engine import WakeWordEngine
 from core.dialog_state import DialogState, PendingAction
+from core.action_journal import NAVIGATE, ActionJournal
+from core.session import (
+    Session,
+    SessionManager,
+    current_session,
+    reset_current_session,
+    set_current_session,
+)
 from core.ai_chat_store import AIChatStore
-from core.llm_client import LLMClient
+from core.llm_client import AsyncLLMClient, LLMClient
+from core.context_builder import ContextBuilder
 
 from skills.system_state import SystemState
-from skills import file_control
-from skills import application_control
-from skills.file_control import get_base_dir, set_base_dir
-from skills import system_info
-from skills import volume_control
-from skills import power_control
-from skills import alarm_control
+from skills.registry import SkillUnavailable, get_registry
 from core.time_parser import extract_time
-from skills import alarm_control
-from skills import screen_analyzer
-from skills import wiki_skill, weather_skill
 
-from PySide6.QtCore import QTimer, QObject, Signal  # type: ignore
+from PySide6.QtCore import QObject, Signal  # type: ignore
+
+
+# end of a sentence in a streamed AI reply (for speaking it early)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Skills are imported on first use (see skills/registry.py).
+_registry = get_registry()
+file_control = _registry.lazy("file_control")
+application_control = _registry.lazy("application_control")
+system_info = _registry.lazy("system_info")
+volume_control = _registry.lazy("volume_control")
+power_control = _registry.lazy("power_control")
+alarm_control = _registry.lazy("alarm_control")
+screen_analyzer = _registry.lazy("screen_analyzer")
+wiki_skill = _registry.lazy("wiki_skill")
+weather_skill = _registry.lazy("weather_skill")
 
 
 class VoiceBridge(QObject):
+    """
+    Signals emitted from the controller's loop and worker threads; Qt
+    delivers them on the UI thread (queued connections).
+    """
     voiceResult = Signal(str, str)
+    voicePartial = Signal(str)
+    stateChanged = Signal(str)
+    message = Signal(str)
+    directoryChanged = Signal()
 
     
 
@@ -39,10 +81,24 @@ class AssistantController:
     """
     Central brain:
     wake word → intent → dialog → execution
+
+    The pipeline runs on one asyncio loop thread (self.loop). Listening and
+    skills are awaited on worker pools, and a wake word cancels the running
+    command (barge-in).
+
+    Every client has a Session (core/session.py) with its own dialog state,
+    working directory, history and command queue: commands of one session
+    run in order, different sessions run concurrently. The UI and the voice
+    pipeline are the two local sessions; they share one queue (and folder
+    and undo history), so typed and spoken commands run one at a time.
+    Daemon connections add their own.
     """
 
-    def __init__(self):
- 
+    def __init__(self, wake_word: bool = True):
+        """
+        wake_word=False runs without the microphone wake word engine
+        (headless daemon, batch runs).
+        """
         self.on_state_change: Optional[Callable[[str], None]] = None
         self.on_message: Optional[Callable[[str], None]] = None
         self.on_speaking_start: Optional[Callable[[], None]] = None
@@ -52,99 +108,590 @@ class AssistantController:
 
         self._working_dir = Path.cwd()
         self.ai_store = AIChatStore(self._working_dir)
+        # checkpoint the chat index so the next start skips the log
+        atexit.register(lambda: self.ai_store.close())
         self.system_state = SystemState()
+        # undo/redo of file actions and navigation, kept across restarts
+        self.journal = ActionJournal()
 
         self.bridge = VoiceBridge()
         self.llm = LLMClient()
+        atexit.register(lambda: self.llm.close())
+        # AI chat replies stream on the controller loop, sharing the cache
+        self.async_llm = AsyncLLMClient(self.llm.config, self.llm.cache)
+        self.context_builder = ContextBuilder(self.llm)
+        # chats whose summary is being updated in the background
+        self._summarizing: set[str] = set()
+        self._summarizing_lock = threading.Lock()
 
         # self.on_voice_result: Optional[Callable[[Optional[str], Optional[str]], None]] = None
 
-        self._busy = False
-        self._input_source = "voice"
+        # pipeline state, only touched on the loop thread
+        self.loop = EventLoopThread()
+        atexit.register(lambda: self.loop.submit(self.async_llm.aclose()))
+        self.skills = SkillExecutor()
+        self.tracer = get_tracer()
+        self.skill_registry = _registry
+        self._tasks: set[asyncio.Task] = set()
+        self._listening = False
+        self._running = 0  # commands executing, over all sessions
+        # per worker thread: cancellation flag and trace of its command
+        self._local = threading.local()
+
+        # Streaming ASR: partial transcripts go to the UI and are classified
+        # early, so a final transcript matching the last partial skips a
+        # second predict_intent call.
+        self.streaming_asr = True
+        self._early_result: Optional[tuple[str, dict]] = None
+
+        self.sessions = SessionManager(str(self._working_dir))
+        self.ui_session = self.sessions.get_or_create("ui", local=True)
+        self.voice_session = self.sessions.get_or_create("voice", local=True)
+        self.voice_session.input_source = "voice"
+
+        self.wake_engine: Optional[WakeWordEngine] = None
+        if wake_word:
+            self.wake_engine = WakeWordEngine(
+                self._on_wake_word,
+                system_state=self.system_state,
+                adaptive=True,
+            )
+            self.wake_engine.start()
+        self.skill_registry.prewarm()
+
+        self._set_state("idle")
 
-        self.dialog = DialogState()
-        self.last_matches = []
-        self.last_spoken: Optional[str] = None
 
-        self.wake_engine = WakeWordEngine(self._on_wake_word)
-        self.wake_engine.start()
 
-        self._set_state("idle")
+    # ---------- SESSION ----------
+    # Skills and _handle_command see the session of the command they run for
+    # (a context variable set in _run_command and in the skill thread).
+    # Outside a command these fall back to the UI session.
+    @property
+    def session(self) -> Session:
+        return current_session() or self.ui_session
 
+    @property
+    def dialog(self) -> DialogState:
+        return self.session.dialog
 
+    @property
+    def last_matches(self) -> list:
+        return self.session.last_matches
+
+    @last_matches.setter
+    def last_matches(self, matches: list):
+        self.session.last_matches = matches
+
+    @property
+    def last_spoken(self) -> Optional[str]:
+        return self.session.last_spoken
+
+    @last_spoken.setter
+    def last_spoken(self, text: Optional[str]):
+        self.session.last_spoken = text
+        self.session.spoken += 1
+
+    @property
+    def _input_source(self) -> str:
+        return self.session.input_source
+
+    def _owner(self, session: Session) -> str:
+        # the local sessions share one undo history, like their folder
+        return "local" if session.local else session.id
+
+    def close_session(self, session_id: str):
+        session = self.sessions.get(session_id)
+        if session is None or session.local:
+            return
+        self.sessions.close(session_id)
+        self.journal.forget(self._owner(session))
+
+    def _change_directory(self, session: Session, path: str, record: bool = True):
+        if record and path != session.working_dir:
+            self.journal.navigated(self._owner(session), session.working_dir, path)
+        # the UI and voice sessions are the same person at this machine:
+        # they move together; remote sessions keep their own folder
+        targets = self.sessions.local() if session.local else [session]
+        for s in targets:
+            s.working_dir = path
+        if session.local:
+            self._emit_directory_change()
 
     def _set_state(self, state: str):
+        self.state = state
+        self.bridge.stateChanged.emit(state)
         if callable(self.on_state_change):
             self.on_state_change(state)
 
-    def _speak(self, text: str):
-      
+    def _emit_message(self, text: str, sink: Optional[Callable[[str], None]] = None):
+        if self._cancelled():
+            return
+        # per-command sink (e.g. a daemon client streaming the reply)
+        sink = sink or getattr(self._local, "on_message", None)
+        if sink is not None:
+            sink(text)
+        self.bridge.message.emit(text)
+        if callable(self.on_message):
+            self.on_message(text)
+
+    def _emit_directory_change(self):
+        self.bridge.directoryChanged.emit()
+        if callable(self.on_directory_change):
+            self.on_directory_change()
+
+    def _first_audio_hook(self) -> Optional[Callable[[], None]]:
+        trace: Optional[Trace] = getattr(self._local, "trace", None)
+        if trace is None:
+            return None
+
+        def mark():
+            if not trace.has_mark("first_audio"):
+                trace.mark("first_audio")
+
+        return mark
+
+    def _cancelled(self) -> bool:
+        """True inside a skill whose command was cancelled by barge-in."""
+        flag = getattr(self._local, "cancelled", None)
+        return flag is not None and flag.is_set()
+
+    def _speak(self, text: str, priority: int = PRIORITY_NORMAL, ttl: Optional[float] = None):
+        # a cancelled skill may still finish in its worker; drop its reply
+        if self._cancelled():
+            return
+
         self.last_spoken = text
 
- 
         if callable(self.on_speaking_start):
             self.on_speaking_start()
 
-        def worker():
-            speak(text)
-            if callable(self.on_speaking_end):
-                self.on_speaking_end()
+        # speak() only queues; the speech worker does the rest
+        speak(text, priority=priority, ttl=ttl, on_audio=self._first_audio_hook())
+        if callable(self.on_speaking_end):
+            self.on_speaking_end()
+
+    def _speak_stream(self, chunks: Iterable[str], priority: int = PRIORITY_LOW):
+        """
+        Speak and show text as a skill produces it. The first chunk becomes
+        the reply (like _speak); later chunks go to the UI through
+        on_message as they arrive, while TTS is already reading. `chunks`
+        is read here, on the skill thread, so the skill's timeout and group
+        cover all of it; it stops early if the command is cancelled or the
+        speech is dropped.
+        """
+        if self._cancelled():
+            return
+        it = iter(chunks)
+        try:
+            first = next(it, None)
+            if not first:
+                return
 
-        threading.Thread(target=worker, daemon=True).start()
+            self.last_spoken = first
+            if callable(self.on_speaking_start):
+                self.on_speaking_start()
+
+            pieces: queue.Queue = queue.Queue()
+            dropped = threading.Event()
+
+            def spoken():
+                # read by the speech producer thread until None
+                try:
+                    yield from iter(pieces.get, None)
+                finally:
+                    # closed when the text runs out or the utterance is
+                    # dropped (muted, expired, barge-in)
+                    dropped.set()
+                    if callable(self.on_speaking_end):
+                        self.on_speaking_end()
+
+            speak_stream(spoken(), priority=priority, on_audio=self._first_audio_hook())
+            pieces.put(first)
+            try:
+                for chunk in it:
+                    if self._cancelled() or dropped.is_set():
+                        break
+                    self._emit_message(chunk)
+                    pieces.put(chunk)
+            finally:
+                pieces.put(None)
+        finally:
+            close = getattr(it, "close", None)
+            if close is not None:
+                close()
 
     
     def run_ai_chat(self, chat_id: str, user_text: str, model: str | None = None) -> str:
-        chat = self.ai_store.get_chat(chat_id)
-        if not chat:
+        header = self.ai_store.get_header(chat_id)
+        if not header:
             raise ValueError("Unknown chat id")
 
         # append user message
         self.ai_store.add_message(chat_id, "user", user_text)
-        # build full history for LLM
-        messages = [{"role": m.role, "content": m.content} for m in chat.messages]
-        reply = self.llm.chat(messages, model=model)
+        # system prompt, rolling summary and the newest turns, within budget
+        messages = self.context_builder.build(self.ai_store, chat_id, model=model)
+        reply = self.llm.chat(messages, model=model, use_cache=header.cache, cache_tag=chat_id)
         # save assistant reply
         self.ai_store.add_message(chat_id, "assistant", reply)
+        self._summarize_later(chat_id, model)
         return reply
 
+    def delete_ai_chat(self, chat_id: str):
+        """Delete a chat, and in the background the replies cached for it."""
+        self.ai_store.delete_chat(chat_id)
+        self._forget_cached(chat_id)
 
+    def _forget_cached(self, chat_id: str):
+        if self.llm.cache is not None:
+            self.loop.submit(self.loop.run_blocking(self.llm.cache.forget, chat_id))
 
-    def _on_wake_word(self):
-        if self._busy:
-            return
-        self._busy = True
-        self._set_state("wake")
-        self._speak("Yes?")
-        self._listen_async()
-
+    def _summarize_later(self, chat_id: str, model: str | None = None):
+        """Fold old turns into the chat's summary after the reply, not before it."""
+        with self._summarizing_lock:
+            if chat_id in self._summarizing:
+                return
+            self._summarizing.add(chat_id)
 
-    def _listen_async(self):
-        def worker():
+        def work():
             try:
-                self._set_state("listening")
-                text = listen_once()
-                if not text:
-                    self._speak("I did not catch that.")
-                    # emit empty heard/reply so UI can show a bubble if it wants
-                    self.bridge.voiceResult.emit("", "")
-                    return
+                self.context_builder.update_summary(self.ai_store, chat_id, model=model)
+            except Exception as e:
+                # the turns stay out of the context until the next try
+                print("Summarizing chat failed:", repr(e))
+            finally:
+                with self._summarizing_lock:
+                    self._summarizing.discard(chat_id)
+                # deleted while summarizing: the new summary was cached too late
+                if self.ai_store.get_header(chat_id) is None:
+                    self._forget_cached(chat_id)
 
-                self._input_source = "voice"
+        self.loop.submit(self.loop.run_blocking(work))
 
-                before = self.last_spoken
-                self._handle_command(text)
-                reply = self.last_spoken if self.last_spoken != before else ""
+    async def run_ai_chat_stream(
+        self,
+        chat_id: str,
+        user_text: str,
+        on_delta: Callable[[str], None],
+        model: str | None = None,
+        speak_reply: bool = False,
+    ) -> str:
+        """
+        Coroutine for the controller loop: like run_ai_chat, but `on_delta`
+        gets each piece of the reply as it arrives (on the loop thread).
+        With speak_reply, every completed sentence is spoken while the rest
+        is still streaming. The reply comes through AsyncLLMClient, so no
+        thread waits on the network; cancel the task to stop it.
+        """
+        header = self.ai_store.get_header(chat_id)
+        if not header:
+            raise ValueError("Unknown chat id")
 
-                # emit exactly like run_voice does
-                self.bridge.voiceResult.emit(text, reply)
+        # the chat log fsyncs and reads: off the loop
+        await self.loop.run_blocking(self.ai_store.add_message, chat_id, "user", user_text)
+        messages = await self.loop.run_blocking(self.context_builder.build, self.ai_store, chat_id, model)
+
+        sentences: Optional[queue.Queue] = None
+        if speak_reply:
+            sentences = queue.Queue()
+            # the speech producer thread pulls sentences until None
+            speak_stream(iter(sentences.get, None), priority=PRIORITY_LOW)
+
+        parts = []
+        pending = ""
+        try:
+            async for delta in self.async_llm.chat_stream(
+                messages, model=model, use_cache=header.cache, cache_tag=chat_id
+            ):
+                parts.append(delta)
+                on_delta(delta)
+                if sentences is not None:
+                    *done, pending = _SENTENCE_END.split(pending + delta)
+                    for sentence in done:
+                        sentences.put(sentence)
+        finally:
+            if sentences is not None:
+                if pending.strip():
+                    sentences.put(pending)
+                sentences.put(None)
+            # keep what arrived, even if the stream broke off or was cancelled
+            reply = "".join(parts)
+            if reply:
+                await asyncio.shield(
+                    self.loop.run_blocking(self.ai_store.add_message, chat_id, "assistant", reply)
+                )
+        self._summarize_later(chat_id, model)
+        return reply
+
+    def submit_ai_chat(
+        self,
+        chat_id: str,
+        user_text: str,
+        on_delta: Callable[[str], None],
+        model: str | None = None,
+        speak_reply: bool = False,
+    ) -> Future:
+        """
+        Stream an AI chat reply on the controller loop, from any thread;
+        `on_delta` runs on the loop thread. The future resolves to the whole
+        reply; cancelling it stops the request.
+        """
+        return self.loop.submit(
+            self.run_ai_chat_stream(chat_id, user_text, on_delta, model, speak_reply)
+        )
+
+
+
+    # ---------- PIPELINE (event loop thread) ----------
+    # Listening starts as soon as the wake word is heard; the recognized
+    # command then goes through the voice session's queue.
+    def _start(self, coro) -> asyncio.Task:
+        task = self.loop.loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def is_busy(self) -> bool:
+        return bool(self._tasks) or any(s.commands.busy() for s in self.sessions.all())
+
+    def _update_state(self):
+        if self._listening:
+            self._set_state("listening")
+        elif self._running or any(len(s.commands) for s in self.sessions.all()):
+            self._set_state("processing")
+        else:
+            self._set_state("idle")
+
+    def _on_wake_word(self):
+        # called on the wake word thread
+        self.loop.call_soon(self._wake, time.perf_counter())
+
+    def _wake(self, detected_at: float):
+        if self._listening:
+            # the command being spoken may itself contain the wake word
+            return
+        trace = self.tracer.start("voice", at=detected_at)
+        trace.mark("wake", detected_at)
+        # barge-in: cut off the reply and the spoken command being handled;
+        # typed commands, queued commands and remote sessions go on
+        self.voice_session.commands.cancel_current(source="voice")
+        stop_speaking()
+        self._set_state("wake")
+        token = set_current_session(self.voice_session)
+        try:
+            self._speak("Yes?")
+        finally:
+            reset_current_session(token)
+        self._start(self._voice_pipeline(trace=trace))
+
+    async def _voice_pipeline(
+        self,
+        callback: Optional[Callable[[Optional[str], Optional[str]], None]] = None,
+        trace: Optional[Trace] = None,
+    ):
+        trace = trace or self.tracer.start("voice")
+        # a task runs in its own copy of the context
+        set_current_session(self.voice_session)
+        try:
+            self._listening = True
+            self._update_state()
+            try:
+                text = await self.loop.run_blocking(self._listen, trace)
             finally:
-                self._busy = False
-                self._set_state("idle")
+                self._listening = False
+                self._update_state()
 
-        threading.Thread(target=worker, daemon=True).start()
+            trace.attrs["text"] = text
+            if not text:
+                self._speak("I did not catch that.", ttl=5)
+                if callback:
+                    callback(None, None)
+                else:
+                    # emit empty heard/reply so UI can show a bubble if it wants
+                    self.bridge.voiceResult.emit("", "")
+                return
 
+            try:
+                reply = await self._submit(
+                    self.voice_session, text, "voice", self._take_early_result(text), trace
+                )
+            except asyncio.CancelledError:
+                # cancelled by barge-in or replaced in the queue
+                reply = ""
+            if callback:
+                callback(text, reply or self.voice_session.last_spoken)
+            else:
+                self.bridge.voiceResult.emit(text, reply)
+        finally:
+            trace.finish()
 
+    async def run_text_command(
+        self,
+        text: str,
+        on_message: Optional[Callable[[str], None]] = None,
+        session: Optional[Session] = None,
+    ) -> str:
+        """
+        Coroutine for the controller loop: queue a typed command and return
+        its reply ("" if it said nothing). `on_message` receives the extra lines it shows (file
+        listings, streamed paragraphs) as they are produced. `session`
+        defaults to the UI session.
+        """
+        session = session or self.ui_session
+        trace = self.tracer.start("text")
+        trace.attrs["text"] = text
+        trace.attrs["session"] = session.id
+        try:
+            reply = await self._submit(session, text, "text", trace=trace, on_message=on_message)
+        finally:
+            trace.finish()
+        # only this command's reply, never an earlier one still in last_spoken
+        return reply
 
+    async def _submit(
+        self,
+        session: Session,
+        text: str,
+        source: str,
+        result: Optional[dict] = None,
+        trace: Optional[Trace] = None,
+        on_message: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        try:
+            return await session.commands.submit(
+                source,
+                lambda: self._run_command(session, text, source, result, trace, on_message),
+                trace,
+            )
+        except CommandRejected as e:
+            print("Command rejected:", e)
+            notice = "I am still busy. Please try again in a moment."
+            # a notice, not a reply: not remembered as last_spoken
+            speak(notice, ttl=5)
+            return notice
+
+    async def _run_command(
+        self,
+        session: Session,
+        text: str,
+        source: str,
+        result: Optional[dict] = None,
+        trace: Optional[Trace] = None,
+        on_message: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        """
+        Run _handle_command on the skill pool under the intent's policy and
+        return the new reply ("" if nothing was said). If the awaiting task is
+        cancelled or times out the skill keeps running in its thread, but
+        everything it says afterwards is dropped, and the session's next
+        command waits until the thread has returned.
+        """
+        # this task's context only; other sessions' tasks keep theirs
+        token = set_current_session(session)
+        self._running += 1
+        self._update_state()
+        reply = ""
+        try:
+            reply = await self._execute(session, text, source, result, trace, on_message)
+            return reply
+        finally:
+            session.record(source, text, reply)
+            self._running -= 1
+            self._update_state()
+            reset_current_session(token)
+
+    async def _execute(
+        self,
+        session: Session,
+        text: str,
+        source: str,
+        result: Optional[dict],
+        trace: Optional[Trace],
+        on_message: Optional[Callable[[str], None]],
+    ) -> str:
+        if result is None:
+            result = await self.loop.run_blocking(process_command, text, trace)
+        elif trace is not None:
+            # classified from the last partial transcript while listening
+            trace.mark("early_intent")
+        intent = result.get("type")
+        if trace is not None:
+            trace.attrs["intent"] = intent
+        spec = self.skill_registry.skill_for(intent)
+        spoken_before = session.spoken
+        cancelled = threading.Event()
+        returned = asyncio.Event()
+
+        def run() -> str:
+            try:
+                if cancelled.is_set():
+                    # cancelled while waiting for a pool thread
+                    return ""
+                self._local.cancelled = cancelled
+                self._local.trace = trace
+                self._local.on_message = on_message
+                # pool threads don't inherit the task's context
+                token = set_current_session(session)
+                try:
+                    session.input_source = source
+                    before = session.spoken
+                    if spec is not None:
+                        # import up front: a missing skill fails before any side effect
+                        self.skill_registry.load(spec.name)
+                    with span(trace, "skill"):
+                        self._handle_command(text, result)
+                    return session.last_spoken if session.spoken != before else ""
+                finally:
+                    reset_current_session(token)
+                    self._local.cancelled = None
+                    self._local.trace = None
+                    self._local.on_message = None
+            finally:
+                self.loop.call_soon(returned.set)
+
+        try:
+            return await self.skills.run(intent, run, on_slow=self._still_working)
+        except asyncio.CancelledError:
+            cancelled.set()
+            # a thread can't be stopped: it keeps the session until it returns
+            session.commands.hold(returned.wait())
+            raise
+        except SkillTimeout as e:
+            cancelled.set()
+            session.commands.hold(returned.wait())
+            print("Skill timeout:", e)
+            self._speak("Sorry, that is taking too long. Please try again later.")
+        except SkillBusy as e:
+            print("Skill busy:", e)
+            self._speak("I am still working on your previous request.")
+        except SkillUnavailable as e:
+            self._speak(f"Sorry, {e.spec.description} is not available on this system.")
+        except Exception as e:
+            print("Skill error:", repr(e))
+            self._speak("Sorry, something went wrong.")
+        return session.last_spoken if session.spoken != spoken_before else ""
+
+    def _still_working(self):
+        # not a reply: short-lived and not remembered as last_spoken
+        speak("Still working on it.", ttl=3)
+
+
+    def _listen(self, trace: Optional[Trace] = None) -> Optional[str]:
+        if not self.streaming_asr:
+            return listen_once(trace=trace)
+        self._early_result = None
+        return listen_streaming(self._on_partial_transcript, trace=trace)
+
+    def _on_partial_transcript(self, text: str):
+        self.bridge.voicePartial.emit(text)
+        # classify early; the final transcript usually equals the last partial
+        self._early_result = (text, process_command(text))
+
+    def _take_early_result(self, text: str) -> Optional[dict]:
+        early, self._early_result = self._early_result, None
+        if early and early[0].lower() == text.lower():
+            return early[1]
+        return None
 
     def pause_wake_word(self):
         if self.wake_engine:
@@ -155,8 +702,9 @@ class AssistantController:
             self.wake_engine.start()
 
 
-    def _handle_command(self, text: str):
-        result = process_command(text)
+    def _handle_command(self, text: str, result: Optional[dict] = None):
+        if result is None:
+            result = process_command(text)
         rtype = result.get("type")
 
         if rtype == "get_time":
@@ -197,52 +745,56 @@ class AssistantController:
                 return
 
 
+        # folder and undo history of this command's session, captured for
+        # confirmations
+        cwd = self.session.working_dir
+        owner = self._owner(self.session)
+
         if rtype == "create_file":
+            name = result["name"]
             if self._input_source == "text":
                 action = PendingAction(
-                    f"create file {result['name']}",
-                    lambda: file_control.create_file(result["name"]),
-                    lambda: file_control.delete_file(result["name"]),
+                    f"create file {name}",
+                    lambda: self._create_item(rtype, name, cwd, owner),
                 )
                 self.dialog.set_pending(action)
-                self._speak(f"Should I create the file {result['name']}?")
+                self._speak(f"Should I create the file {name}?")
             else:
    
-                self._speak(file_control.create_file(result["name"]))
+                self._speak(self._create_item(rtype, name, cwd, owner))
             return
 
         if rtype == "delete_file":
+            name = result["name"]
             if self._input_source == "text":
                 action = PendingAction(
-                    f"delete file {result['name']}",
-                    lambda: file_control.delete_file(result["name"]),
-                    lambda: file_control.create_file(result["name"]),
+                    f"delete file {name}",
+                    lambda: self._delete_item(rtype, name, cwd, owner),
                 )
                 self.dialog.set_pending(action)
-                self._speak(f"Are you sure you want to delete {result['name']}?")
+                self._speak(f"Are you sure you want to delete {name}?")
             else:
 
-                self._speak(file_control.delete_file(result["name"]))
+                self._speak(self._delete_item(rtype, name, cwd, owner))
             return
 
         if rtype == "create_folder":
-            self._speak(file_control.create_folder(result["name"]))
+            self._speak(self._create_item(rtype, result["name"], cwd, owner))
             return
 
         if rtype == "delete_folder":
-            self._speak(file_control.delete_folder(result["name"]))
+            self._speak(self._delete_item(rtype, result["name"], cwd, owner))
             return
 
         if rtype == "list_files":
-            listing = file_control.list_items()
+            listing = file_control.list_items(cwd)
             if not listing.strip():
                 self._speak("The current folder is empty.")
             else:
                 self._speak("Here are the files and folders in the current directory.")
-                if callable(self.on_message):
-                    # send each item to UI
-                    for line in listing.splitlines():
-                        self.on_message(line)
+                # send each item to UI
+                for line in listing.splitlines():
+                    self._emit_message(line)
             return
 
         if rtype == "navigate_in":
@@ -251,20 +803,17 @@ class AssistantController:
                 self._speak("Please specify a folder name.")
                 return
 
-            response = file_control.navigate_to_folder(folder)
+            response, new_dir = file_control.navigate_to_folder(folder, cwd)
             self._speak(response)
-
-            if callable(self.on_state_change):
-                self.on_state_change("idle")
-            if callable(self.on_directory_change):
-                self.on_directory_change()
+            if new_dir:
+                self._change_directory(self.session, new_dir)
             return
 
         if rtype == "navigate_out":
-            response = file_control.go_back()
+            response, new_dir = file_control.go_back(cwd)
             self._speak(response)
-            if callable(self.on_directory_change):
-                self.on_directory_change()
+            if new_dir:
+                self._change_directory(self.session, new_dir)
             return
 
 
@@ -285,7 +834,6 @@ class AssistantController:
             action = PendingAction(
                 f"open {names[0]}",
                 lambda: application_control.open_application(names[0]),
-                None,
                 options=names,
             )
             self.dialog.set_pending(action)
@@ -304,18 +852,26 @@ class AssistantController:
         if rtype == "list_installed_apps":
             data = application_control.list_installed_applications()
             self._speak(data["summary"])
-            if callable(self.on_message):
-                # send each app name to UI
-                for item in data["items"]:
-                    self.on_message(item)
+            # send each app name to UI
+            for item in data["items"]:
+                self._emit_message(item)
             return
 
         if rtype == "refresh_apps":
             self._speak(application_control.refresh_applications())
             return
 
-        if rtype == "undo":
-            self._speak(self.dialog.undo())
+        if rtype in ("undo", "redo"):
+            session = self.session
+            step = self.journal.undo if rtype == "undo" else self.journal.redo
+            message, entry = step(owner)
+            if entry is not None and entry.kind == NAVIGATE:
+                target = entry.previous if rtype == "undo" else entry.path
+                self._change_directory(session, target, record=False)
+            elif entry is not None and session.local:
+                # the folder listing changed
+                self._emit_directory_change()
+            self._speak(message)
             return
 
         if rtype == "set_volume":
@@ -366,7 +922,8 @@ class AssistantController:
             hour, minute = parsed
 
             def alarm_callback():
-                QTimer.singleShot(0, lambda: self._speak("Your alarm is ringing."))
+                # alarm thread -> loop thread
+                self.loop.call_soon(self._speak, "Your alarm is ringing.", PRIORITY_URGENT)
 
             self._speak(alarm_control.set_alarm(hour, minute, alarm_callback))
             return
@@ -382,7 +939,8 @@ class AssistantController:
                 # ---------- SYSTEM / NETWORK / PERFORMANCE / BATTERY ----------
         if rtype == "get_system_status":
             self.system_state.refresh()
-            self._speak(self.system_state.summary())
+            priority = PRIORITY_HIGH if self.system_state.is_critical_battery() else PRIORITY_NORMAL
+            self._speak(self.system_state.summary(), priority=priority)
             return
 
         if rtype == "get_network_status":
@@ -428,13 +986,8 @@ class AssistantController:
             return
 
         if rtype == "read_screen_text":
-            screen_text = screen_analyzer.read_screen_text()
-            if callable(self.on_message) and screen_text:
-                self.on_message(screen_text)
-
-            self._speak(screen_text)
-
-            # self.last_spoken = screen_text
+            # long dumps yield to anything else that needs saying
+            self._speak_stream(screen_analyzer.iter_screen_text(), priority=PRIORITY_LOW)
             return
 
         if rtype == "foreground_window_info":
@@ -456,8 +1009,7 @@ class AssistantController:
 
         if rtype == "wiki_search":
             topic = result.get("query", "").strip() or text
-            summary = wiki_skill.wikipedia_summary(topic)
-            self._speak(summary)
+            self._speak_stream(wiki_skill.iter_wikipedia_summary(topic), priority=PRIORITY_LOW)
             return
 
 
@@ -466,56 +1018,74 @@ class AssistantController:
         self._speak("Please try again,  akhil")
 
 
+    # ---------- JOURNALED FILE ACTIONS ----------
+    def _create_item(self, kind: str, name: str, cwd: str, owner: str) -> str:
+        create = file_control.create_file if kind == "create_file" else file_control.create_folder
+        return self.journal.track(kind, os.path.join(cwd, name), owner, lambda: create(name, cwd))
+
+    def _delete_item(self, kind: str, name: str, cwd: str, owner: str) -> str:
+        # deleted items go to the journal's trash, so undo is a rename
+        delete = file_control.delete_file if kind == "delete_file" else file_control.delete_folder
+        return delete(name, cwd, remove=lambda path: self.journal.trash(kind, path, owner))
+
+    def submit_text_command(self, text: str) -> Future:
+        """
+        Queue a typed command from any thread. The returned future resolves
+        to the spoken reply, or is cancelled by barge-in or by the queue's
+        replace_latest policy.
+        """
+        return self.loop.submit(self.run_text_command(text))
+
     def handle_text_command(self, text: str) -> str:
-        self._input_source = "text"
-        self._handle_command(text)
-        # Return what was spoken (captured in _speak)
-        return self.last_spoken or "Processing..."
+        # blocking variant; never call it on the loop thread
+        return self.submit_text_command(text).result()
 
- 
- 
     def handle_voice_command_async(
         self,
         callback: Callable[[Optional[str], Optional[str]], None],
     ):
-        if self._busy:
-            return
-
-        def worker():
-            try:
-                self._busy = True
-                self._set_state("listening")
-
-                text = listen_once()
-                if not text:
-                    self._speak("I did not catch that.")
-                    callback(None, None)
-                    return
-
-                self._input_source = "voice"
-                self._handle_command(text)
-                callback(text, self.get_last_response())
-
-                # pass both heard text and last spoken reply
-                
-            finally:
-                self._busy = False
-                self._set_state("idle")
+        """
+        Listen for one command (mic button). `callback(heard, reply)` runs on
+        the loop thread.
+        """
+        def start():
+            if self._listening:
+                # already capturing a command (wake word); nothing new to hear
+                callback(None, None)
+                return
+            self._start(self._voice_pipeline(callback))
 
-        threading.Thread(target=worker, daemon=True).start()
+        self.loop.call_soon(start)
 
 
 
     def get_working_directory(self) -> str:
-        return get_base_dir()
+        return self.ui_session.working_dir
 
     def set_working_directory(self, path: str):
-        set_base_dir(path)
+        # default for new sessions and for file_control callers without one
+        file_control.set_base_dir(path)
+        self.sessions.working_dir = path
 
         self._working_dir = Path(path)
+        self.ai_store.close()
         self.ai_store =AIChatStore(self._working_dir)
-        if callable(self.on_directory_change):
-            self.on_directory_change()
+        self._change_directory(self.ui_session, path)
 
     def get_last_response(self) -> Optional[str]:
-        return self.last_spoken
+        return self.ui_session.last_spoken
+
+    def get_queue_stats(self) -> dict:
+        # the local sessions report their shared queue once
+        queues = {}
+        for s in self.sessions.all():
+            queues.setdefault(id(s.commands), ("local" if s.local else s.id, s.commands))
+        return {name: q.stats() for name, q in queues.values()}
+
+    def get_trace_summary(self) -> dict:
+        """Per-stage latency (ms) over the recent command traces."""
+        return self.tracer.summary()
+
+    def dump_traces(self, path: str, fmt: str = "json"):
+        """Write recent traces as "json" or "chrome" (chrome://tracing)."""
+        self.tracer.dump(path, fmt)
@@ -0,0 +1,370 @@
+# core/audio_replay.py
+"""
+Record and replay raw audio sessions for the voice pipeline.
+
+Capture: `python main.py --record sessions/demo` wraps every microphone the
+assistant opens in a RecordingSource. Each open becomes one WAV segment, and
+sessions/demo/index.json stores the wall-clock start/end of every segment.
+
+Replay: `python -m core.audio_replay sessions/demo --speed 4` rebuilds one
+continuous timeline from the segments and serves it to WakeWordEngine and
+listen_once through ReplaySource, paced by a clock running `speed` times
+faster than real time. A full AssistantController runs on top of it and the
+wake-to-reply latency of every command is reported.
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+import wave
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import speech_recognition as sr  # type: ignore
+
+from core import voice_engine
+
+INDEX_FILE = "index.json"
+
+
+# ---------------- CAPTURE ----------------
+class SessionRecorder:
+    def __init__(self, session_dir: str | Path):
+        self.dir = Path(session_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._segments: List[dict] = []
+        self._save()
+
+    def new_segment(self, rate: int, width: int) -> tuple[dict, wave.Wave_write]:
+        with self._lock:
+            name = f"segment_{len(self._segments):04d}.wav"
+            segment = {
+                "file": name,
+                "start": time.time(),
+                "end": None,
+                "rate": rate,
+                "width": width,
+            }
+            self._segments.append(segment)
+
+        writer = wave.open(str(self.dir / name), "wb")
+        writer.setnchannels(1)
+        writer.setsampwidth(width)
+        writer.setframerate(rate)
+        return segment, writer
+
+    def close_segment(self, segment: dict, writer: wave.Wave_write):
+        writer.close()
+        with self._lock:
+            segment["end"] = time.time()
+            self._save()
+
+    def _save(self):
+        data = {"segments": self._segments}
+        (self.dir / INDEX_FILE).write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+
+class _TeeStream:
+    def __init__(self, stream, writer: wave.Wave_write):
+        self._stream = stream
+        self._writer = writer
+
+    def read(self, size: int) -> bytes:
+        data = self._stream.read(size)
+        self._writer.writeframes(data)
+        return data
+
+    def close(self):
+        self._stream.close()
+
+
+class RecordingSource(sr.Microphone):
+    """
+    A microphone that writes everything it reads into the session.
+    """
+
+    def __init__(self, recorder: SessionRecorder, **kwargs):
+        super().__init__(**kwargs)
+        self.recorder = recorder
+        self._segment: Optional[dict] = None
+        self._writer: Optional[wave.Wave_write] = None
+
+    def __enter__(self):
+        super().__enter__()
+        self._segment, self._writer = self.recorder.new_segment(
+            self.SAMPLE_RATE, self.SAMPLE_WIDTH
+        )
+        self.stream = _TeeStream(self.stream, self._writer)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            return super().__exit__(exc_type, exc_value, traceback)
+        finally:
+            if self._segment is not None and self._writer is not None:
+                self.recorder.close_segment(self._segment, self._writer)
+            self._segment = None
+            self._writer = None
+
+
+def start_recording(session_dir: str | Path) -> SessionRecorder:
+    recorder = SessionRecorder(session_dir)
+    voice_engine.set_source_factory(lambda **kw: RecordingSource(recorder, **kw))
+    print(f"Recording audio sessions to {recorder.dir}")
+    return recorder
+
+
+# ---------------- REPLAY ----------------
+class ReplayTimeline:
+    """
+    One continuous PCM stream rebuilt from a recorded session.
+
+    Gaps between segments become silence and overlapping segments (wake word
+    engine and listen_once recording at the same time) are read only once.
+    """
+
+    def __init__(self, session_dir: str | Path, speed: float = 1.0):
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+        self.dir = Path(session_dir)
+        self.speed = speed
+
+        index = json.loads((self.dir / INDEX_FILE).read_text(encoding="utf-8"))
+        segments = sorted(
+            (s for s in index["segments"] if s.get("end")),
+            key=lambda s: s["start"],
+        )
+        if not segments:
+            raise ValueError(f"No recorded segments in {self.dir}")
+
+        self.rate = segments[0]["rate"]
+        self.width = width = segments[0]["width"]
+        pcm = bytearray()
+        cursor = segments[0]["start"]
+
+        for seg in segments:
+            frames = self._read_wav(self.dir / seg["file"])
+            seg_end = seg["start"] + len(frames) / (self.rate * width)
+
+            if seg["start"] > cursor:
+                gap = int((seg["start"] - cursor) * self.rate) * width
+                pcm.extend(b"\0" * gap)
+                cursor = seg["start"]
+
+            skip = int((cursor - seg["start"]) * self.rate) * width
+            if skip < len(frames):
+                pcm.extend(frames[skip:])
+                cursor = max(cursor, seg_end)
+
+        self.pcm = bytes(pcm)
+        self.duration = len(self.pcm) / (self.rate * width)
+        self._t0: Optional[float] = None
+
+    def _read_wav(self, path: Path) -> bytes:
+        with wave.open(str(path), "rb") as w:
+            frames = w.readframes(w.getnframes())
+            if w.getframerate() != self.rate:
+                frames = _resample(frames, self.width, w.getframerate(), self.rate)
+        return frames
+
+    def start(self):
+        self._t0 = time.perf_counter()
+
+    def position(self) -> int:
+        """Current byte offset of the (scaled) replay clock."""
+        if self._t0 is None:
+            self.start()
+        assert self._t0 is not None
+        seconds = (time.perf_counter() - self._t0) * self.speed
+        return int(seconds * self.rate) * self.width
+
+    def audio_time(self) -> float:
+        return self.position() / (self.rate * self.width)
+
+    @property
+    def finished(self) -> bool:
+        return self.position() >= len(self.pcm)
+
+
+def _resample(frames: bytes, width: int, src_rate: int, dst_rate: int) -> bytes:
+    """Linear-interpolation resampling of mono PCM (replaces audioop.ratecv)."""
+    dtype = {1: np.int8, 2: np.int16, 4: np.int32}[width]
+    samples = np.frombuffer(frames[: len(frames) - len(frames) % width], dtype=dtype)
+    if not samples.size:
+        return b""
+    count = int(len(samples) * dst_rate / src_rate)
+    positions = np.arange(count) * (src_rate / dst_rate)
+    resampled = np.interp(positions, np.arange(len(samples)), samples.astype(np.float64))
+    return np.round(resampled).astype(dtype).tobytes()
+
+
+class _ReplayStream:
+    def __init__(self, timeline: ReplayTimeline):
+        self.timeline = timeline
+        self.pos = timeline.position()
+
+    def read(self, size: int) -> bytes:
+        tl = self.timeline
+        end = self.pos + size * tl.width
+        if self.pos >= len(tl.pcm):
+            return b""
+
+        # behave like a live microphone: block until the audio "exists"
+        ahead = end - tl.position()
+        if ahead > 0:
+            time.sleep(ahead / (tl.rate * tl.width * tl.speed))
+
+        data = tl.pcm[self.pos:end]
+        self.pos = end
+        return data
+
+    def close(self):
+        pass
+
+
+class ReplaySource(sr.AudioSource):
+    def __init__(self, timeline: ReplayTimeline, chunk_size: int = 1024):
+        self.timeline = timeline
+        self.SAMPLE_RATE = timeline.rate
+        self.SAMPLE_WIDTH = timeline.width
+        self.CHUNK = chunk_size
+        self.stream: Optional[_ReplayStream] = None
+
+    def __enter__(self):
+        self.stream = _ReplayStream(self.timeline)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream = None
+
+
+class _SilenceStream:
+    def __init__(self, chunk: bytes, seconds_per_chunk: float):
+        self.chunk = chunk
+        self.seconds_per_chunk = seconds_per_chunk
+
+    def read(self, size: int) -> bytes:
+        # a live microphone blocks until the chunk has been captured
+        time.sleep(self.seconds_per_chunk)
+        return self.chunk
+
+    def close(self):
+        pass
+
+
+class SilenceSource(sr.AudioSource):
+    """
+    Endless quiet-room audio (low noise, well under the wake word engine's
+    energy floor) delivered in real time, for idle measurements.
+    """
+
+    def __init__(self, chunk_size: int = 1024, rate: int = 16000, level: float = 30.0):
+        self.SAMPLE_RATE = rate
+        self.SAMPLE_WIDTH = 2
+        self.CHUNK = chunk_size
+        noise = np.random.default_rng(0).normal(0.0, level, chunk_size)
+        self._chunk = noise.astype(np.int16).tobytes()
+        self.stream: Optional[_SilenceStream] = None
+
+    def __enter__(self):
+        self.stream = _SilenceStream(self._chunk, self.CHUNK / self.SAMPLE_RATE)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream = None
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def latency_stats(latencies: List[float]) -> dict:
+    if not latencies:
+        return {"count": 0}
+    return {
+        "count": len(latencies),
+        "mean": statistics.mean(latencies),
+        "p50": _percentile(latencies, 50),
+        "p95": _percentile(latencies, 95),
+        "max": max(latencies),
+    }
+
+
+def run_replay(session_dir: str | Path, speed: float = 1.0, recognizer: str = "google") -> dict:
+    """
+    Feed a recorded session through WakeWordEngine, listen_once and the
+    controller, and return wake-to-reply latency statistics in seconds of
+    wall-clock time plus the per-stage breakdown from the traces.
+    """
+    from core.assistant_controller import AssistantController
+    from core import speech_engine
+
+    # replies are timed, not played
+    speech_engine.set_backend("null")
+
+    timeline = ReplayTimeline(session_dir, speed)
+    voice_engine.set_source_factory(lambda **kw: ReplaySource(timeline, **kw))
+    voice_engine.set_recognizer_backend(recognizer)
+
+    latencies: List[float] = []
+    wake_times: List[float] = []
+    lock = threading.Lock()
+
+    timeline.start()
+    controller = AssistantController()
+    controller.streaming_asr = False
+
+    on_wake = controller._on_wake_word
+    handle = controller._handle_command
+
+    def timed_wake():
+        with lock:
+            wake_times.append(time.perf_counter())
+        on_wake()
+
+    def timed_handle(*args, **kwargs):
+        try:
+            return handle(*args, **kwargs)
+        finally:
+            with lock:
+                if wake_times:
+                    latencies.append(time.perf_counter() - wake_times.pop(0))
+
+    controller.wake_engine.on_wake_callback = timed_wake
+    controller._handle_command = timed_handle  # type: ignore[method-assign]
+
+    while not timeline.finished:
+        time.sleep(0.1)
+    # let the last command finish
+    deadline = time.perf_counter() + 30
+    while controller.is_busy() and time.perf_counter() < deadline:
+        time.sleep(0.1)
+
+    controller.pause_wake_word()
+    voice_engine.set_source_factory(None)
+
+    stats = latency_stats(latencies)
+    stats["audio_seconds"] = timeline.duration
+    stats["speed"] = speed
+    stats["stages"] = controller.get_trace_summary()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded voice session.")
+    parser.add_argument("session", help="directory written by main.py --record")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed factor")
+    parser.add_argument(
+        "--recognizer", choices=("google", "sphinx"), default="google",
+        help="sphinx runs offline",
+    )
+    args = parser.parse_args()
+
+    report = run_replay(args.session, args.speed, args.recognizer)
+    print(json.dumps(report, indent=2))
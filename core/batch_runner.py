@@ -0,0 +1,158 @@
+# core/batch_runner.py
+"""
+Run a file of text commands through the full controller, non-interactively.
+
+    python main.py --batch commands.txt [--confirm yes|no|first] [--report out.json]
+
+Input is either plain text (one command per line, blank lines and lines
+starting with # are skipped) or JSONL, one object per line:
+
+    {"text": "what time is it", "expect": "the time is"}
+
+`expect` is an optional case-insensitive substring of the reply. When a
+command asks for confirmation ("Should I create the file x?") the answer
+comes from the confirm policy: "no" (default, nothing destructive happens),
+"yes", or "first" (pick the first option of a list). A JSONL line that
+doesn't parse or has no "text" is reported with its line number and skipped.
+
+Speech is routed to the null TTS backend and the wake word is off. The
+report has the reply, latency and pass/fail of every command plus overall
+throughput.
+"""
+
+import json
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List, Optional
+
+CONFIRM_POLICIES = ("no", "yes", "first")
+
+
+@dataclass
+class BatchItem:
+    text: str
+    expect: Optional[str] = None
+    line: int = 0
+
+
+@dataclass
+class BatchResult:
+    line: int
+    text: str
+    reply: str
+    latency_ms: float
+    confirmation: Optional[str] = None
+    expect: Optional[str] = None
+    ok: Optional[bool] = None
+    error: Optional[str] = None
+
+
+def load_batch(path: str | Path) -> List[BatchItem]:
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for n, raw in enumerate(f, 1):
+            line = raw.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                try:
+                    data = json.loads(line)
+                    text = data["text"]
+                    if not isinstance(text, str):
+                        raise TypeError("text must be a string")
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"{path}:{n}: skipped malformed line ({e!r})")
+                    continue
+                items.append(BatchItem(text, data.get("expect"), n))
+            else:
+                items.append(BatchItem(line, None, n))
+    return items
+
+
+def _answer(controller, policy: str) -> Optional[str]:
+    """Answer a pending confirmation; returns the reply or None."""
+    if not controller.dialog.pending:
+        return None
+    answer = policy
+    if policy == "first" and not controller.dialog.pending.options:
+        answer = "yes"
+    return controller.handle_text_command(answer)
+
+
+def run_batch(controller, items: List[BatchItem], confirm: str = "no") -> dict:
+    if confirm not in CONFIRM_POLICIES:
+        raise ValueError(f"Unknown confirm policy: {confirm}")
+
+    results: List[BatchResult] = []
+    started = time.perf_counter()
+
+    for item in items:
+        start = time.perf_counter()
+        confirmation = None
+        error = None
+        try:
+            reply = controller.handle_text_command(item.text)
+            confirmation = _answer(controller, confirm)
+        except Exception as e:
+            reply = ""
+            error = repr(e)
+        latency = (time.perf_counter() - start) * 1000
+
+        ok = None
+        if item.expect is not None:
+            seen = f"{reply} {confirmation or ''}".lower()
+            ok = error is None and item.expect.lower() in seen
+        results.append(
+            BatchResult(item.line, item.text, reply, latency, confirmation, item.expect, ok, error)
+        )
+
+    elapsed = time.perf_counter() - started
+    latencies = sorted(r.latency_ms for r in results)
+    checked = [r for r in results if r.ok is not None]
+
+    summary = {
+        "commands": len(results),
+        "seconds": elapsed,
+        "throughput_per_s": len(results) / elapsed if elapsed else 0.0,
+        "passed": sum(1 for r in checked if r.ok),
+        "failed": sum(1 for r in checked if not r.ok),
+        "errors": sum(1 for r in results if r.error),
+        "confirm_policy": confirm,
+    }
+    if latencies:
+        summary.update({
+            "mean_ms": statistics.mean(latencies),
+            "p50_ms": latencies[len(latencies) // 2],
+            "p95_ms": latencies[round(0.95 * (len(latencies) - 1))],
+            "max_ms": latencies[-1],
+        })
+    return {"summary": summary, "results": [asdict(r) for r in results]}
+
+
+def print_report(report: dict):
+    for r in report["results"]:
+        mark = {True: "PASS", False: "FAIL", None: "    "}[r["ok"]]
+        print(f"{mark} {r['latency_ms']:8.1f} ms  {r['text']!r} -> {r['reply']!r}")
+        if r["confirmation"]:
+            print(f"{'':19}confirm -> {r['confirmation']!r}")
+        if r["error"]:
+            print(f"{'':19}error: {r['error']}")
+    print(json.dumps(report["summary"], indent=2))
+
+
+def main(path: str, confirm: str = "no", report_path: Optional[str] = None) -> int:
+    from core import speech_engine
+    from core.assistant_controller import AssistantController
+
+    speech_engine.set_backend("null")
+    controller = AssistantController(wake_word=False)
+
+    report = run_batch(controller, load_batch(path), confirm)
+    print_report(report)
+    if report_path:
+        Path(report_path).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    s = report["summary"]
+    return 1 if s["failed"] or s["errors"] else 0
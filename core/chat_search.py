@@ -0,0 +1,148 @@
+# core/chat_search.py
+"""
+In-memory inverted index over AI chat titles and messages.
+
+Every message (and every chat title) is a document keyed by
+(chat_id, message_index); the title uses index -1. Postings map a term to
+the documents containing it with their term counts, and queries are
+ranked with BM25. All query terms must match; the last one also matches
+as a prefix, so results appear while typing.
+
+The index is built once from the chat log (AIChatStore builds it on first
+use or in the background) and then kept up to date on every add, rename
+and delete.
+"""
+
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# a prefix match counts less than the whole word
+PREFIX_WEIGHT = 0.5
+
+TITLE = -1
+Doc = Tuple[str, int]
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+@dataclass
+class SearchHit:
+    chat_id: str
+    message_index: int  # -1 for a title match
+    score: float
+    title: str = ""
+    snippet: str = ""
+
+
+class ChatSearchIndex:
+    def __init__(self):
+        self._postings: Dict[str, Dict[Doc, int]] = {}
+        self._lengths: Dict[Doc, int] = {}
+        self._doc_terms: Dict[Doc, Tuple[str, ...]] = {}
+        self._chat_docs: Dict[str, Set[Doc]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+        self.built = False
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    # ---------- updates ----------
+    def add(self, chat_id: str, index: int, text: str):
+        doc = (chat_id, index)
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove_doc(doc)
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[doc] = tf
+            length = sum(terms.values())
+            self._lengths[doc] = length
+            self._doc_terms[doc] = tuple(terms)
+            self._total_length += length
+            self._chat_docs.setdefault(chat_id, set()).add(doc)
+
+    def set_title(self, chat_id: str, title: str):
+        self.add(chat_id, TITLE, title)
+
+    def remove_chat(self, chat_id: str):
+        with self._lock:
+            for doc in list(self._chat_docs.pop(chat_id, ())):
+                self._remove_doc(doc)
+
+    def _remove_doc(self, doc: Doc):
+        length = self._lengths.pop(doc, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for term in self._doc_terms.pop(doc, ()):
+            docs = self._postings[term]
+            docs.pop(doc, None)
+            if not docs:
+                del self._postings[term]
+        chat_docs = self._chat_docs.get(doc[0])
+        if chat_docs is not None:
+            chat_docs.discard(doc)
+
+    def build(self, docs: Iterable[Tuple[str, int, str]]):
+        """Index (chat_id, index, text) triples and mark the index ready."""
+        for chat_id, index, text in docs:
+            self.add(chat_id, index, text)
+        self.built = True
+
+    # ---------- queries ----------
+    def _expand(self, term: str) -> List[Tuple[str, float]]:
+        return [
+            (t, 1.0 if t == term else PREFIX_WEIGHT)
+            for t in self._postings
+            if t.startswith(term)
+        ]
+
+    def search(self, query: str, limit: int = 20) -> List[SearchHit]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            n = len(self._lengths)
+            if not n:
+                return []
+            avgdl = self._total_length / n
+
+            # each query term: the index terms it stands for
+            groups = [[(t, 1.0)] if t in self._postings else [] for t in terms[:-1]]
+            groups.append(self._expand(terms[-1]))
+
+            scores: Optional[Dict[Doc, float]] = None
+            for group in groups:
+                matched: Dict[Doc, float] = {}
+                for term, weight in group:
+                    docs = self._postings[term]
+                    idf = weight * math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                    for doc, tf in docs.items():
+                        norm = tf + K1 * (1 - B + B * self._lengths[doc] / avgdl)
+                        matched[doc] = matched.get(doc, 0.0) + idf * tf * (K1 + 1) / norm
+                if scores is None:
+                    scores = matched
+                else:
+                    # every query term must match
+                    scores = {d: s + matched[d] for d, s in scores.items() if d in matched}
+                if not scores:
+                    return []
+
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])  # type: ignore[union-attr]
+        return [SearchHit(chat_id, index, score) for (chat_id, index), score in ranked]
+
+    def stats(self) -> dict:
+        return {"built": self.built, "docs": len(self._lengths), "terms": len(self._postings)}
@@ -2,12 +2,13 @@ import re
 import pickle
 import numpy as np
 import tensorflow as tf  # type: ignore
-from typing import Dict
+from typing import Dict, Optional
 from keras import models  # type: ignore
 
 from tensorflow.keras.preprocessing.sequence import pad_sequences  # type: ignore
 
 from skills import file_control
+from core.tracing import Trace, span
 
 
 # ---------------- LOAD MODEL ----------------
@@ -21,6 +22,8 @@ with open("core/label_encoder.pkl", "rb") as f:
 
 MAX_LEN = 25
 
+REDO_PATTERN = re.compile(r"(please )?redo( that| it| the last action)?( please)?[.!]?")
+
 #--------- folder name extract------
 def extract_folder_name(text: str) -> str:
     text = text.lower()
@@ -150,8 +153,13 @@ def predict_intent(text: str):
 
 
 # ---------------- MAIN ROUTER ----------------
-def process_command(text: str) -> Dict:
-    intent, confidence = predict_intent(text)
+def process_command(text: str, trace: Optional[Trace] = None) -> Dict:
+    # the intent model has no REDO label
+    if REDO_PATTERN.fullmatch(text.strip().lower()):
+        return {"type": "redo"}
+
+    with span(trace, "predict_intent"):
+        intent, confidence = predict_intent(text)
 
     # DEBUG (keep while testing)
     print("DEBUG:", intent, confidence)
@@ -159,6 +167,12 @@ def process_command(text: str) -> Dict:
     if confidence < 0.6:
         return {"type": "unknown"}
 
+    with span(trace, "slots"):
+        return _route(intent, text)
+
+
+def _route(intent: str, text: str) -> Dict:
+    """Intent label -> command dict, extracting slots from the text."""
     # ---------- TIME / DATE ----------
     if intent == "GET_TIME":
         return {"type": "get_time"}
@@ -0,0 +1,216 @@
+# core/command_queue.py
+"""
+Bounded command queue for the controller's event loop.
+
+Text and voice commands are queued in the order their input was complete
+(a typed command submitted while a spoken one is still being heard runs
+first) and executed one at a time by a single consumer, whatever their
+source. When MAX_PENDING commands are already waiting, the policy decides:
+
+    queue           the submitter waits for room (backpressure)
+    replace_latest  the newest waiting command is dropped for the new one
+    reject          the new command is refused (the controller says so)
+
+A command whose work outlives it (a cancelled skill still running in its
+thread) can hold() the queue: the next command starts only once that work
+has finished, so commands never overlap.
+
+Everything here runs on one asyncio loop; nothing is locked.
+"""
+
+import asyncio
+import itertools
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, List, Optional
+
+from core.tracing import Trace
+
+QUEUE = "queue"
+REPLACE_LATEST = "replace_latest"
+REJECT = "reject"
+POLICIES = (QUEUE, REPLACE_LATEST, REJECT)
+
+MAX_PENDING = 3
+
+
+class CommandRejected(Exception):
+    pass
+
+
+@dataclass
+class Command:
+    seq: int
+    source: str
+    factory: Callable[[], Awaitable]
+    future: asyncio.Future
+    trace: Optional[Trace] = None
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    task: Optional[asyncio.Task] = None
+
+
+class CommandQueue:
+    def __init__(self, maxsize: int = MAX_PENDING, policy: Optional[str] = None):
+        policy = policy or os.getenv("ORBIT_COMMAND_POLICY", QUEUE)
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+
+        self._pending: Deque[Command] = deque()
+        self._seq = itertools.count(1)
+        self._ready: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._holds: List[asyncio.Future] = []
+        self.current: Optional[Command] = None
+
+        self.enqueued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.replaced = 0
+        self.cancelled = 0
+        self.max_depth = 0
+        self._waits: Deque[float] = deque(maxlen=200)
+
+    def _events(self):
+        # created lazily so they belong to the loop that uses them
+        if self._ready is None:
+            self._ready = asyncio.Event()
+            self._space = asyncio.Event()
+        return self._ready, self._space
+
+    async def submit(
+        self,
+        source: str,
+        factory: Callable[[], Awaitable],
+        trace: Optional[Trace] = None,
+    ):
+        """
+        Queue `factory()` and return its result once it has run. Raises
+        CommandRejected, or CancelledError if the command was replaced or
+        cancelled.
+        """
+        ready, space = self._events()
+
+        while len(self._pending) >= self.maxsize:
+            if self.policy == REJECT:
+                self.rejected += 1
+                raise CommandRejected(f"{len(self._pending)} commands already waiting")
+            if self.policy == REPLACE_LATEST:
+                dropped = self._pending.pop()
+                dropped.future.cancel()
+                self.replaced += 1
+                break
+            space.clear()
+            await space.wait()
+
+        loop = asyncio.get_running_loop()
+        command = Command(next(self._seq), source, factory, loop.create_future(), trace)
+        command.future.add_done_callback(lambda f, c=command: self._on_future_done(c))
+        self._pending.append(command)
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, len(self._pending))
+        ready.set()
+
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._consume())
+
+        return await command.future
+
+    def _on_future_done(self, command: Command):
+        # the submitter went away (barge-in, replaced): stop the command too
+        if command.future.cancelled():
+            self.cancelled += 1
+            if command.task is not None and not command.task.done():
+                command.task.cancel()
+
+    async def _consume(self):
+        ready, space = self._events()
+        while True:
+            while not self._pending:
+                ready.clear()
+                await ready.wait()
+
+            command = self._pending.popleft()
+            space.set()
+            if command.future.done():
+                continue
+
+            started = time.perf_counter()
+            self._waits.append(started - command.enqueued_at)
+            if command.trace is not None:
+                command.trace.add_span("queued", command.enqueued_at, started)
+
+            self.current = command
+            command.task = asyncio.get_running_loop().create_task(command.factory())
+            # asyncio.wait never raises, so a cancelled command can't stop the consumer
+            await asyncio.wait({command.task})
+            self.current = None
+            self.completed += 1
+
+            task, future = command.task, command.future
+            if not future.done():
+                if task.cancelled():
+                    future.cancel()
+                elif task.exception() is not None:
+                    future.set_exception(task.exception())  # type: ignore[arg-type]
+                else:
+                    future.set_result(task.result())
+
+            # the reply is out; the next command waits for leftover work
+            if self._holds:
+                self.current = command
+                while self._holds:
+                    await asyncio.wait({self._holds.pop()})
+                self.current = None
+
+    def hold(self, work: Awaitable):
+        """Keep the next command waiting until `work` is done."""
+        self._holds.append(asyncio.ensure_future(work))
+
+    def cancel_current(self, source: Optional[str] = None) -> bool:
+        """Cancel the running command (only if it came from `source`, if given)."""
+        command = self.current
+        if command is None or command.task is None or command.task.done():
+            return False
+        if source is not None and command.source != source:
+            return False
+        command.task.cancel()
+        return True
+
+    def clear(self):
+        while self._pending:
+            self._pending.popleft().future.cancel()
+
+    def close(self):
+        """Drop waiting commands, cancel the running one and stop the consumer."""
+        self.clear()
+        self.cancel_current()
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    def busy(self) -> bool:
+        return self.current is not None or bool(self._pending)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+        return {
+            "policy": self.policy,
+            "depth": len(self._pending),
+            "max_depth": self.max_depth,
+            "running": self.current.source if self.current else None,
+            "enqueued": self.enqueued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "replaced": self.replaced,
+            "cancelled": self.cancelled,
+            "wait_mean_ms": sum(waits) / len(waits) * 1000 if waits else None,
+            "wait_max_ms": waits[-1] * 1000 if waits else None,
+        }
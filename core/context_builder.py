@@ -0,0 +1,212 @@
+# core/context_builder.py
+"""
+Builds the message list sent to the LLM for an AI chat turn.
+
+The system prompt and the newest turns are kept verbatim within a token
+budget (ORBIT_CONTEXT_TOKENS). Everything older is represented by a
+rolling summary stored in the chat log. Building never calls the LLM:
+turns that no longer fit are left out, and update_summary(), run in the
+background after the reply, folds them into the summary with one LLM
+call, together with enough older turns to bring the window down to
+KEEP_AFTER_SUMMARY of its room, so that does not happen on every turn.
+Each message is summarized once.
+
+Tokens are counted with tiktoken when it is installed, otherwise
+estimated from the text length.
+"""
+
+import os
+from typing import List, Optional, Tuple
+
+from core.ai_chat_store import AIChatHeader, AIChatStore, AIMessage
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"Ignoring {name}={value!r}: not a whole number")
+        return default
+
+
+DEFAULT_BUDGET = _env_int("ORBIT_CONTEXT_TOKENS", 3000)
+DEFAULT_SYSTEM_PROMPT = os.getenv(
+    "ORBIT_SYSTEM_PROMPT", "You are OrbitOS, a helpful desktop assistant."
+)
+# tokens kept free for the summary message
+SUMMARY_TOKENS = 400
+# share of the room left to verbatim turns right after a summary
+KEEP_AFTER_SUMMARY = 0.6
+# always sent verbatim, even over budget (the user's new message)
+MIN_RECENT = 1
+# per-message overhead of the chat format, besides the role
+MESSAGE_OVERHEAD = 3
+PAGE = 50
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation below for your own later reference, in at "
+    "most 150 words. Keep names, facts, decisions and open questions. "
+    "Reply with the summary only."
+)
+
+_encoding = None
+_encoding_checked = False
+
+
+def count_tokens(text: str) -> int:
+    global _encoding, _encoding_checked
+    if not _encoding_checked:
+        _encoding_checked = True
+        try:
+            import tiktoken  # type: ignore
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = None
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    # about 4 characters per token for English text
+    return len(text) // 4 + 1
+
+
+def message_tokens(role: str, content: str) -> int:
+    return count_tokens(role) + count_tokens(content) + MESSAGE_OVERHEAD
+
+
+class ContextBuilder:
+    def __init__(
+        self,
+        llm,
+        budget: int = DEFAULT_BUDGET,
+        system_prompt: Optional[str] = DEFAULT_SYSTEM_PROMPT,
+    ):
+        self.llm = llm
+        self.budget = budget
+        self.system_prompt = system_prompt
+        self.last_stats: dict = {}
+
+    def _system(self) -> List[dict]:
+        if self.system_prompt:
+            return [{"role": "system", "content": self.system_prompt}]
+        return []
+
+    def _window(self, store: AIChatStore, header: AIChatHeader, room: int) -> Tuple[List[AIMessage], int, int]:
+        """
+        The newest turns that fit in `room`, oldest first, with their tokens
+        and the index of the first one. Turns from header.summary_upto to
+        that index don't fit.
+        """
+        upto = header.summary_upto
+        recent: List[AIMessage] = []
+        used = 0
+        cut = upto
+        end = header.count
+        while end > upto and cut == upto:
+            start = max(upto, end - PAGE)
+            page = store.get_messages(header.id, start, end - start)
+            for i in range(len(page) - 1, -1, -1):
+                cost = message_tokens(page[i].role, page[i].content)
+                if len(recent) >= MIN_RECENT and used + cost > room:
+                    cut = start + i + 1
+                    break
+                recent.append(page[i])
+                used += cost
+            end = start
+        recent.reverse()
+        return recent, used, cut
+
+    def build(self, store: AIChatStore, chat_id: str, model: Optional[str] = None) -> List[dict]:
+        header = store.get_header(chat_id)
+        if header is None:
+            raise ValueError("Unknown chat id")
+
+        system = self._system()
+        room = self.budget - sum(message_tokens(m["role"], m["content"]) for m in system)
+        if header.summary:
+            room -= SUMMARY_TOKENS
+        recent, _, cut = self._window(store, header, room)
+
+        messages = list(system)
+        if header.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{header.summary}"})
+        messages += [{"role": m.role, "content": m.content} for m in recent]
+
+        self.last_stats = {
+            "messages": len(messages),
+            "recent": len(recent),
+            "summarized": header.summary_upto,
+            # left out until update_summary folds them in
+            "unsummarized": cut - header.summary_upto,
+            "tokens": sum(message_tokens(m["role"], m["content"]) for m in messages),
+            "budget": self.budget,
+        }
+        return messages
+
+    def update_summary(self, store: AIChatStore, chat_id: str, model: Optional[str] = None) -> bool:
+        """
+        Fold the turns that no longer fit, and some more, into the rolling
+        summary. Blocking (LLM calls); returns True if the summary changed.
+        """
+        header = store.get_header(chat_id)
+        if header is None:
+            return False
+        system = self._system()
+        room = self.budget - sum(message_tokens(m["role"], m["content"]) for m in system) - SUMMARY_TOKENS
+        recent, used, cut = self._window(store, header, room)
+        if cut <= header.summary_upto:
+            return False
+
+        keep = recent
+        while len(keep) > MIN_RECENT and used > room * KEEP_AFTER_SUMMARY:
+            used -= message_tokens(keep[0].role, keep[0].content)
+            keep = keep[1:]
+        new_upto = cut + len(recent) - len(keep)
+        summary = self._summarize(store, chat_id, header.summary, header.summary_upto, new_upto, model, header.cache)
+        store.set_summary(chat_id, new_upto, summary)
+        return True
+
+    def _summarize(
+        self,
+        store: AIChatStore,
+        chat_id: str,
+        summary: str,
+        start: int,
+        end: int,
+        model: Optional[str],
+        use_cache: bool = True,
+    ) -> str:
+        # a long backlog (first summary of an old chat) goes in several calls
+        lines: List[str] = []
+        used = 0
+        for first in range(start, end, PAGE):
+            for m in store.get_messages(chat_id, first, min(PAGE, end - first)):
+                line = f"{m.role.capitalize()}: {m.content}"
+                cost = count_tokens(line)
+                if lines and used + cost > self.budget:
+                    summary = self._summary_call(summary, lines, model, use_cache, chat_id)
+                    lines, used = [], 0
+                lines.append(line)
+                used += cost
+        return self._summary_call(summary, lines, model, use_cache, chat_id)
+
+    def _summary_call(
+        self,
+        summary: str,
+        lines: List[str],
+        model: Optional[str],
+        use_cache: bool = True,
+        chat_id: Optional[str] = None,
+    ) -> str:
+        if summary:
+            lines = [f"Earlier summary: {summary}"] + lines
+        return self.llm.chat(
+            [
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": "\n".join(lines)},
+            ],
+            model=model,
+            use_cache=use_cache,
+            cache_tag=chat_id,
+        ).strip()
@@ -0,0 +1,374 @@
+# core/daemon.py
+"""
+Headless daemon: hosts an AssistantController without a Qt window and
+serves JSON-RPC 2.0 over a Unix domain socket, one JSON object per line.
+
+    python main.py --daemon [--socket PATH] [--voice] [--tts]
+
+Each connection is its own session (dialog state, working directory,
+history), closed when the client disconnects. Passing "session" to submit
+shares a named session across connections instead, closed when the last
+client using it disconnects. The local user's sessions ("ui", "voice")
+and other connections' own sessions can't be named.
+
+Methods:
+    submit {"text": str, "stream": bool, "session": str}
+                                           -> {"reply": str, "latency_ms": float}
+        with stream=true, lines the command shows (listings, paragraphs)
+        arrive as "message" notifications: {"request": id, "text": str}
+    history {"limit": int, "session": str} -> [{time, source, text, reply}]
+    sessions {}                            -> info of every open session
+    status {}                              -> state, queue, skills, speech, stages
+    subscribe {}                           -> true; then "state" notifications
+    ping {}                                -> "pong"
+
+Client / load test:
+    python -m core.daemon "what time is it"
+    python -m core.daemon --status
+    python -m core.daemon "what time is it" --repeat 200 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+DEFAULT_SOCKET = os.getenv("ORBIT_SOCKET", str(Path.home() / ".orbitos" / "orbit.sock"))
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+# the local user's sessions, never reachable over the socket
+RESERVED_SESSIONS = ("ui", "voice")
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class _Client:
+    def __init__(self, writer: asyncio.StreamWriter, session):
+        self.writer = writer
+        self.session = session
+        # named sessions this client has submitted to
+        self.joined: Set[str] = set()
+        self.subscribed = False
+
+    def send(self, payload: dict):
+        if self.writer.is_closing():
+            return
+        self.writer.write((json.dumps(payload) + "\n").encode("utf-8"))
+
+
+class JsonRpcDaemon:
+    """
+    Runs on the controller's own event loop, so a request reaches the
+    command queue without any thread hop.
+    """
+
+    def __init__(self, controller, path: str = DEFAULT_SOCKET):
+        self.controller = controller
+        self.path = path
+        self.loop = controller.loop.loop
+        self._clients: Set[_Client] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.requests = 0
+
+        controller.on_state_change = self._on_state_change
+
+    # ---------- server ----------
+    async def start(self):
+        if not hasattr(asyncio, "start_unix_server"):
+            raise RuntimeError("Unix domain sockets are not supported on this platform")
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        # created owner-only, so no other user can connect before a chmod;
+        # the umask is process-wide, so it is restored right after bind
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        mask = os.umask(0o177)
+        try:
+            sock.bind(self.path)
+        except OSError:
+            sock.close()
+            raise
+        finally:
+            os.umask(mask)
+        self._server = await asyncio.start_unix_server(self._serve_client, sock=sock)
+        print(f"OrbitOS daemon listening on {self.path}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for client in list(self._clients):
+            client.writer.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client = _Client(writer, self.controller.sessions.get_or_create())
+        self._clients.add(client)
+        tasks: Set[asyncio.Task] = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                # requests from one client may overlap; replies carry their id
+                task = asyncio.create_task(self._handle_line(client, line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            self._clients.discard(client)
+            for task in tasks:
+                task.cancel()
+            self.controller.close_session(client.session.id)
+            for name in client.joined:
+                if not any(name in other.joined for other in self._clients):
+                    self.controller.close_session(name)
+            writer.close()
+
+    async def _handle_line(self, client: _Client, line: bytes):
+        req_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                raise RpcError(PARSE_ERROR, "Parse error")
+            if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+                raise RpcError(INVALID_REQUEST, "Invalid request")
+            req_id = request.get("id")
+            params = request.get("params") or {}
+            if not isinstance(params, dict):
+                raise RpcError(INVALID_PARAMS, "params must be an object")
+
+            handler = getattr(self, f"rpc_{request['method']}", None)
+            if handler is None:
+                raise RpcError(METHOD_NOT_FOUND, f"Unknown method: {request['method']}")
+            try:
+                inspect.signature(handler).bind(client, req_id, **params)
+            except TypeError as e:
+                raise RpcError(INVALID_PARAMS, str(e)) from None
+            self.requests += 1
+            result = await handler(client, req_id, **params)
+            if req_id is not None:
+                client.send({"jsonrpc": "2.0", "id": req_id, "result": result})
+        except RpcError as e:
+            client.send({"jsonrpc": "2.0", "id": req_id, "error": {"code": e.code, "message": str(e)}})
+        except asyncio.CancelledError:
+            # the command was replaced or cancelled, or the client left (then
+            # send does nothing); either way the task ends cancelled
+            client.send({"jsonrpc": "2.0", "id": req_id, "error": {"code": SERVER_ERROR, "message": "cancelled"}})
+            raise
+        except Exception as e:
+            client.send({"jsonrpc": "2.0", "id": req_id, "error": {"code": SERVER_ERROR, "message": repr(e)}})
+
+    # ---------- notifications ----------
+    def _notify(self, client: _Client, method: str, params: dict):
+        client.send({"jsonrpc": "2.0", "method": method, "params": params})
+
+    def _on_state_change(self, state: str):
+        # may be called from worker threads
+        self.loop.call_soon_threadsafe(self._broadcast_state, state)
+
+    def _broadcast_state(self, state: str):
+        for client in list(self._clients):
+            if client.subscribed:
+                self._notify(client, "state", {"state": state})
+
+    # ---------- methods ----------
+    async def rpc_ping(self, client: _Client, req_id):
+        return "pong"
+
+    def _session(self, client: _Client, name: Optional[str], join: bool = True):
+        if name is None:
+            return client.session
+        if not isinstance(name, str) or not name:
+            raise RpcError(INVALID_PARAMS, "session must be a non-empty string")
+        existing = self.controller.sessions.get(name)
+        private = {other.session.id for other in self._clients if other is not client}
+        if name in RESERVED_SESSIONS or name in private or (existing is not None and existing.local):
+            raise RpcError(INVALID_PARAMS, f"Session not available: {name}")
+        if not join:
+            if existing is None:
+                raise RpcError(INVALID_PARAMS, f"Unknown session: {name}")
+            return existing
+        client.joined.add(name)
+        return self.controller.sessions.get_or_create(name)
+
+    async def rpc_submit(
+        self, client: _Client, req_id, text: str, stream: bool = False, session: Optional[str] = None
+    ):
+        if not isinstance(text, str) or not text.strip():
+            raise RpcError(INVALID_PARAMS, "text must be a non-empty string")
+        target = self._session(client, session)
+
+        on_message = None
+        if stream:
+            def on_message(line: str):
+                # called on skill / speech threads
+                self.loop.call_soon_threadsafe(
+                    self._notify, client, "message", {"request": req_id, "text": line}
+                )
+
+        start = time.perf_counter()
+        reply = await self.controller.run_text_command(
+            text.strip(), on_message=on_message, session=target
+        )
+        return {"reply": reply, "latency_ms": (time.perf_counter() - start) * 1000}
+
+    async def rpc_history(self, client: _Client, req_id, limit: int = 20, session: Optional[str] = None):
+        if not isinstance(limit, int) or isinstance(limit, bool):
+            raise RpcError(INVALID_PARAMS, "limit must be an integer")
+        history = list(self._session(client, session, join=False).history)
+        return history[-limit:] if limit > 0 else history
+
+    async def rpc_sessions(self, client: _Client, req_id):
+        return [s.info() for s in self.controller.sessions.all()]
+
+    async def rpc_subscribe(self, client: _Client, req_id):
+        client.subscribed = True
+        return True
+
+    async def rpc_status(self, client: _Client, req_id):
+        from core.speech_engine import get_speech_metrics
+
+        c = self.controller
+        return {
+            "state": c.state,
+            "busy": c.is_busy(),
+            "clients": len(self._clients),
+            "requests": self.requests,
+            "queue": c.get_queue_stats(),
+            "skills": c.skill_registry.stats(),
+            "skill_pool": c.skills.stats(),
+            "speech": get_speech_metrics(),
+            "stages": c.get_trace_summary(),
+        }
+
+
+def run_daemon(path: str = DEFAULT_SOCKET, voice: bool = False, tts: bool = False):
+    """Blocks until Ctrl+C."""
+    from core import speech_engine
+    from core.assistant_controller import AssistantController
+
+    if not tts:
+        speech_engine.set_backend("null")
+
+    controller = AssistantController(wake_word=voice)
+    daemon = JsonRpcDaemon(controller, path)
+    controller.loop.submit(daemon.start()).result()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.loop.submit(daemon.stop()).result(timeout=5)
+        controller.pause_wake_word()
+
+
+# ---------------- CLIENT ----------------
+class DaemonClient:
+    """Minimal blocking client, one request at a time."""
+
+    def __init__(self, path: str = DEFAULT_SOCKET, timeout: float = 60.0):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self._file = self.sock.makefile("rb")
+        self._ids = 0
+
+    def call(self, method: str, on_notification=None, **params):
+        self._ids += 1
+        req_id = self._ids
+        payload = {"jsonrpc": "2.0", "id": req_id, "method": method, "params": params}
+        self.sock.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+        while True:
+            line = self._file.readline()
+            if not line:
+                raise ConnectionError("daemon closed the connection")
+            message = json.loads(line)
+            if message.get("id") != req_id:
+                if on_notification is not None and "method" in message:
+                    on_notification(message["method"], message.get("params"))
+                continue
+            if "error" in message:
+                raise RpcError(message["error"]["code"], message["error"]["message"])
+            return message["result"]
+
+    def close(self):
+        self._file.close()
+        self.sock.close()
+
+
+def _load_test(path: str, text: str, repeat: int, concurrency: int) -> Dict[str, float]:
+    def worker(n: int):
+        client = DaemonClient(path)
+        try:
+            samples = []
+            for _ in range(n):
+                start = time.perf_counter()
+                client.call("submit", text=text)
+                samples.append(time.perf_counter() - start)
+            return samples
+        finally:
+            client.close()
+
+    shares = [repeat // concurrency + (1 if i < repeat % concurrency else 0) for i in range(concurrency)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = [s for part in pool.map(worker, shares) for s in part]
+    elapsed = time.perf_counter() - start
+
+    samples.sort()
+    return {
+        "commands": len(samples),
+        "seconds": elapsed,
+        "throughput_per_s": len(samples) / elapsed if elapsed else 0.0,
+        "p50_ms": samples[len(samples) // 2] * 1000,
+        "p95_ms": samples[round(0.95 * (len(samples) - 1))] * 1000,
+        "max_ms": samples[-1] * 1000,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Talk to a running OrbitOS daemon.")
+    parser.add_argument("text", nargs="?", help="command to submit")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET)
+    parser.add_argument("--status", action="store_true", help="print daemon status")
+    parser.add_argument("--repeat", type=int, default=1, help="submit the command N times")
+    parser.add_argument("--concurrency", type=int, default=1, help="parallel connections")
+    args = parser.parse_args()
+
+    if args.status or not args.text:
+        client = DaemonClient(args.socket)
+        print(json.dumps(client.call("status"), indent=2))
+        client.close()
+    elif args.repeat > 1:
+        print(json.dumps(_load_test(args.socket, args.text, args.repeat, args.concurrency), indent=2))
+    else:
+        client = DaemonClient(args.socket)
+        result = client.call(
+            "submit", text=args.text, stream=True,
+            on_notification=lambda method, params: print(" ", params.get("text")),
+        )
+        print(result["reply"])
+        print(f"({result['latency_ms']:.1f} ms)")
+        client.close()
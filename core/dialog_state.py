@@ -6,19 +6,16 @@ class PendingAction:
         self,
         description: str,
         do: Callable[[], str],
-        undo: Optional[Callable[[], str]] = None,
         options: Optional[List[str]] = None
     ):
         self.description = description
         self.do = do
-        self.undo = undo
         self.options = options or []
 
 
 class DialogState:
     def __init__(self):
         self.pending: Optional[PendingAction] = None
-        self.last_action: Optional[PendingAction] = None
 
     # ---------------- CONFIRM ----------------
     def set_pending(self, action: PendingAction):
@@ -29,7 +26,6 @@ class DialogState:
             return "There is nothing to confirm."
 
         result = self.pending.do()
-        self.last_action = self.pending
         self.pending = None
         return result
 
@@ -37,15 +33,6 @@ class DialogState:
         self.pending = None
         return "Cancelled."
 
-    # ---------------- UNDO ----------------
-    def undo(self) -> str:
-        if not self.last_action or not self.last_action.undo:
-            return "There is nothing to undo."
-
-        result = self.last_action.undo()
-        self.last_action = None
-        return result
-
     # ---------------- SELECTION ----------------
     def select(self, index: int) -> str:
         if not self.pending or not self.pending.options:
@@ -0,0 +1,58 @@
+# core/disk_lru.py
+"""
+Size-bounded folders of cache files (core/tts_cache.py, core/llm_cache.py).
+
+A file's access time is its last use (a cache hit sets it with
+os.utime) and eviction deletes the least recently used first. Its
+modification time is when it was stored, which is what a TTL counts from.
+Several processes may share a folder, so a file can disappear between
+listing it and deleting it; that is not an error.
+"""
+
+import time
+from pathlib import Path
+from typing import Optional
+
+# eviction goes this far below the limit, so it doesn't run on every put
+HEADROOM = 0.9
+
+
+def disk_usage(folder: Path, pattern: str) -> int:
+    total = 0
+    for p in folder.glob(pattern):
+        try:
+            total += p.stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+def evict(folder: Path, pattern: str, max_bytes: int, ttl: Optional[float] = None) -> int:
+    """
+    Delete the least recently used files until the rest fit in HEADROOM of
+    `max_bytes`, and any stored longer than `ttl` ago. Returns the bytes left.
+    """
+    files = []
+    for p in folder.glob(pattern):
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        files.append((st.st_atime, st.st_mtime, st.st_size, p))
+    files.sort(key=lambda f: f[0])
+
+    total = sum(size for _, _, size, _ in files)
+    now = time.time()
+    # expired files anywhere in the order go too
+    for _, mtime, size, p in files:
+        expired = ttl is not None and now - mtime > ttl
+        if total <= max_bytes * HEADROOM and not expired:
+            continue
+        try:
+            p.unlink()
+        except FileNotFoundError:
+            pass  # evicted by another process
+        except OSError:
+            continue
+        total -= size
+    return total
@@ -0,0 +1,60 @@
+# core/event_loop.py
+"""
+A single asyncio event loop running in its own daemon thread.
+
+The controller schedules its pipelines here instead of starting a new
+thread per listen / reply. Blocking work (microphone, skills, OCR) is
+awaited through `run_blocking`, which uses a small fixed thread pool.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Coroutine
+
+DEFAULT_WORKERS = 4
+
+
+class EventLoopThread:
+    def __init__(self, name: str = "orbit-loop", workers: int = DEFAULT_WORKERS):
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"{name}-worker"
+        )
+        self.loop.set_default_executor(self.executor)
+
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._ready.set)
+        self.loop.run_forever()
+
+    def in_loop(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Schedule a coroutine from any thread; returns a concurrent Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, fn: Callable, *args):
+        """Run a plain callback on the loop thread."""
+        if self.in_loop():
+            fn(*args)
+        else:
+            self.loop.call_soon_threadsafe(fn, *args)
+
+    async def run_blocking(self, fn: Callable, *args, **kwargs) -> Any:
+        """Await a blocking call on the worker pool."""
+        return await self.loop.run_in_executor(
+            None, functools.partial(fn, *args, **kwargs)
+        )
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=2)
+        self.executor.shutdown(wait=False)
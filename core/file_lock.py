@@ -0,0 +1,35 @@
+# core/file_lock.py
+"""
+Exclusive lock between processes on a lock file: fcntl on POSIX, msvcrt on
+Windows. The stores several processes share (the action journal, the chat
+log) hold it while they change their files.
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt  # type: ignore
+except ImportError:
+    msvcrt = None
+
+
+@contextmanager
+def locked_file(path: Path | str):
+    """Block until no other process holds `path`, then hold it."""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is None and msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
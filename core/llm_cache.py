@@ -0,0 +1,169 @@
+# core/llm_cache.py
+"""
+Cache of LLM replies, so asking the same thing again is answered
+instantly and offline.
+
+An entry is addressed by a hash of the model and the message history, with
+whitespace normalized, so the same question in the same context hits.
+Entries expire after a TTL (ORBIT_LLM_CACHE_TTL seconds, a week by
+default) and are stored as small JSON files on disk, size-bounded with
+the least recently used evicted first. An entry can carry a tag (the AI
+chat it was made for), so forget() removes a deleted chat's replies and
+summaries.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+from core.disk_lru import disk_usage, evict
+
+
+def _env_seconds(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"Ignoring {name}={value!r}: not a number of seconds")
+        return default
+
+
+DEFAULT_CACHE_DIR = Path.home() / ".orbitos" / "llm_cache"
+DEFAULT_TTL = _env_seconds("ORBIT_LLM_CACHE_TTL", 7 * 24 * 3600)
+MAX_DISK_BYTES = 32 * 1024 * 1024
+
+
+def _normalize(messages: List[dict]) -> list:
+    return [[m.get("role", ""), " ".join(str(m.get("content", "")).split())] for m in messages]
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        cache_dir: Path | str = DEFAULT_CACHE_DIR,
+        ttl: float = DEFAULT_TTL,
+        max_disk_bytes: int = MAX_DISK_BYTES,
+    ):
+        self.dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_disk_bytes = max_disk_bytes
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._disk_bytes = disk_usage(self.dir, "*.json")
+
+    @staticmethod
+    def key(model: str, messages: List[dict]) -> str:
+        payload = json.dumps([model, _normalize(messages)], ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, model: str, messages: List[dict]) -> Optional[str]:
+        path = self.dir / f"{self.key(model, messages)}.json"
+        reply = None
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            if time.time() - entry["t"] <= self.ttl:
+                reply = entry["reply"]
+                # access time for eviction; the modification time stays
+                # the entry's "t", which the TTL counts from (disk_lru)
+                os.utime(path, (time.time(), entry["t"]))
+            else:
+                self._remove(path)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError):
+            self._remove(path)
+
+        with self._lock:
+            if reply is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return reply
+
+    def put(self, model: str, messages: List[dict], reply: str, tag: Optional[str] = None):
+        if not reply:
+            return
+        path = self.dir / f"{self.key(model, messages)}.json"
+        # unique per writer, so two writers of one key don't share it
+        tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        now = time.time()
+        entry = {"t": now, "model": model, "reply": reply}
+        if tag:
+            entry["tag"] = tag
+        try:
+            tmp.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+            os.utime(tmp, (now, now))
+            # under the lock, so concurrent overwrites are counted once each
+            with self._lock:
+                try:
+                    old = path.stat().st_size
+                except FileNotFoundError:
+                    old = 0
+                os.replace(tmp, path)
+                size = path.stat().st_size
+                self._disk_bytes += size - old
+                over = self._disk_bytes > self.max_disk_bytes
+        except OSError as e:
+            print("LLM cache write error:", repr(e))
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            return
+        if over:
+            self._evict_disk()
+
+    def _remove(self, path: Path):
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return
+        with self._lock:
+            self._disk_bytes -= size
+
+    def _evict_disk(self):
+        total = evict(self.dir, "*.json", self.max_disk_bytes, ttl=self.ttl)
+        with self._lock:
+            self._disk_bytes = total
+
+    def forget(self, tag: str):
+        """Remove every entry put with `tag`."""
+        for p in self.dir.glob("*.json"):
+            try:
+                entry = json.loads(p.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if isinstance(entry, dict) and entry.get("tag") == tag:
+                self._remove(p)
+
+    def clear(self):
+        for p in self.dir.glob("*.json"):
+            try:
+                p.unlink()
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "disk_bytes": self._disk_bytes,
+                "ttl": self.ttl,
+            }
@@ -1,23 +1,578 @@
+# core/llm_client.py
+"""
+HTTP client for the chat model.
+
+Settings come from ~/.orbitos/llm.json (or the file named by
+ORBIT_LLM_CONFIG), overridden by ORBIT_LLM_URL, ORBIT_LLM_MODEL and
+ORBIT_LLM_API_KEY:
+
+    {"base_url": "http://localhost:8000/chat", "model": "gpt-4",
+     "endpoints": {"llama3": "http://localhost:11434/api/chat"},
+     "retries": 3, "backoff": 0.5, "timeout": 60, "pool_size": 8}
+
+`endpoints` sends a model to its own URL, and "cache": false turns off
+the reply cache (core/llm_cache.py); a single call can skip it too, or
+tag its reply (cache_tag) for ResponseCache.forget(). Only a streamed
+reply the server marked as finished is cached. Requests go through one pooled
+keep-alive session and are retried with exponential backoff on
+connection errors and on 429/5xx (honouring Retry-After). A request can
+be cancelled with a threading.Event, or all at once with cancel_all():
+a watcher thread closes its connection, also while waiting for the
+first byte.
+
+AsyncLLMClient is the asyncio version, on httpx when it is installed, so
+many chats can be in flight without a thread each.
+"""
+
+import asyncio
+import json
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Set
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as Urllib3Error  # type: ignore
+from urllib3.util.retry import Retry  # type: ignore
+
+from core.llm_cache import ResponseCache
+
+DEFAULT_CONFIG_FILE = Path.home() / ".orbitos" / "llm.json"
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# how often cancel events are checked while a request is in flight
+CANCEL_POLL = 0.05
+
+
+@dataclass
+class LLMConfig:
+    base_url: str = "http://localhost:8000/chat"
+    model: str = "gpt-4"
+    api_key: str = ""
+    endpoints: Dict[str, str] = field(default_factory=dict)
+    retries: int = 3
+    backoff: float = 0.5
+    connect_timeout: float = 10.0
+    # the longest wait for the reply (or between two streamed chunks)
+    timeout: float = 60.0
+    pool_size: int = 8
+    cache: bool = True
+
+    def url_for(self, model: str) -> str:
+        return self.endpoints.get(model, self.base_url)
+
+
+def load_config(path: Optional[str] = None) -> LLMConfig:
+    path = path or os.getenv("ORBIT_LLM_CONFIG") or str(DEFAULT_CONFIG_FILE)
+    values: dict = {}
+    if os.path.exists(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                values = json.load(f)
+        except (OSError, ValueError) as e:
+            print("Ignoring bad LLM config:", repr(e))
+    known = {f.name for f in fields(LLMConfig)}
+    config = LLMConfig(**{k: v for k, v in values.items() if k in known})
+
+    config.base_url = os.getenv("ORBIT_LLM_URL", config.base_url)
+    config.model = os.getenv("ORBIT_LLM_MODEL", config.model)
+    config.api_key = os.getenv("ORBIT_LLM_API_KEY", config.api_key)
+    return config
+
+
+class LLMCancelled(Exception):
+    pass
+
+
+def _delta_text(chunk: dict) -> str:
+    """Text of one streamed chunk, for the common server formats."""
+    choices = chunk.get("choices")
+    if choices:
+        # OpenAI-compatible: delta while streaming, message otherwise
+        part = choices[0].get("delta") or choices[0].get("message") or {}
+        return part.get("content") or ""
+    if isinstance(chunk.get("message"), dict):
+        # Ollama /api/chat
+        return chunk["message"].get("content") or ""
+    return chunk.get("response") or ""
+
+
+def _reply_text(data) -> str:
+    """The reply in a whole JSON body; ValueError if the schema is unknown."""
+    if isinstance(data, dict) and (
+        "choices" in data or isinstance(data.get("message"), dict) or "response" in data
+    ):
+        return _delta_text(data)
+    raise ValueError(f"Unexpected LLM reply: {json.dumps(data)[:200]}")
+
+
+def _parse_stream_line(raw: bytes):
+    """
+    One line of a streamed reply -> (text, finished), or None for lines
+    that carry nothing (keep-alives, SSE comments and fields).
+    """
+    # bytes: SSE has no charset parameter, the data is UTF-8
+    line = raw.decode("utf-8").strip()
+    if not line or line.startswith(":"):
+        return None
+    if line.startswith("data:"):
+        line = line[5:].strip()
+        if line == "[DONE]":
+            return "", True
+    elif line.startswith(("event:", "id:", "retry:")):
+        return None
+    chunk = json.loads(line)
+    return _delta_text(chunk), bool(chunk.get("done"))
+
+
+class _Reply:
+    """A streamed reply so far, and whether the server said it was finished."""
 
-class LLMClient:
     def __init__(self):
-        # configure your default model / endpoint here
-        self.default_model = "gpt-4"
-        self.base_url = "http://localhost:8000/chat"  # example
-        self.api_key = ""  # if needed
+        self.parts: List[str] = []
+        self.complete = False
+
+    def add(self, text: str) -> str:
+        self.parts.append(text)
+        return text
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+def _retry_delay(config: LLMConfig, attempt: int, retry_after: Optional[str] = None) -> float:
+    if retry_after:
+        try:
+            return min(float(retry_after), 30.0)
+        except ValueError:
+            pass
+    # exponential with jitter, so parallel chats don't retry in lockstep
+    return config.backoff * (2 ** attempt) * (0.5 + random.random())
+
+
+def _iter_lines(resp: requests.Response) -> Iterator[bytes]:
+    """
+    Lines of a streamed body as soon as each arrives; iter_lines() waits
+    for 512 bytes, which holds back short SSE events.
+    """
+    read1 = getattr(resp.raw, "read1", None)
+    if read1 is None:
+        # urllib3 < 2
+        yield from resp.iter_lines(chunk_size=1)
+        return
+    buf = b""
+    while True:
+        data = read1(8192, decode_content=True)
+        if not data:
+            break
+        *lines, buf = (buf + data).split(b"\n")
+        yield from lines
+    if buf:
+        yield buf
+
+
+def _abort(resp: requests.Response):
+    """Close a response, waking a thread blocked reading it."""
+    # close() alone leaves a blocked recv() waiting for the next byte
+    fp = getattr(resp.raw, "_fp", None)
+    sock = getattr(getattr(getattr(fp, "fp", None), "raw", None), "_sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    resp.close()
+
 
-    def chat(self, messages, model: str | None = None) -> str:
-        model = model or self.default_model
+def _close_later(future):
+    # the response of a request given up on while waiting for it
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _make_cache(config: LLMConfig) -> Optional[ResponseCache]:
+    if not config.cache:
+        return None
+    try:
+        return ResponseCache()
+    except OSError as e:
+        print("LLM cache disabled:", repr(e))
+        return None
+
+
+class LLMClient:
+    def __init__(self, config: Optional[LLMConfig] = None, cache: Optional[ResponseCache] = None):
+        self.config = config or load_config()
+        self.cache = cache or _make_cache(self.config)
+        self.session = requests.Session()
+        # retries happen before any of the reply is read, so a streamed
+        # reply is never repeated halfway
+        retry = Retry(
+            total=self.config.retries,
+            connect=self.config.retries,
+            read=0,
+            status=self.config.retries,
+            status_forcelist=RETRY_STATUS,
+            allowed_methods=frozenset({"POST"}),
+            backoff_factor=self.config.backoff,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.config.pool_size,
+            pool_maxsize=self.config.pool_size,
+            max_retries=retry,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # request in flight -> its cancel event; the first byte is waited
+        # for on these threads, so a cancel doesn't have to wait for it
+        self._active: Dict[requests.Response, threading.Event] = {}
+        self._waiting: Set[threading.Event] = set()
+        self._lock = threading.Condition()
+        self._closed = False
+        self._watcher: Optional[threading.Thread] = None
+        self._posts = ThreadPoolExecutor(self.config.pool_size, thread_name_prefix="llm-post")
+
+    # kept for callers that set these directly
+    @property
+    def default_model(self) -> str:
+        return self.config.model
+
+    @property
+    def base_url(self) -> str:
+        return self.config.base_url
+
+    @base_url.setter
+    def base_url(self, url: str):
+        self.config.base_url = url
+
+    def _headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.config.api_key}"} if self.config.api_key else {}
+
+    def _post(self, messages, model: Optional[str], stream: bool, cancel: threading.Event) -> requests.Response:
+        model = model or self.config.model
+        payload = {"model": model, "messages": messages}
+        if stream:
+            payload["stream"] = True
+        with self._lock:
+            if self._closed:
+                raise LLMCancelled()
+            self._waiting.add(cancel)
+        try:
+            future = self._posts.submit(
+                self.session.post,
+                self.config.url_for(model),
+                json=payload,
+                headers=self._headers(),
+                # always streamed, so a cancel can close it mid-body
+                stream=True,
+                timeout=(self.config.connect_timeout, self.config.timeout),
+            )
+            while True:
+                try:
+                    resp = future.result(timeout=CANCEL_POLL)
+                    break
+                except FutureTimeout:
+                    if cancel.is_set():
+                        future.add_done_callback(_close_later)
+                        raise LLMCancelled() from None
+        finally:
+            with self._lock:
+                self._waiting.discard(cancel)
+
+        with self._lock:
+            if cancel.is_set():
+                resp.close()
+                raise LLMCancelled()
+            self._active[resp] = cancel
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name="llm-cancel", daemon=True)
+                self._watcher.start()
+            self._lock.notify()
+        return resp
+
+    def _watch(self):
+        """Abort the responses whose cancel event was set."""
+        while True:
+            with self._lock:
+                while not self._active and not self._closed:
+                    self._lock.wait()
+                if self._closed and not self._active:
+                    return
+                cancelled = [r for r, event in self._active.items() if event.is_set()]
+                for resp in cancelled:
+                    del self._active[resp]
+            for resp in cancelled:
+                _abort(resp)
+            time.sleep(CANCEL_POLL)
+
+    def _done(self, resp: requests.Response):
+        with self._lock:
+            self._active.pop(resp, None)
+        resp.close()
+
+    def cancel_all(self):
+        """Abort every request in flight; their callers get LLMCancelled."""
+        with self._lock:
+            events = list(self._active.values()) + list(self._waiting)
+        for event in events:
+            event.set()
+
+    def _check(self, resp: requests.Response, cancel: threading.Event):
+        if cancel.is_set() or resp not in self._active:
+            raise LLMCancelled()
+
+    def chat(
+        self,
+        messages,
+        model: str | None = None,
+        cancel: Optional[threading.Event] = None,
+        use_cache: bool = True,
+        cache_tag: Optional[str] = None,
+    ) -> str:
         # messages: list[{"role": "user"/"assistant"/"system", "content": "..."}]
+        model = model or self.config.model
+        cache = self.cache if use_cache else None
+        if cache is not None:
+            cached = cache.get(model, messages)
+            if cached is not None:
+                return cached
+        reply = self._chat(messages, model, cancel or threading.Event())
+        if cache is not None:
+            cache.put(model, messages, reply, cache_tag)
+        return reply
+
+    def _chat(self, messages, model: str, cancel: threading.Event) -> str:
+        resp = self._post(messages, model, stream=False, cancel=cancel)
+        try:
+            resp.raise_for_status()
+            body = bytearray()
+            try:
+                for part in resp.iter_content(8192):
+                    self._check(resp, cancel)
+                    body += part
+            except (requests.ConnectionError, AttributeError, ValueError):
+                # the connection was closed under us by a cancel
+                self._check(resp, cancel)
+                raise
+            self._check(resp, cancel)
+            return _reply_text(json.loads(body))
+        finally:
+            self._done(resp)
+
+    def chat_stream(
+        self,
+        messages,
+        model: str | None = None,
+        cancel: Optional[threading.Event] = None,
+        use_cache: bool = True,
+        cache_tag: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        Like chat(), but yields the reply in pieces as the server produces
+        them. Understands server-sent events ("data: {...}" lines ending
+        with "data: [DONE]") and newline-delimited JSON chunks; a server
+        that ignores "stream" and answers with one JSON body yields it whole.
+        A cached reply is yielded whole.
+        """
+        model = model or self.config.model
+        cache = self.cache if use_cache else None
+        if cache is not None:
+            cached = cache.get(model, messages)
+            if cached is not None:
+                yield cached
+                return
+        reply = _Reply()
+        yield from self._chat_stream(messages, model, cancel or threading.Event(), reply)
+        # a reply cut off by a dropped connection is not cached
+        if cache is not None and reply.complete:
+            cache.put(model, messages, reply.text, cache_tag)
+
+    def _chat_stream(self, messages, model: str, cancel: threading.Event, reply: _Reply) -> Iterator[str]:
+        resp = self._post(messages, model, stream=True, cancel=cancel)
+        try:
+            resp.raise_for_status()
+            if resp.headers.get("Content-Type", "").startswith("application/json"):
+                yield reply.add(_reply_text(resp.json()))
+                reply.complete = True
+                return
+            try:
+                for raw in _iter_lines(resp):
+                    self._check(resp, cancel)
+                    parsed = _parse_stream_line(raw)
+                    if parsed is None:
+                        continue
+                    text, finished = parsed
+                    if text:
+                        yield reply.add(text)
+                    if finished:
+                        reply.complete = True
+                        return
+            except (requests.ConnectionError, Urllib3Error, AttributeError, ValueError):
+                self._check(resp, cancel)
+                raise
+            # a closed connection just ends the lines
+            self._check(resp, cancel)
+        finally:
+            self._done(resp)
+
+    def close(self):
+        self.cancel_all()
+        with self._lock:
+            self._closed = True
+            self._lock.notify()
+        self._posts.shutdown(wait=False)
+        self.session.close()
+
+
+class AsyncLLMClient:
+    """
+    asyncio version of LLMClient; cancel a call by cancelling its task.
+    Uses httpx when installed, otherwise runs LLMClient on worker threads.
+    """
+
+    def __init__(self, config: Optional[LLMConfig] = None, cache: Optional[ResponseCache] = None):
+        self.config = config or load_config()
+        self.cache = cache or _make_cache(self.config)
+        try:
+            import httpx  # type: ignore
+        except ImportError:
+            httpx = None
+        self._httpx = httpx
+        self._client = None
+        self._sync: Optional[LLMClient] = None
+        if httpx is None:
+            print("httpx not installed; AsyncLLMClient uses worker threads")
+            self._sync = LLMClient(self.config, self.cache)
 
-        resp = requests.post(
-            self.base_url,
-            json={"model": model, "messages": messages},
-            headers={"Authorization": f"Bearer {self.api_key}"} if self.api_key else {},
-            timeout=60,
+    def _http(self):
+        # created on first use, inside the loop that uses it
+        if self._client is None:
+            limits = self._httpx.Limits(
+                max_connections=self.config.pool_size,
+                max_keepalive_connections=self.config.pool_size,
+            )
+            timeout = self._httpx.Timeout(self.config.timeout, connect=self.config.connect_timeout)
+            self._client = self._httpx.AsyncClient(
+                limits=limits,
+                timeout=timeout,
+                transport=self._httpx.AsyncHTTPTransport(retries=self.config.retries),
+            )
+        return self._client
+
+    def _request(self, messages, model: Optional[str], stream: bool):
+        model = model or self.config.model
+        payload = {"model": model, "messages": messages}
+        if stream:
+            payload["stream"] = True
+        headers = {"Authorization": f"Bearer {self.config.api_key}"} if self.config.api_key else {}
+        return self._http().build_request("POST", self.config.url_for(model), json=payload, headers=headers)
+
+    async def _send(self, messages, model: Optional[str], stream: bool):
+        """Send with retries on 429/5xx; returns an open streamed response."""
+        # connection errors are retried by the transport
+        for attempt in range(self.config.retries + 1):
+            resp = await self._http().send(self._request(messages, model, stream), stream=True)
+            if resp.status_code not in RETRY_STATUS or attempt == self.config.retries:
+                if resp.is_error:
+                    # free the connection before raising
+                    await resp.aclose()
+                    resp.raise_for_status()
+                return resp
+            await resp.aclose()
+            await asyncio.sleep(_retry_delay(self.config, attempt, resp.headers.get("Retry-After")))
+        raise AssertionError("unreachable")
+
+    async def chat(
+        self, messages, model: str | None = None, use_cache: bool = True, cache_tag: Optional[str] = None
+    ) -> str:
+        if self._sync is not None:
+            return await asyncio.to_thread(self._sync.chat, messages, model, None, use_cache, cache_tag)
+        model = model or self.config.model
+        cache = self.cache if use_cache else None
+        if cache is not None:
+            cached = cache.get(model, messages)
+            if cached is not None:
+                return cached
+        resp = await self._send(messages, model, stream=False)
+        try:
+            reply = _reply_text(json.loads(await resp.aread()))
+        finally:
+            await resp.aclose()
+        if cache is not None:
+            cache.put(model, messages, reply, cache_tag)
+        return reply
+
+    async def chat_stream(
+        self, messages, model: str | None = None, use_cache: bool = True, cache_tag: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        if self._sync is not None:
+            async for text in self._thread_stream(messages, model, use_cache, cache_tag):
+                yield text
+            return
+
+        model = model or self.config.model
+        cache = self.cache if use_cache else None
+        if cache is not None:
+            cached = cache.get(model, messages)
+            if cached is not None:
+                yield cached
+                return
+        reply = _Reply()
+        async for text in self._stream(messages, model, reply):
+            yield text
+        if cache is not None and reply.complete:
+            cache.put(model, messages, reply.text, cache_tag)
+
+    async def _stream(self, messages, model: str, reply: _Reply) -> AsyncIterator[str]:
+        resp = await self._send(messages, model, stream=True)
+        try:
+            if resp.headers.get("Content-Type", "").startswith("application/json"):
+                yield reply.add(_reply_text(json.loads(await resp.aread())))
+                reply.complete = True
+                return
+            async for line in resp.aiter_lines():
+                parsed = _parse_stream_line(line.encode("utf-8"))
+                if parsed is None:
+                    continue
+                text, finished = parsed
+                if text:
+                    yield reply.add(text)
+                if finished:
+                    reply.complete = True
+                    return
+        finally:
+            await resp.aclose()
+
+    async def _thread_stream(
+        self, messages, model: Optional[str], use_cache: bool, cache_tag: Optional[str]
+    ) -> AsyncIterator[str]:
+        cancel = threading.Event()
+        it = self._sync.chat_stream(  # type: ignore[union-attr]
+            messages, model, cancel=cancel, use_cache=use_cache, cache_tag=cache_tag
         )
-        resp.raise_for_status()
-        data = resp.json()
-        # adapt to your API schema:
-        return data["choices"][0]["message"]["content"]
+        done = object()
+        try:
+            while True:
+                text = await asyncio.to_thread(next, it, done)
+                if text is done:
+                    return
+                yield text  # type: ignore[misc]
+        finally:
+            cancel.set()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._sync is not None:
+            self._sync.close()
@@ -0,0 +1,261 @@
+# core/phonetic_matcher.py
+"""
+Phonetic wake phrase matching.
+
+Every wake phrase is reduced once to a Metaphone-style key ("orbit" -> "ORBT").
+Recognized text is split into words, consecutive words are joined into
+windows, and each window key is compared with the phrase keys by edit
+distance. "or bit", "or but" and "orbit," all reduce to the same key, so no
+hand-maintained list of misrecognitions is needed.
+
+A window never starts on a function word ("a robot" is not "arbit"), unless
+the word begins a wake phrase word, as "or" does "orbit". Only same-length
+keys are compared, so "orb" and "orbital" don't match either; a plural or
+possessive "s" is dropped first ("orbits").
+
+Run `python -m core.phonetic_matcher` to measure false accepts, false rejects
+and per-call cost against data/wake_word_corpus.csv.
+"""
+
+import csv
+import re
+import time
+from functools import lru_cache
+from typing import Iterable, List, Set, Tuple
+
+DEFAULT_THRESHOLD = 0.25
+CORPUS_PATH = "data/wake_word_corpus.csv"
+
+_VOWELS = set("aeiou")
+_WORD_RE = re.compile(r"[a-z']+")
+FUNCTION_WORDS = frozenset((
+    "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "at", "by",
+    "for", "with", "is", "it", "its", "this", "that", "my", "your", "our",
+))
+
+
+@lru_cache(maxsize=4096)
+def phonetic_key(word: str) -> str:
+    """
+    Simplified Metaphone encoding of a single word.
+    An initial vowel is kept, later vowels are dropped.
+    """
+    w = "".join(ch for ch in word.lower() if ch.isalpha())
+    if not w:
+        return ""
+
+    if w[:2] in ("kn", "gn", "pn", "ae", "wr"):
+        w = w[1:]
+    if w[0] == "x":
+        w = "s" + w[1:]
+    if w[:2] == "wh":
+        w = "w" + w[2:]
+
+    out: List[str] = []
+    n = len(w)
+
+    for i, c in enumerate(w):
+        prev = w[i - 1] if i > 0 else ""
+        nxt = w[i + 1] if i + 1 < n else ""
+        nxt2 = w[i + 2] if i + 2 < n else ""
+
+        if c == prev and c != "c":
+            continue
+
+        if c in _VOWELS:
+            if i == 0:
+                out.append(c.upper())
+            continue
+
+        if c == "b":
+            if not (prev == "m" and i == n - 1):
+                out.append("B")
+        elif c == "c":
+            if nxt == "h" or (nxt == "i" and nxt2 == "a"):
+                out.append("X")
+            elif nxt in ("i", "e", "y"):
+                out.append("S")
+            else:
+                out.append("K")
+        elif c == "d":
+            out.append("J" if nxt == "g" and nxt2 in ("e", "i", "y") else "T")
+        elif c == "g":
+            if nxt == "h" and nxt2 and nxt2 not in _VOWELS:
+                continue
+            if nxt == "n" and i + 2 >= n:
+                continue
+            out.append("J" if nxt in ("i", "e", "y") else "K")
+        elif c == "h":
+            if nxt in _VOWELS and prev not in ("c", "g", "p", "s", "t"):
+                out.append("H")
+        elif c == "k":
+            if prev != "c":
+                out.append("K")
+        elif c == "p":
+            out.append("F" if nxt == "h" else "P")
+        elif c == "q":
+            out.append("K")
+        elif c == "s":
+            if nxt == "h" or (nxt == "i" and nxt2 in ("o", "a")):
+                out.append("X")
+            else:
+                out.append("S")
+        elif c == "t":
+            if nxt == "i" and nxt2 in ("o", "a"):
+                out.append("X")
+            elif nxt == "h":
+                out.append("0")
+            elif not (nxt == "c" and nxt2 == "h"):
+                out.append("T")
+        elif c == "v":
+            out.append("F")
+        elif c in ("w", "y"):
+            if nxt in _VOWELS:
+                out.append(c.upper())
+        elif c == "x":
+            out.append("KS")
+        elif c == "z":
+            out.append("S")
+        else:
+            out.append(c.upper())
+
+    return "".join(out)
+
+
+def _edit_distance(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def _same_onset(a: str, b: str) -> bool:
+    return a == b or (a.lower() in _VOWELS and b.lower() in _VOWELS)
+
+
+def _stem(word: str) -> str:
+    """Drop a plural or possessive "s" ("orbits", "orbit's")."""
+    if word.endswith("'s"):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+class PhoneticMatcher:
+    """
+    Matches recognized text against a fixed set of wake phrases.
+
+    `threshold` is the accepted edit distance as a fraction of the phrase key
+    length (0.25 allows one edit in "ORBT"). The first key character must
+    match (any vowel matches any vowel, but only the first letter of a word
+    that may open a window), so "rabbit", "a robot" or "the orb" do not wake
+    the assistant.
+    """
+
+    def __init__(self, wake_phrases: Iterable[str], threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.phrases: List[str] = []
+        self._keys: List[Tuple[str, int]] = []
+        self._max_words = 1
+        # function words that begin a wake phrase word ("or" -> "orbit")
+        self._openers: Set[str] = set()
+        self.compile(wake_phrases)
+
+    def compile(self, wake_phrases: Iterable[str]):
+        self.phrases = [p.lower().strip() for p in wake_phrases if p and p.strip()]
+        keys = {}
+        max_words = 1
+        for phrase in self.phrases:
+            words = _WORD_RE.findall(phrase)
+            key = "".join(phonetic_key(w) for w in words)
+            if key:
+                keys[key] = int(len(key) * self.threshold)
+                max_words = max(max_words, len(words))
+        self._keys = list(keys.items())
+        phrase_words = {w for p in self.phrases for w in _WORD_RE.findall(p)}
+        self._openers = {
+            f for f in FUNCTION_WORDS
+            if any(w.startswith(f) for w in phrase_words)
+        }
+        # "or bit" splits one wake word in two, so allow one extra word
+        self._max_words = max_words + 1
+
+    def matches(self, text: str) -> bool:
+        words = [(w, phonetic_key(_stem(w))) for w in _WORD_RE.findall(text.lower())]
+        words = [(w, k) for w, k in words if k]
+
+        for start in range(len(words)):
+            first = words[start][0]
+            if first in FUNCTION_WORDS and first not in self._openers:
+                continue
+            window = ""
+            for end in range(start, min(start + self._max_words, len(words))):
+                window += words[end][1]
+                for key, allowed in self._keys:
+                    if not _same_onset(window[0], key[0]):
+                        continue
+                    if len(window) != len(key):
+                        continue
+                    if _edit_distance(window, key) <= allowed:
+                        return True
+        return False
+
+
+def load_corpus(path: str = CORPUS_PATH) -> List[Tuple[str, bool]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return [
+            (row["text"], row["is_wake"].strip() == "1")
+            for row in csv.DictReader(f)
+        ]
+
+
+def evaluate(matcher: PhoneticMatcher, corpus: List[Tuple[str, bool]], repeats: int = 200) -> dict:
+    false_accepts = []
+    false_rejects = []
+    for text, expected in corpus:
+        got = matcher.matches(text)
+        if got and not expected:
+            false_accepts.append(text)
+        elif expected and not got:
+            false_rejects.append(text)
+
+    negatives = sum(1 for _, e in corpus if not e) or 1
+    positives = sum(1 for _, e in corpus if e) or 1
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for text, _ in corpus:
+            matcher.matches(text)
+    per_call = (time.perf_counter() - start) / (repeats * max(len(corpus), 1))
+
+    return {
+        "false_accept_rate": len(false_accepts) / negatives,
+        "false_reject_rate": len(false_rejects) / positives,
+        "false_accepts": false_accepts,
+        "false_rejects": false_rejects,
+        "per_call_us": per_call * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    from core.wakeword_engine import WAKE_WORDS
+
+    corpus = load_corpus()
+    for threshold in (0.0, 0.25, 0.5):
+        report = evaluate(PhoneticMatcher(WAKE_WORDS, threshold), corpus)
+        print(
+            f"threshold={threshold:.2f} "
+            f"FA={report['false_accept_rate']:.1%} "
+            f"FR={report['false_reject_rate']:.1%} "
+            f"cost={report['per_call_us']:.1f}us"
+        )
+        for text in report["false_accepts"]:
+            print("  false accept:", text)
+        for text in report["false_rejects"]:
+            print("  false reject:", text)
@@ -0,0 +1,117 @@
+# core/session.py
+"""
+Per-client sessions.
+
+A session carries everything that used to be a controller-wide global:
+dialog state (pending confirmations), last app matches, last reply,
+working directory and a short command history. Each remote session has
+its own CommandQueue, so commands from one client run in order while other
+sessions are served concurrently. The local sessions (UI text and voice)
+share one queue, as they share the working directory and undo history:
+a typed and a spoken command never run at the same time.
+
+The session a command belongs to is kept in a context variable, set by
+the controller for the command's task and for the skill thread running it.
+"""
+
+import contextvars
+import secrets
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from core.command_queue import CommandQueue
+from core.dialog_state import DialogState
+
+HISTORY_SIZE = 50
+
+_current: contextvars.ContextVar[Optional["Session"]] = contextvars.ContextVar(
+    "orbit_session", default=None
+)
+
+
+def current_session() -> Optional["Session"]:
+    return _current.get()
+
+
+def set_current_session(session: Optional["Session"]) -> contextvars.Token:
+    return _current.set(session)
+
+
+def reset_current_session(token: contextvars.Token):
+    _current.reset(token)
+
+
+class Session:
+    def __init__(self, session_id: str, working_dir: str, local: bool = False):
+        self.id = session_id
+        # local sessions (UI text, voice) belong to the user at this machine
+        self.local = local
+        self.working_dir = working_dir
+
+        self.dialog = DialogState()
+        self.last_matches: list = []
+        self.last_spoken: Optional[str] = None
+        # replies said so far: a reply equal to the last one still counts
+        self.spoken = 0
+        self.input_source = "text"
+        self.history: Deque[dict] = deque(maxlen=HISTORY_SIZE)
+        self.commands = CommandQueue()
+
+        self.created = time.time()
+        self.last_active = self.created
+
+    def record(self, source: str, text: str, reply: str):
+        self.last_active = time.time()
+        self.history.append({
+            "time": self.last_active,
+            "source": source,
+            "text": text,
+            "reply": reply,
+        })
+
+    def info(self) -> dict:
+        return {
+            "id": self.id,
+            "local": self.local,
+            "working_dir": self.working_dir,
+            "pending": self.dialog.pending.description if self.dialog.pending else None,
+            "commands": len(self.history),
+            "last_active": self.last_active,
+            "queue": self.commands.stats(),
+        }
+
+
+class SessionManager:
+    def __init__(self, working_dir: str):
+        self.working_dir = working_dir
+        self._sessions: Dict[str, Session] = {}
+
+    def get(self, session_id: str) -> Optional[Session]:
+        return self._sessions.get(session_id)
+
+    def get_or_create(self, session_id: Optional[str] = None, local: bool = False) -> Session:
+        if session_id is None:
+            # unguessable, so another client can't name it
+            session_id = f"session-{secrets.token_hex(8)}"
+            while session_id in self._sessions:
+                session_id = f"session-{secrets.token_hex(8)}"
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = Session(session_id, self.working_dir, local)
+            shared = self.local()
+            if local and shared:
+                session.commands = shared[0].commands
+            self._sessions[session_id] = session
+        return session
+
+    def close(self, session_id: str):
+        session = self._sessions.pop(session_id, None)
+        if session is not None and not session.local:
+            session.commands.close()
+
+    def all(self) -> List[Session]:
+        return list(self._sessions.values())
+
+    def local(self) -> List[Session]:
+        return [s for s in self._sessions.values() if s.local]
@@ -0,0 +1,135 @@
+# core/skill_executor.py
+"""
+Runs intent handlers (skills) on a bounded worker pool.
+
+Every intent has a SkillPolicy: a timeout and optionally a group with a
+concurrency limit (one screen analysis at a time, one app scan at a time).
+A thread cannot be killed, so a skill that timed out keeps its group slot
+until its thread really returns; a new request for that group is refused
+meanwhile instead of piling up more blocked workers.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+DEFAULT_WORKERS = 4
+DEFAULT_TIMEOUT = 30.0
+# speak a short acknowledgement when a skill takes longer than this
+ACK_AFTER = 2.0
+
+
+@dataclass(frozen=True)
+class SkillPolicy:
+    timeout: float = DEFAULT_TIMEOUT
+    group: Optional[str] = None
+    limit: int = 1
+
+
+DEFAULT_POLICY = SkillPolicy()
+
+POLICIES: Dict[str, SkillPolicy] = {
+    # network lookups (weather_skill has its own 10 s request timeout)
+    "weather_status": SkillPolicy(timeout=15.0),
+    "wiki_search": SkillPolicy(timeout=20.0),
+    # caption model load / OCR; one screen analysis at a time
+    "describe_screen": SkillPolicy(timeout=60.0, group="screen"),
+    "read_screen_text": SkillPolicy(timeout=60.0, group="screen"),
+    "foreground_window_info": SkillPolicy(timeout=10.0, group="screen"),
+    # ApplicationDiscovery runs a powershell scan on a cold cache
+    "open_application": SkillPolicy(timeout=60.0, group="apps"),
+    "list_installed_apps": SkillPolicy(timeout=60.0, group="apps"),
+    "refresh_apps": SkillPolicy(timeout=60.0, group="apps"),
+    "get_system_status": SkillPolicy(timeout=10.0),
+    "get_network_status": SkillPolicy(timeout=10.0),
+}
+
+
+class SkillTimeout(Exception):
+    def __init__(self, intent: Optional[str], timeout: float):
+        super().__init__(f"{intent or 'skill'} did not finish within {timeout:g}s")
+        self.intent = intent
+        self.timeout = timeout
+
+
+class SkillBusy(Exception):
+    def __init__(self, group: str):
+        super().__init__(f"a {group} skill is still running")
+        self.group = group
+
+
+class SkillExecutor:
+    """
+    Use from one asyncio loop (the controller's); counters are not locked.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        ack_after: float = ACK_AFTER,
+        policies: Optional[Dict[str, SkillPolicy]] = None,
+    ):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="orbit-skill")
+        self.ack_after = ack_after
+        self.policies = dict(POLICIES if policies is None else policies)
+        self._running: Dict[str, int] = {}
+
+        self.completed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.acks = 0
+
+    def policy(self, intent: Optional[str]) -> SkillPolicy:
+        return self.policies.get(intent or "", DEFAULT_POLICY)
+
+    async def run(self, intent: Optional[str], fn: Callable, on_slow: Optional[Callable[[], None]] = None):
+        """
+        Run `fn()` on the pool under the intent's policy. Raises SkillBusy if
+        the group is full and SkillTimeout if the budget runs out.
+        """
+        policy = self.policy(intent)
+        group = policy.group
+        if group and self._running.get(group, 0) >= policy.limit:
+            self.rejected += 1
+            raise SkillBusy(group)
+
+        loop = asyncio.get_running_loop()
+        if group:
+            self._running[group] = self._running.get(group, 0) + 1
+        future = loop.run_in_executor(self.pool, fn)
+        future.add_done_callback(lambda f: self._finished(f, group))
+
+        ack = None
+        if on_slow is not None and self.ack_after < policy.timeout:
+            ack = loop.call_later(self.ack_after, self._acknowledge, on_slow)
+        try:
+            # shield: a timeout or barge-in stops waiting, not the thread
+            return await asyncio.wait_for(asyncio.shield(future), policy.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise SkillTimeout(intent, policy.timeout) from None
+        finally:
+            if ack is not None:
+                ack.cancel()
+
+    def _acknowledge(self, on_slow: Callable[[], None]):
+        self.acks += 1
+        on_slow()
+
+    def _finished(self, future: asyncio.Future, group: Optional[str]):
+        if group:
+            self._running[group] -= 1
+        self.completed += 1
+        if not future.cancelled():
+            # mark the error retrieved; the caller may have stopped waiting
+            future.exception()
+
+    def stats(self) -> dict:
+        return {
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "acks": self.acks,
+            "running": {g: n for g, n in self._running.items() if n},
+        }
@@ -1,17 +1,481 @@
-import threading
+import heapq
+import io
+import itertools
+import os
 import queue
 import re
-import pythoncom
-import win32com.client
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterable, Iterator, List, Optional
 
+from core.tts_cache import Audio, PhraseCache, read_wav
 
 
+# Speech priorities. Urgent utterances (alarms, critical battery) interrupt
+# anything of lower priority; the interrupted remainder is queued again.
+PRIORITY_LOW = 0        # informational, long reads
+PRIORITY_NORMAL = 1
+PRIORITY_HIGH = 2
+PRIORITY_URGENT = 3
 
-_speech_queue = queue.Queue()
 _last_spoken_text = ""
 _muted = False
-_stop_flag = threading.Event()
 
+# Bumped by stop_speaking(); anything rendered or playing under an older
+# generation is dropped, so barge-in cannot race with the next utterance.
+_generation = 0
+_generation_lock = threading.Lock()
+
+# The backend is chosen lazily by the worker thread on the first speak(),
+# so importing this module never touches COM or an audio device.
+# ORBIT_TTS_BACKEND = sapi | pyttsx3 | espeak | null overrides auto-selection.
+# (validated below, once the backend names are known)
+_backend_choice: "str | TTSBackend | None" = os.environ.get("ORBIT_TTS_BACKEND")
+_backend: "Optional[TTSBackend]" = None
+_thread: Optional[threading.Thread] = None
+_thread_lock = threading.Lock()
+
+# Fixed prompts and often repeated phrases are rendered to PCM once and
+# replayed from the cache. Both need a PCM player (pyaudio); without one
+# every sentence goes straight to the backend.
+_cache_enabled = True
+_cache: Optional[PhraseCache] = None
+_player: "Optional[_PcmPlayer]" = None
+
+# Two-stage pipeline: the speech worker renders sentence N+1 while the
+# playback thread plays sentence N.
+_play_queue: queue.Queue = queue.Queue(maxsize=2)
+_play_thread: Optional[threading.Thread] = None
+
+_metrics_lock = threading.Lock()
+_ttfa_samples: deque = deque(maxlen=200)   # utterance queued -> first audio
+_gap_samples: deque = deque(maxlen=500)    # silence between sentences
+
+
+# ---------------- BACKENDS ----------------
+class TTSBackend:
+    """
+    A text-to-speech engine driven from the speech worker thread.
+    open() and close() run on that thread; stop() may be called from any
+    thread and should cut the current sentence short if the engine allows.
+    An engine that can only be stopped from its own thread overrides
+    speak_while() instead, or sets live_stop = False so sentences are
+    rendered to PCM and played through the interruptible player.
+    """
+
+    name = "base"
+    live_stop = True
+
+    @property
+    def voice(self) -> str:
+        """Identifies the rendered voice, part of the audio cache key."""
+        return self.name
+
+    def open(self):
+        pass
+
+    def speak(self, sentence: str):
+        raise NotImplementedError
+
+    def speak_while(self, sentence: str, active: Callable[[], bool]):
+        """Speak `sentence`, cut short once `active()` turns false."""
+        self.speak(sentence)
+
+    def synthesize(self, sentence: str) -> Optional[Audio]:
+        """Render to PCM without playing. None if the engine cannot."""
+        return None
+
+    def synthesize_stream(self, sentence: str) -> "Optional[PcmStream]":
+        """PCM delivered while it is rendered. None if the engine cannot."""
+        return None
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class PcmStream:
+    """
+    Audio that is still being rendered: `chunks` yields PCM as it becomes
+    available. `on_complete` gets the whole Audio once every chunk was read
+    (used to fill the cache); close() abandons the rest.
+    """
+
+    def __init__(self, rate: int, width: int, channels: int, chunks: Iterator[bytes]):
+        self.rate = rate
+        self.width = width
+        self.channels = channels
+        self._chunks = chunks
+        self.on_complete: Optional[Callable[[Audio], None]] = None
+
+    def __iter__(self) -> Iterator[bytes]:
+        parts = []
+        for chunk in self._chunks:
+            if self.on_complete is not None:
+                parts.append(chunk)
+            yield chunk
+        if self.on_complete is not None:
+            self.on_complete(Audio(b"".join(parts), self.rate, self.width, self.channels))
+
+    def close(self):
+        close = getattr(self._chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def _read_wav_header(f) -> tuple[int, int, int]:
+    """(rate, width, channels) from a WAV stream, left at the PCM data."""
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+        raise ValueError("not a WAV stream")
+    fmt = None
+    while True:
+        head = f.read(8)
+        if len(head) < 8:
+            raise ValueError("WAV stream has no data")
+        chunk_id, size = head[:4], struct.unpack("<I", head[4:])[0]
+        if chunk_id == b"data":
+            break
+        body = f.read(size + (size & 1))
+        if chunk_id == b"fmt ":
+            channels, rate = struct.unpack("<HI", body[2:8])
+            bits = struct.unpack("<H", body[14:16])[0]
+            fmt = (rate, bits // 8, channels)
+    if fmt is None:
+        raise ValueError("WAV stream has no format")
+    return fmt
+
+
+class SapiBackend(TTSBackend):
+    name = "sapi"
+    # SpeechVoiceSpeakFlags
+    ASYNC = 1
+    PURGE = 2
+    POLL_MS = 50
+
+    def open(self):
+        import pythoncom  # type: ignore
+        import win32com.client  # type: ignore
+
+        self._pythoncom = pythoncom
+        self._owner = threading.get_ident()
+        pythoncom.CoInitialize()
+        self.speaker = win32com.client.Dispatch("SAPI.SpVoice")
+
+    @property
+    def voice(self) -> str:
+        return f"sapi:{self.speaker.Voice.GetDescription()}"
+
+    def speak(self, sentence: str):
+        self.speaker.Speak(sentence, 0)
+
+    def speak_while(self, sentence: str, active: Callable[[], bool]):
+        # the voice only takes a purge from its own thread, so this thread
+        # watches `active` while SAPI speaks in the background
+        self.speaker.Speak(sentence, self.ASYNC)
+        while not self.speaker.WaitUntilDone(self.POLL_MS):
+            if not active():
+                self.speaker.Speak("", self.ASYNC | self.PURGE)
+                return
+
+    def synthesize(self, sentence: str) -> Optional[Audio]:
+        import win32com.client  # type: ignore
+
+        stream = win32com.client.Dispatch("SAPI.SpMemoryStream")
+        fmt = win32com.client.Dispatch("SAPI.SpAudioFormat")
+        fmt.Type = 22  # SAFT22kHz16BitMono
+        stream.Format = fmt
+
+        previous = self.speaker.AudioOutputStream
+        self.speaker.AudioOutputStream = stream
+        try:
+            self.speaker.Speak(sentence, 0)
+        finally:
+            self.speaker.AudioOutputStream = previous
+        return Audio(pcm=bytes(stream.GetData()), rate=22050)
+
+    def stop(self):
+        # the COM object belongs to the worker thread's apartment; from
+        # other threads speak_while() sees the utterance go inactive
+        if threading.get_ident() == self._owner:
+            self.speaker.Speak("", self.ASYNC | self.PURGE)
+
+    def close(self):
+        self._pythoncom.CoUninitialize()
+
+
+class Pyttsx3Backend(TTSBackend):
+    name = "pyttsx3"
+    # runAndWait() can't be interrupted from another thread
+    live_stop = False
+
+    def open(self):
+        import pyttsx3  # type: ignore
+
+        self.engine = pyttsx3.init()
+
+    def speak(self, sentence: str):
+        self.engine.say(sentence)
+        self.engine.runAndWait()
+
+    def synthesize(self, sentence: str) -> Optional[Audio]:
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            self.engine.save_to_file(sentence, path)
+            self.engine.runAndWait()
+            return read_wav(path)
+        except Exception as e:
+            print("pyttsx3 synthesis error:", repr(e))
+            return None
+        finally:
+            os.remove(path)
+
+    def stop(self):
+        self.engine.stop()
+
+
+class EspeakBackend(TTSBackend):
+    name = "espeak"
+
+    def __init__(self, executable: Optional[str] = None):
+        self.executable = executable or shutil.which("espeak-ng") or shutil.which("espeak")
+        self._proc: Optional[subprocess.Popen] = None
+
+    def open(self):
+        if not self.executable:
+            raise RuntimeError("espeak is not installed")
+
+    def speak(self, sentence: str):
+        self._proc = subprocess.Popen(
+            [self.executable, sentence],  # type: ignore[list-item]
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        self._proc.wait()
+        self._proc = None
+
+    def synthesize(self, sentence: str) -> Optional[Audio]:
+        result = subprocess.run(
+            [self.executable, "--stdout", sentence],  # type: ignore[list-item]
+            capture_output=True,
+        )
+        if result.returncode != 0 or not result.stdout:
+            return None
+        return read_wav(io.BytesIO(result.stdout))
+
+    def synthesize_stream(self, sentence: str) -> Optional[PcmStream]:
+        proc = subprocess.Popen(
+            [self.executable, "--stdout", sentence],  # type: ignore[list-item]
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        out = proc.stdout
+        assert out is not None
+        try:
+            rate, width, channels = _read_wav_header(out)
+        except (OSError, ValueError, struct.error):
+            proc.kill()
+            proc.wait()
+            return None
+
+        def chunks() -> Iterator[bytes]:
+            try:
+                while True:
+                    data = out.read1(4096)
+                    if not data:
+                        return
+                    yield data
+            finally:
+                out.close()
+                if proc.poll() is None:
+                    proc.kill()
+                proc.wait()
+
+        return PcmStream(rate, width, channels, chunks())
+
+    def stop(self):
+        proc = self._proc
+        if proc and proc.poll() is None:
+            proc.terminate()
+
+
+class NullBackend(TTSBackend):
+    """
+    Plays nothing. Keeps every sentence in `spoken` and, if `sink_path` is
+    given, appends it to that file. Used for tests and headless runs.
+    """
+
+    name = "null"
+
+    def __init__(self, sink_path: Optional[str] = None):
+        self.sink_path = sink_path
+        self.spoken: List[str] = []
+
+    def speak(self, sentence: str):
+        self.spoken.append(sentence)
+        if self.sink_path:
+            with open(self.sink_path, "a", encoding="utf-8") as f:
+                f.write(sentence + "\n")
+
+
+# ---------------- PCM PLAYBACK ----------------
+class _PcmPlayer:
+    CHUNK_FRAMES = 1024
+
+    def __init__(self):
+        import pyaudio  # type: ignore
+
+        self._pa = pyaudio.PyAudio()
+        self._stream = None
+        self._format = None
+
+    def play(
+        self,
+        audio: "Audio | PcmStream",
+        active: Callable[[], bool],
+        on_first: Optional[Callable[[], None]] = None,
+    ) -> bool:
+        """
+        Write `audio` to the output device one buffer at a time; a
+        PcmStream is played while it is still being rendered.
+        Returns False once `active()` turns false (barge-in or preemption),
+        which takes effect within one buffer (~50 ms).
+        """
+        fmt = (audio.rate, audio.width, audio.channels)
+        if self._stream is None or fmt != self._format:
+            self._close_stream()
+            self._stream = self._pa.open(
+                format=self._pa.get_format_from_width(audio.width),
+                channels=audio.channels,
+                rate=audio.rate,
+                output=True,
+            )
+            self._format = fmt
+
+        if isinstance(audio, PcmStream):
+            buffers: Iterable[bytes] = audio
+        else:
+            step = self.CHUNK_FRAMES * audio.width * audio.channels
+            buffers = (audio.pcm[i:i + step] for i in range(0, len(audio.pcm), step))
+
+        try:
+            for i, buffer in enumerate(buffers):
+                if not active():
+                    return False
+                self._stream.write(buffer)
+                if i == 0 and on_first is not None:
+                    on_first()
+            return True
+        finally:
+            if isinstance(audio, PcmStream):
+                audio.close()
+
+    def _close_stream(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+
+    def close(self):
+        self._close_stream()
+        self._pa.terminate()
+
+
+def _open_player() -> "Optional[_PcmPlayer]":
+    try:
+        return _PcmPlayer()
+    except Exception as e:
+        print("PCM playback unavailable, phrase cache disabled:", repr(e))
+        return None
+
+
+_BACKENDS = {
+    "sapi": SapiBackend,
+    "pyttsx3": Pyttsx3Backend,
+    "espeak": EspeakBackend,
+    "null": NullBackend,
+}
+
+
+def _checked_choice(choice: "str | TTSBackend | None") -> "str | TTSBackend | None":
+    # an unknown name must not kill the worker thread: speak() would then
+    # drop everything silently
+    if isinstance(choice, str) and choice and choice not in _BACKENDS:
+        print(f"Unknown TTS backend '{choice}' (expected one of {', '.join(_BACKENDS)}); speech is disabled.")
+        return "null"
+    return choice
+
+
+_backend_choice = _checked_choice(_backend_choice)
+
+
+def _auto_backend() -> TTSBackend:
+    if sys.platform == "win32":
+        return SapiBackend()
+    if shutil.which("espeak-ng") or shutil.which("espeak"):
+        return EspeakBackend()
+    try:
+        import pyttsx3  # type: ignore  # noqa: F401
+        return Pyttsx3Backend()
+    except ImportError:
+        pass
+    print("No text-to-speech engine found; speech is disabled.")
+    return NullBackend()
+
+
+def _open_backend() -> TTSBackend:
+    choice = _backend_choice
+    if isinstance(choice, TTSBackend):
+        backend = choice
+    elif choice:
+        backend = _BACKENDS.get(choice, NullBackend)()
+    else:
+        backend = _auto_backend()
+
+    try:
+        backend.open()
+    except Exception as e:
+        print(f"TTS backend '{backend.name}' failed to start: {e!r}")
+        backend = NullBackend()
+    return backend
+
+
+def set_backend(backend: "str | TTSBackend | None"):
+    """
+    Select the TTS backend by name or instance before the first speak().
+    None restores auto-selection; an unknown name selects "null".
+    """
+    global _backend_choice
+    if _thread is not None:
+        raise RuntimeError("The TTS backend is already running.")
+    _backend_choice = _checked_choice(backend)
+
+
+def get_backend() -> Optional[TTSBackend]:
+    return _backend
+
+
+def set_phrase_cache(cache: Optional[PhraseCache], enabled: bool = True):
+    """
+    Replace the phrase cache (e.g. a different directory or size limits),
+    or pass enabled=False to always synthesize live.
+    """
+    global _cache, _cache_enabled
+    _cache = cache
+    _cache_enabled = enabled
+
+
+def get_cache_stats() -> Optional[dict]:
+    return _cache.stats() if _cache else None
 
 
 def _split_into_sentences(text: str):
@@ -22,65 +486,528 @@ def _split_into_sentences(text: str):
     return [s for s in sentences if s]
 
 
+class _Utterance:
+    def __init__(
+        self,
+        text: str,
+        priority: int = PRIORITY_NORMAL,
+        ttl: Optional[float] = None,
+        on_audio: Optional[Callable[[], None]] = None,
+    ):
+        self.text = text
+        self.priority = priority
+        self.expires_at = time.monotonic() + ttl if ttl is not None else None
+        self.generation = _generation
+        self.sentences = _split_into_sentences(text)
+        self.position = 0          # sentence currently being spoken
+        self.cancelled = False
+        self.done = False
+        # long, informational reads are never written to the phrase cache
+        self.cacheable = priority >= PRIORITY_NORMAL
 
+        self.queued_at = time.perf_counter()
+        self.first_audio_at: Optional[float] = None
+        self.last_end: Optional[float] = None
+        self.on_audio = on_audio   # called once, when the first audio plays
 
-def _speech_worker():
-    pythoncom.CoInitialize()
-    try:
-        speaker = win32com.client.Dispatch("SAPI.SpVoice")
+    def active(self) -> bool:
+        return not self.cancelled and self.generation == _generation
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() > self.expires_at
+
+    def iter_sentences(self) -> Iterator[str]:
+        return iter(self.sentences)
+
+    def resume(self) -> "Optional[_Utterance]":
+        """A new utterance for what preemption cut off, if anything."""
+        rest = " ".join(self.sentences[self.position:])
+        if not rest:
+            return None
+        resumed = _Utterance(rest, self.priority, on_audio=self._pending_on_audio())
+        resumed.expires_at = self.expires_at
+        return resumed
+
+    def _pending_on_audio(self) -> Optional[Callable[[], None]]:
+        # preempted before it was heard: the resumed part owes the callback
+        return self.on_audio if self.first_audio_at is None else None
+
+    def spoken_text(self) -> str:
+        return self.text
+
+    def drop(self):
+        """Called when the utterance is skipped without being spoken."""
+
+    def mark_audio(self):
+        now = time.perf_counter()
+        first = False
+        with _metrics_lock:
+            if self.first_audio_at is None:
+                self.first_audio_at = now
+                _ttfa_samples.append(now - self.queued_at)
+                first = True
+            elif self.last_end is not None:
+                _gap_samples.append(now - self.last_end)
+        if first and self.on_audio is not None:
+            self.on_audio()
+
+
+class _StreamUtterance(_Utterance):
+    """
+    Speaks text as it is produced. A producer thread pulls chunks (e.g.
+    paragraphs) from `chunks` into a small bounded buffer, so a slow
+    source never runs on the speech thread and at most a few chunks are
+    held in memory. Sentences are spoken as soon as their chunk arrives.
+    """
+
+    BUFFER_CHUNKS = 4
+
+    def __init__(
+        self,
+        chunks: Iterable[str],
+        priority: int = PRIORITY_NORMAL,
+        ttl: Optional[float] = None,
+        on_audio: Optional[Callable[[], None]] = None,
+    ):
+        super().__init__("", priority, ttl, on_audio)
+        self.text = None  # type: ignore[assignment]  # never coalesced
+        # screen text, articles, AI replies: never cached
+        self.cacheable = False
+        self._chunks: queue.Queue = queue.Queue(maxsize=self.BUFFER_CHUNKS)
+        self._finished = False
+        self._dropped = False
+        self._take_lock = threading.Lock()
+        self._producer = threading.Thread(target=self._produce, args=(chunks,), daemon=True)
+        self._producer.start()
+
+    def _flushed(self) -> bool:
+        # preemption keeps the producer running for the resumed utterance;
+        # stop_speaking() or dropping the utterance abandons the source
+        return self._dropped or self.generation != _generation
 
+    def drop(self):
+        self._dropped = True
+
+    def _produce(self, chunks: Iterable[str]):
+        it = iter(chunks)
+        try:
+            for chunk in it:
+                while not self._flushed():
+                    try:
+                        self._chunks.put(chunk, timeout=0.2)
+                        break
+                    except queue.Full:
+                        continue
+                if self._flushed():
+                    return
+        except Exception as e:
+            print("Speech stream source error:", repr(e))
+        finally:
+            self._finished = True
+            # lets the source clean up now (and a resumed utterance's
+            # source, _rest, drop the utterance it reads from)
+            close = getattr(it, "close", None)
+            if close is not None:
+                close()
+
+    def _next_chunk(self) -> Optional[str]:
         while True:
-            text = _speech_queue.get()
-            if text is None:
-                break
+            # the lock makes "take a chunk" and "resume after preemption"
+            # atomic, so a chunk taken by a cancelled iterator is carried over
+            with self._take_lock:
+                if not self.active():
+                    return None
+                try:
+                    chunk = self._chunks.get(timeout=0.2)
+                except queue.Empty:
+                    if self._finished and self._chunks.empty():
+                        return None
+                    continue
+                parts = _split_into_sentences(chunk)
+                self.sentences.extend(parts)
+                return chunk
+
+    def iter_sentences(self) -> Iterator[str]:
+        start = 0
+        while True:
+            if self._next_chunk() is None:
+                return
+            new = self.sentences[start:]
+            start = len(self.sentences)
+            for sentence in new:
+                yield sentence
+
+    def _rest(self) -> Iterator[str]:
+        try:
+            with self._take_lock:
+                rest = " ".join(self.sentences[self.position:])
+            if rest:
+                yield rest
+            while not self._flushed():
+                try:
+                    yield self._chunks.get(timeout=0.2)
+                except queue.Empty:
+                    if self._finished and self._chunks.empty():
+                        return
+        finally:
+            # nobody reads this utterance's buffer any more
+            self.drop()
+
+    def resume(self) -> "Optional[_Utterance]":
+        resumed = _StreamUtterance(self._rest(), self.priority, on_audio=self._pending_on_audio())
+        resumed.expires_at = self.expires_at
+        return resumed
+
+    def spoken_text(self) -> str:
+        return " ".join(self.sentences)
+
+
+class _SpeechQueue:
+    """
+    Priority queue of utterances: highest priority first, FIFO within a
+    priority. Identical pending texts coalesce, expired ones are skipped.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self.current: Optional[_Utterance] = None
+
+        self.coalesced = 0
+        self.expired = 0
+        self.preempted = 0
+
+    def _push(self, utterance: _Utterance):
+        heapq.heappush(self._heap, (-utterance.priority, next(self._seq), utterance))
+
+    def put(self, utterance: _Utterance):
+        with self._cond:
+            for idx, (_, seq, pending) in enumerate(self._heap):
+                if (
+                    utterance.text is not None
+                    and pending.text == utterance.text
+                    and pending.active()
+                ):
+                    if utterance.priority > pending.priority:
+                        pending.priority = utterance.priority
+                        self._heap[idx] = (-pending.priority, seq, pending)
+                        heapq.heapify(self._heap)
+                    if pending.expires_at is not None:
+                        if utterance.expires_at is None:
+                            pending.expires_at = None
+                        else:
+                            pending.expires_at = max(pending.expires_at, utterance.expires_at)
+                    self.coalesced += 1
+                    return
+
+            current = self.current
+            if (
+                current is not None
+                and not current.done
+                and current.active()
+                and utterance.priority >= PRIORITY_HIGH
+                and utterance.priority > current.priority
+            ):
+                current.cancelled = True
+                if _backend is not None:
+                    _backend.stop()
+                resumed = current.resume()
+                if resumed is not None:
+                    self._push(resumed)
+                self.preempted += 1
+
+            self._push(utterance)
+            self._cond.notify()
+
+    def get(self) -> _Utterance:
+        with self._cond:
+            while True:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, utterance = heapq.heappop(self._heap)
+                if utterance.expired():
+                    self.expired += 1
+                    utterance.drop()
+                    continue
+                if not utterance.active():
+                    utterance.drop()
+                    continue
+                self.current = utterance
+                return utterance
+
+    def clear(self):
+        with self._cond:
+            for _, _, utterance in self._heap:
+                utterance.drop()
+            self._heap.clear()
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._heap)
 
-            if _muted:
-                _speech_queue.task_done()
-                continue
 
-            global _last_spoken_text
-            _last_spoken_text = text
+_speech_queue = _SpeechQueue()
 
-            _stop_flag.clear()
 
-            sentences = _split_into_sentences(text)
+def _can_pipeline() -> bool:
+    return (
+        _player is not None
+        and _backend is not None
+        and type(_backend).synthesize is not TTSBackend.synthesize
+    )
 
-            for sentence in sentences:
-                if _stop_flag.is_set():
-                    # flush current speech immediately
-                    speaker.Speak("", 3)  # SVSFPurgeBeforeSpeak
+
+def _render(sentence: str, utterance: _Utterance, first: bool) -> "tuple[Audio | PcmStream | None, bool]":
+    """
+    Returns (audio, came_from_cache); audio None means "speak it live".
+    Uncached audio is streamed when the backend can; otherwise the first
+    sentence is spoken live (if the backend can cut live speech), since
+    rendering it whole would delay the first audio, and later ones are
+    rendered while the previous one plays.
+    """
+    backend = _backend
+    assert backend is not None
+    cache = _cache if utterance.cacheable else None
+    store = False
+
+    if cache is not None and cache.accepts(sentence):
+        audio = cache.get(backend.voice, sentence)
+        if audio is not None:
+            return audio, True
+        store = cache.worth_storing(backend.voice, sentence)
+
+    stream = backend.synthesize_stream(sentence)
+    if stream is not None:
+        if store:
+            voice = backend.voice
+            stream.on_complete = lambda audio: cache.put(voice, sentence, audio)  # type: ignore[union-attr]
+        return stream, False
+
+    if first and not store and backend.live_stop:
+        return None, False
+
+    audio = backend.synthesize(sentence)
+    if audio is not None and store:
+        cache.put(backend.voice, sentence, audio)  # type: ignore[union-attr]
+    return audio, False
+
+
+def _playback_worker():
+    try:
+        while True:
+            item = _play_queue.get()
+            try:
+                if item is None:
                     break
+                audio, utterance, index, on_first = item
+                if not utterance.active():
+                    _discard(item)
+                    continue
+                if audio is None:
+                    # end-of-utterance marker
+                    utterance.done = True
+                    continue
+                utterance.position = index
+
+                def first():
+                    utterance.mark_audio()
+                    if on_first is not None:
+                        on_first()
+
+                assert _player is not None
+                if _player.play(audio, utterance.active, first):
+                    utterance.last_end = time.perf_counter()
+            finally:
+                _play_queue.task_done()
+    finally:
+        # the output stream belongs to this thread
+        if _player is not None:
+            _player.close()
+
+
+def _discard(item: Optional[tuple]):
+    # a dropped stream must not leave its renderer running
+    if item is not None and isinstance(item[0], PcmStream):
+        item[0].close()
+
+
+def _enqueue_playback(item: tuple, utterance: _Utterance):
+    # blocks while two sentences are already waiting to be played
+    while utterance.active():
+        try:
+            _play_queue.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+    _discard(item)
+
+
+def _speak_pipelined(utterance: _Utterance):
+    for index, sentence in enumerate(utterance.iter_sentences()):
+        if not utterance.active():
+            return
+        start = time.perf_counter()
+        audio, cached = _render(sentence, utterance, index == 0)
+        if audio is None:
+            # let the rendered sentences finish first so voices don't overlap
+            _play_queue.join()
+            if not utterance.active():
+                return
+            utterance.position = index
+            utterance.mark_audio()
+            _backend.speak_while(sentence, utterance.active)  # type: ignore[union-attr]
+            utterance.last_end = time.perf_counter()
+            continue
+
+        on_first = None
+        if index == 0 and utterance.cacheable and _cache is not None and _cache.accepts(sentence):
+            def on_first(cache=_cache, cached=cached, start=start):
+                cache.record_ttfa(cached, time.perf_counter() - start)
+
+        _enqueue_playback((audio, utterance, index, on_first), utterance)
+
+    _enqueue_playback((None, utterance, -1, None), utterance)
 
-                speaker.Speak(sentence, 0)
 
-            _speech_queue.task_done()
+def _speak_direct(utterance: _Utterance):
+    for index, sentence in enumerate(utterance.iter_sentences()):
+        if not utterance.active():
+            # flush current speech immediately
+            _backend.stop()  # type: ignore[union-attr]
+            return
+        utterance.position = index
+        utterance.mark_audio()
+        _backend.speak_while(sentence, utterance.active)  # type: ignore[union-attr]
+        utterance.last_end = time.perf_counter()
+    utterance.done = True
+
+
+def _speech_worker():
+    global _backend, _last_spoken_text, _cache, _player, _play_thread
+
+    _backend = _open_backend()
+    if not isinstance(_backend, NullBackend):
+        _player = _open_player()
+        if _player is not None and _cache_enabled and _cache is None:
+            _cache = PhraseCache()
+    if _can_pipeline():
+        _play_thread = threading.Thread(target=_playback_worker, daemon=True)
+        _play_thread.start()
+
+    try:
+        while True:
+            utterance = _speech_queue.get()
+
+            if _muted:
+                utterance.drop()
+                continue
+
+            if _can_pipeline():
+                _speak_pipelined(utterance)
+            else:
+                _speak_direct(utterance)
+
+            _last_spoken_text = utterance.spoken_text() or _last_spoken_text
 
     finally:
-        pythoncom.CoUninitialize()
+        if _play_thread is not None:
+            _play_queue.put(None)
+        elif _player is not None:
+            _player.close()
+        _backend.close()
 
 
+def get_speech_metrics() -> dict:
+    """
+    Time-to-first-audio per utterance and silence between consecutive
+    sentences of one utterance, in milliseconds.
+    """
+    def summary(samples):
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return {
+            "count": len(ordered),
+            "mean_ms": sum(ordered) / len(ordered) * 1000,
+            "p95_ms": ordered[int(0.95 * (len(ordered) - 1))] * 1000,
+            "max_ms": ordered[-1] * 1000,
+        }
+
+    with _metrics_lock:
+        return {
+            "time_to_first_audio": summary(list(_ttfa_samples)),
+            "sentence_gap": summary(list(_gap_samples)),
+            "pipelined": _can_pipeline(),
+            "queued": len(_speech_queue),
+            "coalesced": _speech_queue.coalesced,
+            "expired": _speech_queue.expired,
+            "preempted": _speech_queue.preempted,
+        }
 
-_thread = threading.Thread(target=_speech_worker, daemon=True)
-_thread.start()
 
+def _ensure_worker():
+    global _thread
+    with _thread_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_speech_worker, daemon=True)
+            _thread.start()
 
 
-def speak(text: str):
+def speak(
+    text: str,
+    priority: int = PRIORITY_NORMAL,
+    ttl: Optional[float] = None,
+    on_audio: Optional[Callable[[], None]] = None,
+):
+    """
+    Queue `text` for speech. Higher `priority` is spoken first and
+    PRIORITY_HIGH or above interrupts a lower-priority utterance. With `ttl`
+    (seconds) the message is dropped if it has not started by then.
+    `on_audio` is called from the speech threads when its first audio plays.
+    """
     if not text or not text.strip():
         return
-    _speech_queue.put(text)
+    _ensure_worker()
+    _speech_queue.put(_Utterance(text, priority, ttl, on_audio))
+
+
+def speak_stream(
+    chunks: Iterable[str],
+    priority: int = PRIORITY_NORMAL,
+    ttl: Optional[float] = None,
+    on_audio: Optional[Callable[[], None]] = None,
+):
+    """
+    Speak text while it is still being produced, e.g. paragraphs yielded
+    by OCR or a knowledge lookup. The first sentence plays as soon as the
+    first chunk arrives. `chunks` is read on its own thread and closed
+    (if it is a generator) when it ends or the utterance is dropped.
+    """
+    _ensure_worker()
+    _speech_queue.put(_StreamUtterance(chunks, priority, ttl, on_audio))
 
 
 def stop_speaking():
-    _stop_flag.set()
+    """
+    Barge-in: cut the current sentence within one audio buffer and drop
+    everything queued or already rendered.
+    """
+    global _generation
+    with _generation_lock:
+        _generation += 1
+    if _backend is not None:
+        _backend.stop()
 
     # Flush pending speech
-    while not _speech_queue.empty():
+    _speech_queue.clear()
+    while not _play_queue.empty():
         try:
-            _speech_queue.get_nowait()
-            _speech_queue.task_done()
+            item = _play_queue.get_nowait()
         except queue.Empty:
             break
+        _discard(item)
+        _play_queue.task_done()
 
 
 
@@ -97,4 +1024,3 @@ def toggle_mute() -> bool:
 def replay_last():
     if _last_spoken_text:
         speak(_last_spoken_text)
-
@@ -0,0 +1,181 @@
+# core/tracing.py
+"""
+Lightweight per-command latency tracing.
+
+Each voice or text command gets a Trace. Pipeline stages add spans to it
+(capture, asr, predict_intent, slots, skill) and point events (wake,
+first_audio), from whatever thread they run on. The last TRACE_CAPACITY
+traces stay in a ring buffer and can be written out as plain JSON or in
+Chrome trace format (open in chrome://tracing or https://ui.perfetto.dev).
+"""
+
+import atexit
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional
+
+TRACE_CAPACITY = 100
+
+_ids = itertools.count(1)
+
+
+class Trace:
+    def __init__(self, kind: str, at: Optional[float] = None):
+        self.id = next(_ids)
+        self.kind = kind
+        self.t0 = at if at is not None else time.perf_counter()
+        # wall-clock time of t0, for humans
+        self.wall = time.time() - (time.perf_counter() - self.t0)
+        self.end: Optional[float] = None
+        self.attrs: Dict[str, object] = {}
+
+        self._lock = threading.Lock()
+        self.spans: List[tuple] = []   # (name, start, end, thread)
+        self.marks: List[tuple] = []   # (name, at, thread)
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, time.perf_counter())
+
+    def add_span(self, name: str, start: float, end: float):
+        with self._lock:
+            self.spans.append((name, start, end, threading.current_thread().name))
+
+    def mark(self, name: str, at: Optional[float] = None):
+        at = at if at is not None else time.perf_counter()
+        with self._lock:
+            self.marks.append((name, at, threading.current_thread().name))
+
+    def has_mark(self, name: str) -> bool:
+        with self._lock:
+            return any(m[0] == name for m in self.marks)
+
+    def finish(self):
+        self.end = time.perf_counter()
+
+    def to_dict(self) -> dict:
+        def ms(t: float) -> float:
+            return round((t - self.t0) * 1000, 2)
+
+        with self._lock:
+            spans = [
+                {"name": n, "start_ms": ms(s), "duration_ms": round((e - s) * 1000, 2), "thread": th}
+                for n, s, e, th in self.spans
+            ]
+            marks = [{"name": n, "at_ms": ms(t), "thread": th} for n, t, th in self.marks]
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "wall_time": self.wall,
+            "total_ms": ms(self.end) if self.end is not None else None,
+            "attrs": dict(self.attrs),
+            "spans": spans,
+            "marks": marks,
+        }
+
+    def chrome_events(self) -> List[dict]:
+        with self._lock:
+            spans = list(self.spans)
+            marks = list(self.marks)
+        args = {"trace": self.id, **{k: str(v) for k, v in self.attrs.items()}}
+        events = []
+        if self.end is not None:
+            events.append({
+                "name": f"{self.kind} #{self.id}", "ph": "X", "pid": 1, "tid": "pipeline",
+                "ts": self.t0 * 1e6, "dur": (self.end - self.t0) * 1e6, "args": args,
+            })
+        for name, start, end, thread in spans:
+            events.append({
+                "name": name, "ph": "X", "pid": 1, "tid": thread,
+                "ts": start * 1e6, "dur": (end - start) * 1e6, "args": {"trace": self.id},
+            })
+        for name, at, thread in marks:
+            events.append({
+                "name": name, "ph": "i", "s": "t", "pid": 1, "tid": thread,
+                "ts": at * 1e6, "args": {"trace": self.id},
+            })
+        return events
+
+
+class Tracer:
+    def __init__(self, capacity: int = TRACE_CAPACITY):
+        self._lock = threading.Lock()
+        self._traces: deque = deque(maxlen=capacity)
+
+    def start(self, kind: str, at: Optional[float] = None) -> Trace:
+        trace = Trace(kind, at)
+        with self._lock:
+            self._traces.append(trace)
+        return trace
+
+    def traces(self) -> List[Trace]:
+        with self._lock:
+            return list(self._traces)
+
+    def recent(self, n: Optional[int] = None) -> List[dict]:
+        traces = self.traces()
+        if n is not None:
+            traces = traces[-n:]
+        return [t.to_dict() for t in traces]
+
+    def summary(self) -> Dict[str, dict]:
+        """Mean / p95 / max per stage (ms) over the buffered traces."""
+        samples: Dict[str, List[float]] = {}
+        for trace in self.traces():
+            for name, start, end, _ in list(trace.spans):
+                samples.setdefault(name, []).append((end - start) * 1000)
+            for name, at, _ in list(trace.marks):
+                samples.setdefault(f"{name} (from start)", []).append((at - trace.t0) * 1000)
+            if trace.end is not None:
+                samples.setdefault("total", []).append((trace.end - trace.t0) * 1000)
+
+        out = {}
+        for name, values in samples.items():
+            ordered = sorted(values)
+            out[name] = {
+                "count": len(ordered),
+                "mean_ms": round(sum(ordered) / len(ordered), 2),
+                "p95_ms": round(ordered[round(0.95 * (len(ordered) - 1))], 2),
+                "max_ms": round(ordered[-1], 2),
+            }
+        return out
+
+    def dump(self, path: str | Path, fmt: str = "json"):
+        """fmt: "json" (list of traces) or "chrome" (trace event format)."""
+        if fmt == "chrome":
+            events = [e for t in self.traces() for e in t.chrome_events()]
+            data: object = {"traceEvents": events, "displayTimeUnit": "ms"}
+        elif fmt == "json":
+            data = {"traces": self.recent(), "summary": self.summary()}
+        else:
+            raise ValueError(f"Unknown trace format: {fmt}")
+        Path(path).write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+
+def span(trace: Optional[Trace], name: str):
+    """`with span(trace, "asr"):` that is a no-op without a trace."""
+    return trace.span(name) if trace is not None else nullcontext()
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def dump_on_exit(path: str | Path, fmt: str = "json"):
+    def dump():
+        _tracer.dump(path, fmt)
+        print(f"Wrote {len(_tracer.traces())} traces to {path}")
+
+    atexit.register(dump)
@@ -0,0 +1,238 @@
+# core/tts_cache.py
+"""
+Cache of synthesized speech for short, frequently repeated phrases
+("Yes?", "I did not catch that.", "Still working on it.").
+
+Only the assistant's fixed prompts (CACHED_PHRASES) and phrases that have
+come up REPEATS_BEFORE_CACHE times are stored, so arbitrary text (read
+from the screen, AI replies) never ends up on disk. Which phrases were
+seen is tracked in memory by hash only.
+
+Rendered PCM is kept in a size-bounded in-memory LRU and mirrored to WAV
+files on disk (also size-bounded, oldest access evicted first), so repeats
+are played directly instead of being synthesized again, even after a
+restart.
+"""
+
+import hashlib
+import os
+import threading
+import uuid
+import wave
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Optional
+
+from core.disk_lru import disk_usage, evict
+
+DEFAULT_CACHE_DIR = Path.home() / ".orbitos" / "tts_cache"
+MAX_MEMORY_BYTES = 8 * 1024 * 1024
+MAX_DISK_BYTES = 64 * 1024 * 1024
+MAX_PHRASE_CHARS = 80
+REPEATS_BEFORE_CACHE = 3
+MAX_TRACKED_PHRASES = 2000
+
+# the controller's fixed prompts
+CACHED_PHRASES = (
+    "Yes?",
+    "I did not catch that.",
+    "Still working on it.",
+    "I am still working on your previous request.",
+    "Sorry, something went wrong.",
+    "Sorry, that is taking too long. Please try again later.",
+    "Please say yes, no, or choose an option.",
+    "Please specify a folder name.",
+    "The current folder is empty.",
+)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+@dataclass
+class Audio:
+    pcm: bytes
+    rate: int
+    width: int = 2
+    channels: int = 1
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / (self.rate * self.width * self.channels)
+
+
+def read_wav(data_or_path) -> Audio:
+    with wave.open(data_or_path, "rb") as w:
+        return Audio(
+            pcm=w.readframes(w.getnframes()),
+            rate=w.getframerate(),
+            width=w.getsampwidth(),
+            channels=w.getnchannels(),
+        )
+
+
+def write_wav(path, audio: Audio):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(audio.channels)
+        w.setsampwidth(audio.width)
+        w.setframerate(audio.rate)
+        w.writeframes(audio.pcm)
+
+
+class PhraseCache:
+    def __init__(
+        self,
+        cache_dir: Path | str | None = DEFAULT_CACHE_DIR,
+        max_memory_bytes: int = MAX_MEMORY_BYTES,
+        max_disk_bytes: int = MAX_DISK_BYTES,
+        max_phrase_chars: int = MAX_PHRASE_CHARS,
+        phrases: Iterable[str] = CACHED_PHRASES,
+        repeats: int = REPEATS_BEFORE_CACHE,
+    ):
+        self.dir = Path(cache_dir) if cache_dir else None
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.max_phrase_chars = max_phrase_chars
+        self.phrases = {_normalize(p) for p in phrases}
+        self.repeats = repeats
+
+        self._lock = threading.Lock()
+        # key -> times seen, for phrases not stored yet
+        self._seen: "OrderedDict[str, int]" = OrderedDict()
+        self._memory: "OrderedDict[str, Audio]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        # time-to-first-audio samples in seconds
+        self._ttfa: Dict[str, Deque[float]] = {
+            "cached": deque(maxlen=200),
+            "uncached": deque(maxlen=200),
+        }
+
+        if self.dir:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = disk_usage(self.dir, "*.wav")
+
+    def accepts(self, text: str) -> bool:
+        return 0 < len(text) <= self.max_phrase_chars
+
+    @staticmethod
+    def key(voice: str, text: str) -> str:
+        return hashlib.sha1(f"{voice}\n{_normalize(text)}".encode("utf-8")).hexdigest()
+
+    def worth_storing(self, voice: str, text: str) -> bool:
+        """Count a miss; True for a fixed prompt or a phrase seen often enough."""
+        if _normalize(text) in self.phrases:
+            return True
+        key = self.key(voice, text)
+        with self._lock:
+            count = self._seen.pop(key, 0) + 1
+            if count >= self.repeats:
+                return True
+            self._seen[key] = count
+            while len(self._seen) > MAX_TRACKED_PHRASES:
+                self._seen.popitem(last=False)
+        return False
+
+    def get(self, voice: str, text: str) -> Optional[Audio]:
+        key = self.key(voice, text)
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return audio
+
+        path = self.dir / f"{key}.wav" if self.dir else None
+        if path and path.exists():
+            try:
+                audio = read_wav(str(path))
+                os.utime(path)
+            except (OSError, wave.Error, EOFError):
+                audio = None
+            if audio is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._remember(key, audio)
+                return audio
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, voice: str, text: str, audio: Audio):
+        key = self.key(voice, text)
+        with self._lock:
+            self._remember(key, audio)
+
+        if not self.dir:
+            return
+        path = self.dir / f"{key}.wav"
+        # unique per writer, so two writers of one key don't share it
+        tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            write_wav(tmp, audio)
+            # under the lock, so concurrent overwrites are counted once each
+            with self._lock:
+                try:
+                    old = path.stat().st_size
+                except FileNotFoundError:
+                    old = 0
+                os.replace(tmp, path)
+                size = path.stat().st_size
+                self._disk_bytes += size - old
+                over = self._disk_bytes > self.max_disk_bytes
+        except OSError as e:
+            print("TTS cache write error:", repr(e))
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            return
+        if over:
+            self._evict_disk()
+
+    def _remember(self, key: str, audio: Audio):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old.pcm)
+        self._memory[key] = audio
+        self._memory_bytes += len(audio.pcm)
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted.pcm)
+
+    def _evict_disk(self):
+        assert self.dir is not None
+        total = evict(self.dir, "*.wav", self.max_disk_bytes)
+        with self._lock:
+            self._disk_bytes = total
+
+    def record_ttfa(self, cached: bool, seconds: float):
+        with self._lock:
+            self._ttfa["cached" if cached else "uncached"].append(seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            ttfa = {
+                kind: (sum(v) / len(v) if v else None)
+                for kind, v in self._ttfa.items()
+            }
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+                "entries": len(self._memory),
+                "ttfa_cached_ms": ttfa["cached"] * 1000 if ttfa["cached"] is not None else None,
+                "ttfa_uncached_ms": ttfa["uncached"] * 1000 if ttfa["uncached"] is not None else None,
+            }
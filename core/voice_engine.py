@@ -1,8 +1,67 @@
 # core/voice_engine.py
 
+import threading
+from typing import Callable, Optional
+
+import numpy as np
 import speech_recognition as sr  # type: ignore
 
-def listen_once() -> str | None:
+from core.tracing import Trace, span
+
+# Streaming mode: how often a partial hypothesis is requested while the user
+# is still talking, and how much trailing silence ends the utterance.
+PARTIAL_INTERVAL = 0.4
+END_OF_SPEECH_SILENCE = 0.8
+MAX_UTTERANCE_SECONDS = 15.0
+SPEECH_START_TIMEOUT = 6.0
+
+# Audio input and recognizer are swappable so recorded sessions can be
+# replayed through the same code paths (see core/audio_replay.py).
+# Factories take keyword arguments such as chunk_size.
+_source_factory: Callable[..., sr.AudioSource] = sr.Microphone
+_recognizer_backend = "google"
+
+
+_SAMPLE_TYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+
+
+def rms(buffer: bytes, width: int) -> float:
+    """Root mean square of signed PCM samples (what audioop.rms computed)."""
+    samples = np.frombuffer(buffer[: len(buffer) - len(buffer) % width], dtype=_SAMPLE_TYPES[width])
+    if not samples.size:
+        return 0.0
+    return float(np.sqrt(np.mean(samples.astype(np.float64) ** 2)))
+
+
+def set_source_factory(factory: Optional[Callable[..., sr.AudioSource]]):
+    global _source_factory
+    _source_factory = factory or sr.Microphone
+
+
+def create_source(**kwargs) -> sr.AudioSource:
+    return _source_factory(**kwargs)
+
+
+def set_recognizer_backend(name: str):
+    """
+    "google" (online, default) or "sphinx" (offline, needs pocketsphinx).
+    """
+    global _recognizer_backend
+    if name not in ("google", "sphinx"):
+        raise ValueError(f"Unknown recognizer backend: {name}")
+    _recognizer_backend = name
+
+
+def recognize_audio(recognizer: sr.Recognizer, audio: sr.AudioData) -> str:
+    """
+    Run the configured recognizer. Raises sr.UnknownValueError / sr.RequestError.
+    """
+    if _recognizer_backend == "sphinx":
+        return recognizer.recognize_sphinx(audio)
+    return recognizer.recognize_google(audio, language="en-IN")  # adjust if needed
+
+
+def listen_once(trace: Optional[Trace] = None) -> str | None:
     """
     Listen from the default microphone once and return the recognized text
     using Google's online speech recognition.
@@ -10,23 +69,139 @@ def listen_once() -> str | None:
     """
     recognizer = sr.Recognizer()
 
-    with sr.Microphone() as source:
+    with span(trace, "capture"), create_source() as source:
         print("Listening...")
         # Short noise calibration for current environment
         recognizer.adjust_for_ambient_noise(source, duration=0.8)
         audio = recognizer.listen(source)
 
+    with span(trace, "asr"):
+        return _recognize(recognizer, audio)
+
+
+def _recognize(recognizer: sr.Recognizer, audio: sr.AudioData, quiet: bool = False) -> str | None:
     try:
-        text = recognizer.recognize_google(audio, language="en-IN")  # adjust if needed
-        text = text.strip()
+        text = recognize_audio(recognizer, audio).strip()
         if not text:
-            print("No speech recognized.")
+            if not quiet:
+                print("No speech recognized.")
             return None
-        print("Heard (command):", text)
+        if not quiet:
+            print("Heard (command):", text)
         return text
     except sr.UnknownValueError:
-        print("Could not understand audio.")
+        if not quiet:
+            print("Could not understand audio.")
         return None
     except sr.RequestError as e:
-        print(f"Error with Google Speech Recognition service: {e}")
+        print(f"Error with the speech recognition service: {e}")
+        return None
+
+
+def listen_streaming(
+    on_partial: Optional[Callable[[str], None]] = None,
+    trace: Optional[Trace] = None,
+) -> str | None:
+    """
+    Listen from the default microphone and emit partial transcripts while the
+    user is speaking.
+
+    Audio is read chunk by chunk; an energy VAD (the recognizer's own
+    threshold) decides when speech starts and ends. Every PARTIAL_INTERVAL
+    seconds of speech the audio captured so far is recognized in the
+    background and passed to `on_partial`. The utterance is finalized after
+    END_OF_SPEECH_SILENCE seconds of silence instead of a fixed
+    phrase_time_limit. Once speech has ended no more partials are passed
+    on, so a slow partial can't arrive after (and overwrite) the final.
+    """
+    recognizer = sr.Recognizer()
+
+    partial_lock = threading.Lock()
+    last_partial = {"text": ""}
+    # set when capture ends; `emit_lock` makes a partial already being
+    # passed on finish before that
+    done = threading.Event()
+    emit_lock = threading.Lock()
+
+    def run_partial(audio: sr.AudioData):
+        # Only one partial request in flight; drop this one otherwise.
+        if not partial_lock.acquire(blocking=False):
+            return
+        try:
+            text = _recognize(recognizer, audio, quiet=True)
+            with emit_lock:
+                if done.is_set() or not text or text == last_partial["text"]:
+                    return
+                last_partial["text"] = text
+                if callable(on_partial):
+                    on_partial(text)
+        finally:
+            partial_lock.release()
+
+    try:
+        frames, silence, chunk_seconds, rate, width = _capture_streaming(
+            recognizer, run_partial if on_partial is not None else None, trace
+        )
+    finally:
+        with emit_lock:
+            done.set()
+    if not frames:
         return None
+
+    # Trim the trailing silence before the final pass.
+    keep = max(1, len(frames) - int(silence / chunk_seconds))
+    audio = sr.AudioData(b"".join(frames[:keep]), rate, width)
+
+    with span(trace, "asr"):
+        return _recognize(recognizer, audio)
+
+
+def _capture_streaming(recognizer, run_partial: Optional[Callable], trace: Optional[Trace]):
+    """Record one utterance for listen_streaming, starting partial passes."""
+    with span(trace, "capture"), create_source() as source:
+        print("Listening (streaming)...")
+        recognizer.adjust_for_ambient_noise(source, duration=0.8)
+
+        width = source.SAMPLE_WIDTH
+        rate = source.SAMPLE_RATE
+        chunk_seconds = source.CHUNK / rate
+
+        frames: list[bytes] = []
+        started = False
+        silence = 0.0
+        waited = 0.0
+        since_partial = 0.0
+
+        while True:
+            buffer = source.stream.read(source.CHUNK)
+            if not buffer:
+                break
+
+            voiced = rms(buffer, width) > recognizer.energy_threshold
+
+            if not started:
+                if voiced:
+                    started = True
+                    frames.append(buffer)
+                else:
+                    waited += chunk_seconds
+                    if waited > SPEECH_START_TIMEOUT:
+                        print("No speech detected.")
+                        return [], 0.0, chunk_seconds, rate, width
+                continue
+
+            frames.append(buffer)
+            silence = 0.0 if voiced else silence + chunk_seconds
+            since_partial += chunk_seconds
+
+            if silence >= END_OF_SPEECH_SILENCE:
+                break
+            if len(frames) * chunk_seconds >= MAX_UTTERANCE_SECONDS:
+                break
+
+            if since_partial >= PARTIAL_INTERVAL and run_partial is not None:
+                since_partial = 0.0
+                snapshot = sr.AudioData(b"".join(frames), rate, width)
+                threading.Thread(target=run_partial, args=(snapshot,), daemon=True).start()
+
+    return frames, silence, chunk_seconds, rate, width
@@ -1,12 +1,39 @@
 
 import threading
 import time
-from typing import Callable, cast
+from typing import Callable, Iterable, Optional, cast
 
 import speech_recognition as sr  #type:ignore
 
+from core.phonetic_matcher import DEFAULT_THRESHOLD, PhoneticMatcher
+from core.voice_engine import create_source, recognize_audio
+
 WAKE_WORDS = ["orbit", "hey orbit", "ok orbit"]
 
+# Adaptive duty cycle. "low_power" reads the microphone in larger chunks
+# (fewer wake-ups per second), skips ambient re-calibration and dynamic
+# threshold tracking, and needs louder audio before a clip is recognized.
+PROFILES = {
+    "full": {
+        "chunk_size": 1024,
+        "dynamic_energy": True,
+        "calibrate": 0.6,
+        "min_energy": 200,
+        "phrase_time_limit": 4,
+    },
+    "low_power": {
+        "chunk_size": 4096,
+        "dynamic_energy": False,
+        "calibrate": 0.0,
+        "min_energy": 400,
+        "phrase_time_limit": 3,
+    },
+}
+ADAPT_INTERVAL = 20.0      # seconds between power checks
+ACTIVITY_HOLD = 60.0       # full sensitivity kept this long after any sound
+HIGH_CPU_PERCENT = 80
+LISTEN_TIMEOUT = 5.0       # the profile and stop() are re-checked this often
+
 
 class WakeWordEngine:
     """
@@ -14,11 +41,33 @@ class WakeWordEngine:
     Calls a callback when detected.
     """
 
-    def __init__(self, on_wake_callback: Callable[[], None]):
+    def __init__(
+        self,
+        on_wake_callback: Callable[[], None],
+        wake_words: Optional[Iterable[str]] = None,
+        threshold: float = DEFAULT_THRESHOLD,
+        system_state=None,
+        adaptive: bool = False,
+    ):
         self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
+        self.microphone = create_source()
         self.on_wake_callback = on_wake_callback
 
+        # adaptive mode: `system_state` is a skills.system_state.SystemState
+        self.system_state = system_state
+        self.adaptive = adaptive and system_state is not None
+        self.mode = "full"
+        self._source_mode = "full"
+        self._last_activity = time.monotonic()
+        self._monitor: threading.Thread | None = None
+
+        # listener-thread CPU and wall seconds spent in each mode
+        self._usage = {mode: [0.0, 0.0] for mode in PROFILES}
+        self._usage_mark: Optional[tuple[float, float]] = None
+
+        # compiled once; recompiled only when the wake words change
+        self.matcher = PhoneticMatcher(wake_words or WAKE_WORDS, threshold)
+
         self._running = False
         self._thread: threading.Thread | None = None
 
@@ -37,31 +86,99 @@ class WakeWordEngine:
         )
         self._thread.start()
 
+        if self.adaptive and not (self._monitor and self._monitor.is_alive()):
+            self._monitor = threading.Thread(target=self._monitor_loop, daemon=True)
+            self._monitor.start()
+
     def stop(self):
         self._running = False
 
+    # ---------------- ADAPTIVE DUTY CYCLE ----------------
+    def _monitor_loop(self):
+        while self._running:
+            self._update_mode()
+            time.sleep(ADAPT_INTERVAL)
+
+    def _update_mode(self):
+        state = self.system_state
+        try:
+            state.refresh_power()
+        except Exception as e:
+            print("WakeWordEngine power check error:", repr(e))
+            return
+
+        recently_active = time.monotonic() - self._last_activity < ACTIVITY_HOLD
+        constrained = state.is_on_battery() or state.cpu > HIGH_CPU_PERCENT
+
+        mode = "low_power" if constrained and not recently_active else "full"
+        if mode != self.mode:
+            print(f"WakeWordEngine switching to {mode} mode")
+            self.mode = mode
+
+    def _note_activity(self):
+        self._last_activity = time.monotonic()
+        if self.mode != "full":
+            print("WakeWordEngine: sound detected, back to full sensitivity")
+            self.mode = "full"
+
+    def _account(self):
+        now = (time.thread_time(), time.perf_counter())
+        if self._usage_mark is not None:
+            usage = self._usage[self._source_mode]
+            usage[0] += now[0] - self._usage_mark[0]
+            usage[1] += now[1] - self._usage_mark[1]
+        self._usage_mark = now
+
+    def cpu_usage(self) -> dict:
+        """
+        Listener-thread CPU use per mode, as percent of one core while in
+        that mode, plus the seconds spent in it.
+        """
+        return {
+            mode: {
+                "cpu_percent": (cpu / wall * 100) if wall else 0.0,
+                "seconds": wall,
+            }
+            for mode, (cpu, wall) in self._usage.items()
+        }
+
     def _listen_loop(self):
         while self._running:
+            mode = self.mode
+            profile = PROFILES[mode]
+            if mode != self._source_mode:
+                self._account()
+                self.microphone = create_source(chunk_size=profile["chunk_size"])
+                self._source_mode = mode
+
             try:
                 with self.microphone as source:
+                    self.recognizer.dynamic_energy_threshold = profile["dynamic_energy"]
                     # Re‑calibrate each time we successfully open a stream
-                    self.recognizer.adjust_for_ambient_noise(source, duration=0.6)
-                    print("WakeWordEngine listening for wake word...")
+                    if profile["calibrate"]:
+                        self.recognizer.adjust_for_ambient_noise(
+                            source, duration=profile["calibrate"]
+                        )
+                    self.recognizer.energy_threshold = max(
+                        self.recognizer.energy_threshold, profile["min_energy"]
+                    )
+                    print(f"WakeWordEngine listening for wake word ({mode})...")
 
-                    while self._running:
+                    while self._running and self.mode == mode:
+                        self._account()
                         try:
                             audio = self.recognizer.listen(
                                 source,
-                                timeout=None,
-                                phrase_time_limit=4,
+                                timeout=LISTEN_TIMEOUT,
+                                phrase_time_limit=profile["phrase_time_limit"],
                             )
+                            # listen() only returns once the energy threshold
+                            # was crossed: any sound counts, recognized or not
+                            self._note_activity()
 
                             recognizer = cast(sr.Recognizer, self.recognizer)
                             try:
-                                text = recognizer.recognize_google(
-                                    audio,
-                                    language="en-IN",
-                                )
+                                text = recognize_audio(recognizer, audio)
                             except sr.UnknownValueError:
                                 continue
                             except sr.RequestError:
@@ -79,6 +196,8 @@ class WakeWordEngine:
                                 self.on_wake_callback()
                                 time.sleep(1.2)
 
+                        except sr.WaitTimeoutError:
+                            continue
                         except OSError as e:
                             if e.errno == -9988:
                                 print("WakeWordEngine: audio stream closed, will recreate mic.")
@@ -89,6 +208,8 @@ class WakeWordEngine:
                         except Exception as e:
                             print("WakeWordEngine error:", repr(e))
                             continue
+                    # thread_time() is per thread: account from this one
+                    self._account()
 
             except Exception as e:
                 # Errors when opening the microphone itself; wait and retry
@@ -97,41 +218,53 @@ class WakeWordEngine:
                 continue
 
 
+    def set_wake_words(self, wake_words: Iterable[str], threshold: Optional[float] = None):
+        if threshold is not None:
+            self.matcher.threshold = threshold
+        self.matcher.compile(wake_words)
+
     def _contains_wake_word(self, text: str) -> bool:
         """
-        Accepts exact wake phrases and close variants for 'orbit'.
-        This makes wake word more robust against small recognition errors.
+        Phonetic match against the configured wake phrases, so close
+        misrecognitions ("or bit", "orbit,") are accepted without listing them.
         """
-        t = text.lower()
-
-        for wake in WAKE_WORDS:
-            if wake in t:
-                return True
-
-        words = t.split()
-        if "orbit" in words:
-            return True
-
-    
-        fuzzy_bits = [
-            "or bit",
-            "or but",
-            "hobbit",
-            "orbit.",
-            "orbit,",
-            "orbit!",
-            "orbit?",
-            "hey orbit.",
-            "hey orbit,",
-            "ok orbit.",
-            "ok orbit,",
-        ]
-        for fb in fuzzy_bits:
-            if fb in t:
-                return True
-
-
-        if t.startswith("orbit ") or t.startswith("hey orbit ") or t.startswith("ok orbit "):
-            return True
-
-        return False
+        return self.matcher.matches(text)
+
+
+def measure_idle_cpu(seconds: float = 30.0, silent: bool = False) -> dict:
+    """
+    Run the listener in each mode for `seconds` and return its CPU use per
+    mode (see cpu_usage). Uses the microphone, so measure in a quiet room,
+    or `silent` for a paced quiet-room source (core/audio_replay.py).
+    """
+    from core import voice_engine
+
+    if silent:
+        from core.audio_replay import SilenceSource
+        voice_engine.set_source_factory(lambda **kw: SilenceSource(**kw))
+    results = {}
+    try:
+        for mode in PROFILES:
+            engine = WakeWordEngine(lambda: None)
+            engine.mode = mode
+            engine.start()
+            time.sleep(seconds)
+            engine.stop()
+            assert engine._thread is not None
+            engine._thread.join(LISTEN_TIMEOUT + PROFILES[mode]["phrase_time_limit"] + 1)
+            results[mode] = engine.cpu_usage()[mode]
+    finally:
+        if silent:
+            voice_engine.set_source_factory(None)
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Measure idle CPU of the wake word listener.")
+    parser.add_argument("--seconds", type=float, default=30.0, help="time spent in each mode")
+    parser.add_argument("--silent", action="store_true", help="use a quiet synthetic source instead of the microphone")
+    args = parser.parse_args()
+    print(json.dumps(measure_idle_cpu(args.seconds, args.silent), indent=2))
@@ -1,4 +1,71 @@
-from ui.frontend import launch_ui
+import argparse
+import sys
 
-if __name__ == "__main__":
+
+def main():
+    parser = argparse.ArgumentParser(description="OrbitOS – Intelligent System Agent")
+    parser.add_argument(
+        "--record",
+        metavar="DIR",
+        help="record every microphone session to WAV files in DIR",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="write per-command stage latency traces to FILE on exit",
+    )
+    parser.add_argument(
+        "--trace-format",
+        choices=("json", "chrome"),
+        default="json",
+        help="chrome: load FILE in chrome://tracing or ui.perfetto.dev",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="run headless and serve JSON-RPC on a Unix socket (see core/daemon.py)",
+    )
+    parser.add_argument("--socket", metavar="PATH", help="daemon socket path")
+    parser.add_argument(
+        "--voice", action="store_true", help="daemon: also listen for the wake word"
+    )
+    parser.add_argument(
+        "--tts", action="store_true", help="daemon: speak replies (default: silent)"
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="run the text commands in FILE (lines or JSONL) and report latency",
+    )
+    parser.add_argument(
+        "--confirm",
+        choices=("no", "yes", "first"),
+        default="no",
+        help="batch: how to answer confirmation questions",
+    )
+    parser.add_argument("--report", metavar="FILE", help="batch: write the JSON report to FILE")
+    args = parser.parse_args()
+
+    if args.record:
+        from core.audio_replay import start_recording
+        start_recording(args.record)
+
+    if args.trace:
+        from core.tracing import dump_on_exit
+        dump_on_exit(args.trace, args.trace_format)
+
+    if args.batch:
+        from core.batch_runner import main as run_batch_file
+        sys.exit(run_batch_file(args.batch, args.confirm, args.report))
+
+    if args.daemon:
+        from core.daemon import DEFAULT_SOCKET, run_daemon
+        run_daemon(args.socket or DEFAULT_SOCKET, voice=args.voice, tts=args.tts)
+        return
+
+    from ui.frontend import launch_ui
     launch_ui()
+
+
+if __name__ == "__main__":
+    main()
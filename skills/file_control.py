@@ -1,6 +1,8 @@
 import os
 import shutil
 
+# Default folder. Every function takes the folder to work in as `base_dir`
+# (each session has its own), falling back to this one.
 BASE_DIR = os.getcwd()
 
 def get_base_dir():
@@ -11,41 +13,51 @@ def set_base_dir(path):
     global BASE_DIR
     BASE_DIR = path
 
-def create_file(name):
-    path = os.path.join(BASE_DIR, name)
-    folder_name = os.path.basename(BASE_DIR)
+def create_file(name, base_dir=None):
+    base_dir = base_dir or BASE_DIR
+    path = os.path.join(base_dir, name)
+    folder_name = os.path.basename(base_dir)
     if os.path.exists(path):
         return f"The file named {name} already exists in the folder {folder_name}"
     open(path, 'w').close()
     return f"A new file named {name} has been created in the folder {folder_name}."
 
 
-def delete_file(name):
-    path = os.path.join(BASE_DIR, name)
-    folder_name = os.path.basename(BASE_DIR)
+def delete_file(name, base_dir=None, remove=None):
+    """
+    `remove(path)` replaces the permanent os.remove (e.g. move to a trash).
+    A folder is refused; that is delete_folder's job.
+    """
+    base_dir = base_dir or BASE_DIR
+    path = os.path.join(base_dir, name)
+    folder_name = os.path.basename(base_dir)
     if not os.path.exists(path):
         return f"I could not find a file named {name}."
-    os.remove(path)
+    if os.path.isdir(path) and not os.path.islink(path):
+        return f"{name} is a folder. Ask me to delete the folder instead."
+    (remove or os.remove)(path)
     return f"The file named {name} has been successfully deleted from {folder_name}."
 
-def create_folder(name):
-    path = os.path.join(BASE_DIR, name)
-    folder_name = os.path.basename(BASE_DIR)
+def create_folder(name, base_dir=None):
+    base_dir = base_dir or BASE_DIR
+    path = os.path.join(base_dir, name)
+    folder_name = os.path.basename(base_dir)
     if os.path.exists(path):
         return f"Folder '{name}' already exists."
     os.mkdir(path)
     return f"Folder '{name}' created in the parent folder {folder_name}"
 
-def delete_folder(name):
-    path = os.path.join(BASE_DIR, name)
+def delete_folder(name, base_dir=None, remove=None):
+    base_dir = base_dir or BASE_DIR
+    path = os.path.join(base_dir, name)
     if not os.path.exists(path):
         return f"Folder '{name}' not found."
-    shutil.rmtree(path)
+    (remove or shutil.rmtree)(path)
     return f"Folder '{name}' deleted."
 
-def list_items():
-    folder_name = os.path.basename(BASE_DIR)
-    items = os.listdir(BASE_DIR)
+def list_items(base_dir=None):
+    base_dir = base_dir or BASE_DIR
+    items = os.listdir(base_dir)
     if not items:
         return "The selected folder is empty."
     return (
@@ -53,31 +65,31 @@ def list_items():
         ", ".join(items)
     )
 
-def get_current_folder():
-    return os.path.basename(BASE_DIR)
+def get_current_folder(base_dir=None):
+    return os.path.basename(base_dir or BASE_DIR)
 
-def navigate_to_folder(folder_name):
-    global BASE_DIR
-    target = os.path.join(BASE_DIR, folder_name)
+def navigate_to_folder(folder_name, base_dir=None):
+    """
+    Returns (message, new_folder). new_folder is None if nothing changed;
+    the caller decides whose folder that is.
+    """
+    base_dir = base_dir or BASE_DIR
+    target = os.path.join(base_dir, folder_name)
 
     if not os.path.exists(target):
-        return f"I could not find a folder named {folder_name}."
+        return f"I could not find a folder named {folder_name}.", None
 
     if not os.path.isdir(target):
-        return f"{folder_name} is not a folder."
-    
-    BASE_DIR = os.path.abspath(target)
-
+        return f"{folder_name} is not a folder.", None
 
-    BASE_DIR = target
-    return f"I have moved into the folder {folder_name}."
+    return f"I have moved into the folder {folder_name}.", os.path.abspath(target)
 
-def go_back():
-    global BASE_DIR
-    parent = os.path.dirname(BASE_DIR)
+def go_back(base_dir=None):
+    """Returns (message, new_folder) like navigate_to_folder."""
+    base_dir = base_dir or BASE_DIR
+    parent = os.path.dirname(base_dir)
 
-    if parent == BASE_DIR:
-        return "You are already at the root directory."
+    if parent == base_dir:
+        return "You are already at the root directory.", None
 
-    BASE_DIR = parent
-    return f"I have moved back to the folder {os.path.basename(BASE_DIR)}."
+    return f"I have moved back to the folder {os.path.basename(parent)}.", parent
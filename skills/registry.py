@@ -0,0 +1,182 @@
+# skills/registry.py
+"""
+Lazy skill registry.
+
+Each skill declares the intents it handles and is imported the first time
+one of its functions is used, so e.g. screen_analyzer (torch, transformers,
+pytesseract, win32gui) costs nothing until someone asks about the screen.
+A skill whose dependencies are missing on this platform is reported as
+unavailable instead of breaking startup.
+
+Skills marked `prewarm` are imported in a background thread after startup.
+ORBIT_PREWARM_SKILLS overrides that: "all", "none" or a comma separated list.
+"""
+
+import importlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class SkillSpec:
+    name: str
+    module: str
+    intents: Tuple[str, ...]
+    description: str
+    prewarm: bool = False
+
+
+SKILLS: List[SkillSpec] = [
+    SkillSpec("system_info", "skills.system_info", ("get_time", "get_date"), "time and date", prewarm=True),
+    SkillSpec(
+        "file_control", "skills.file_control",
+        ("create_file", "delete_file", "create_folder", "delete_folder",
+         "list_files", "navigate_in", "navigate_out"),
+        "file management", prewarm=True,
+    ),
+    SkillSpec(
+        "application_control", "skills.application_control",
+        ("open_application", "close_application", "list_installed_apps", "refresh_apps"),
+        "application control",
+    ),
+    SkillSpec(
+        "volume_control", "skills.volume_control",
+        ("set_volume", "increase_volume", "decrease_volume", "mute_volume", "unmute_volume"),
+        "volume control", prewarm=True,
+    ),
+    SkillSpec(
+        "power_control", "skills.power_control",
+        ("shutdown_system", "restart_system", "sleep_system"),
+        "power control",
+    ),
+    SkillSpec(
+        "alarm_control", "skills.alarm_control",
+        ("set_alarm", "cancel_alarm", "get_alarm"),
+        "alarms", prewarm=True,
+    ),
+    SkillSpec(
+        "screen_analyzer", "skills.screen_analyzer",
+        ("describe_screen", "read_screen_text", "foreground_window_info"),
+        "screen analysis",
+    ),
+    SkillSpec("wiki_skill", "skills.wiki_skill", ("wiki_search",), "Wikipedia search"),
+    SkillSpec("weather_skill", "skills.weather_skill", ("weather_status",), "weather"),
+]
+
+
+class SkillUnavailable(Exception):
+    def __init__(self, spec: SkillSpec, reason: str):
+        super().__init__(f"{spec.name} is unavailable: {reason}")
+        self.spec = spec
+        self.reason = reason
+
+
+class LazySkill:
+    """Stands in for a skill module; the first attribute access imports it."""
+
+    def __init__(self, registry: "SkillRegistry", name: str):
+        self._registry = registry
+        self._name = name
+
+    def __getattr__(self, attr: str):
+        return getattr(self._registry.load(self._name), attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy skill {self._name}>"
+
+
+class SkillRegistry:
+    def __init__(self, specs: Iterable[SkillSpec] = SKILLS):
+        self.specs: Dict[str, SkillSpec] = {s.name: s for s in specs}
+        self._by_intent = {i: s.name for s in self.specs.values() for i in s.intents}
+        # one lock per skill: a slow import never blocks loading another skill
+        self._locks = {name: threading.Lock() for name in self.specs}
+        self._modules: Dict[str, ModuleType] = {}
+        self._errors: Dict[str, str] = {}
+        self._load_ms: Dict[str, float] = {}
+
+    def skill_for(self, intent: Optional[str]) -> Optional[SkillSpec]:
+        name = self._by_intent.get(intent or "")
+        return self.specs[name] if name else None
+
+    def lazy(self, name: str) -> LazySkill:
+        if name not in self.specs:
+            raise KeyError(f"Unknown skill: {name}")
+        return LazySkill(self, name)
+
+    def load(self, name: str) -> ModuleType:
+        """Import the skill once; raises SkillUnavailable if that fails."""
+        spec = self.specs[name]
+        module = self._modules.get(name)
+        if module is not None:
+            return module
+
+        with self._locks[name]:
+            if name in self._modules:
+                return self._modules[name]
+            if name in self._errors:
+                raise SkillUnavailable(spec, self._errors[name])
+
+            start = time.perf_counter()
+            try:
+                module = importlib.import_module(spec.module)
+            except Exception as e:
+                self._errors[name] = repr(e)
+                print(f"Skill {name} unavailable:", repr(e))
+                raise SkillUnavailable(spec, repr(e)) from e
+            self._load_ms[name] = (time.perf_counter() - start) * 1000
+            self._modules[name] = module
+            print(f"Loaded skill {name} in {self._load_ms[name]:.0f} ms")
+            return module
+
+    def available(self, name: str) -> bool:
+        try:
+            self.load(name)
+            return True
+        except SkillUnavailable:
+            return False
+
+    def prewarm(self, names: Optional[Iterable[str]] = None) -> threading.Thread:
+        """Import skills in a background thread; failures are only recorded."""
+        if names is None:
+            names = self._prewarm_names()
+        names = list(names)
+
+        def worker():
+            for name in names:
+                self.available(name)
+
+        thread = threading.Thread(target=worker, name="skill-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def _prewarm_names(self) -> List[str]:
+        setting = os.getenv("ORBIT_PREWARM_SKILLS", "").strip().lower()
+        if setting == "all":
+            return list(self.specs)
+        if setting == "none":
+            return []
+        if setting:
+            return [n.strip() for n in setting.split(",") if n.strip() in self.specs]
+        return [s.name for s in self.specs.values() if s.prewarm]
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            name: {
+                "loaded": name in self._modules,
+                "load_ms": self._load_ms.get(name),
+                "error": self._errors.get(name),
+            }
+            for name in self.specs
+        }
+
+
+_registry = SkillRegistry()
+
+
+def get_registry() -> SkillRegistry:
+    return _registry
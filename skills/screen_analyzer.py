@@ -1,6 +1,6 @@
 # skills/screen_analyzer.py
 
-from typing import Optional, Tuple
+from typing import Iterator, List, Optional, Tuple
 
 from PIL import ImageGrab, ImageDraw, ImageOps, Image
 import win32gui  # type: ignore
@@ -18,6 +18,12 @@ pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tessera
 _CAPTION_MODEL_NAME = "nlpconnect/vit-gpt2-image-captioning"
 _MAX_CAPTION_SIZE: Tuple[int, int] = (1024, 1024)
 
+# Streaming OCR: the capture is cut into horizontal bands of roughly this
+# height, on blank rows so no text line is split, and each band is OCR'd
+# and yielded on its own.
+_OCR_BAND_HEIGHT = 360
+_OCR_CUT_SEARCH = 80
+
 
 
 _caption_model: VisionEncoderDecoderModel | None = None
@@ -149,29 +155,69 @@ def describe_current_screen() -> str:
 
 
 
-def read_screen_text() -> str:
+def _capture_for_reading() -> Image.Image:
+    fg_hwnd = win32gui.GetForegroundWindow()
+    orbit_hwnd = _get_orbitos_hwnd()
 
-    try:
-        fg_hwnd = win32gui.GetForegroundWindow()
-        orbit_hwnd = _get_orbitos_hwnd()
+    if fg_hwnd and orbit_hwnd and fg_hwnd != orbit_hwnd:
+      
+        rect = _get_window_client_rect(fg_hwnd)
+        return _capture_region(rect)
 
-        if fg_hwnd and orbit_hwnd and fg_hwnd != orbit_hwnd:
-          
-            rect = _get_window_client_rect(fg_hwnd)
-            img = _capture_region(rect)
-        else:
-         
-            img = _capture_full_screen()
-            img = _mask_orbitos_window(img)
+    img = _capture_full_screen()
+    return _mask_orbitos_window(img)
 
-        gray = ImageOps.grayscale(img)
-        text = pytesseract.image_to_string(gray).strip()
 
-        if not text:
-            return "I could not read any text from the screen."
-        return text
+def _is_blank_row(gray: Image.Image, y: int) -> bool:
+    low, high = gray.crop((0, y, gray.width, y + 1)).getextrema()
+    return high - low < 40
+
+
+def _band_cuts(gray: Image.Image) -> List[int]:
+    cuts = [0]
+    y = _OCR_BAND_HEIGHT
+    while y < gray.height:
+        cut = y
+        for candidate in range(y, min(y + _OCR_CUT_SEARCH, gray.height)):
+            if _is_blank_row(gray, candidate):
+                cut = candidate
+                break
+        cuts.append(cut)
+        y = cut + _OCR_BAND_HEIGHT
+    cuts.append(gray.height)
+    return cuts
+
+
+def iter_screen_text() -> Iterator[str]:
+    """
+    Yield the screen text paragraph by paragraph, OCR-ing the capture in
+    horizontal bands so the first paragraph is ready long before the
+    whole screen has been processed.
+    """
+    try:
+        gray = ImageOps.grayscale(_capture_for_reading())
+        cuts = _band_cuts(gray)
+
+        found = False
+        for top, bottom in zip(cuts, cuts[1:]):
+            if bottom <= top:
+                continue
+            band = gray.crop((0, top, gray.width, bottom))
+            text = pytesseract.image_to_string(band).strip()
+            for paragraph in text.split("\n\n"):
+                paragraph = " ".join(paragraph.split())
+                if paragraph:
+                    found = True
+                    yield paragraph
+
+        if not found:
+            yield "I could not read any text from the screen."
     except Exception as e:
-        return f"I could not read text from the screen: {e}"
+        yield f"I could not read text from the screen: {e}"
+
+
+def read_screen_text() -> str:
+    return "\n\n".join(iter_screen_text())
 
 
 
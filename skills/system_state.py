@@ -26,6 +26,21 @@ class SystemState:
         self.uptime_min = get_system_uptime_minutes()
 
 
+    def refresh_power(self):
+        """
+        Cheap refresh of the values used for power decisions only
+        (skips the disk, network and uptime checks).
+        """
+        self.cpu = get_cpu_usage()
+        self.memory = get_memory_usage()
+        self.battery = get_battery_status()
+
+    def is_on_battery(self) -> bool:
+        return bool(
+            self.battery.get("available") and
+            not self.battery.get("plugged_in")
+        )
+
     def is_high_load(self) -> bool:
         return self.cpu > 80 or self.memory["percent"] > 85
 
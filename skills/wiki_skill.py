@@ -1,5 +1,7 @@
 # skills/wiki_skill.py
 
+from typing import Iterator
+
 import wikipedia #type:ignore
 
 
@@ -23,3 +25,15 @@ def wikipedia_summary(query: str, sentences: int = 2) -> str:
         return f"I could not find a Wikipedia page for {query}."
     except Exception as e:
         return f"Something went wrong while fetching Wikipedia: {e}"
+
+
+def iter_wikipedia_summary(query: str, sentences: int = 2) -> Iterator[str]:
+    """
+    The summary paragraph by paragraph, for the controller's streamed
+    replies. The summary itself comes whole in one request, so this only
+    splits it; it streams nothing from the network.
+    """
+    for paragraph in wikipedia_summary(query, sentences).split("\n"):
+        paragraph = paragraph.strip()
+        if paragraph:
+            yield paragraph
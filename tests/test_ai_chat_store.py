@@ -0,0 +1,100 @@
+# tests/test_ai_chat_store.py
+"""
+AIChatStore's append-only log: recovery from a torn last line, compaction,
+the index checkpoint, and two stores writing the same log.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import ai_chat_store  # noqa: E402
+from core.ai_chat_store import AIChatStore  # noqa: E402
+
+
+def _contents(store, chat_id):
+    return [m.content for m in store.get_messages(chat_id)]
+
+
+def test_messages_survive_a_restart(tmp_path):
+    store = AIChatStore(tmp_path)
+    chat = store.create_chat("first")
+    store.add_message(chat.id, "user", "hello")
+    store.add_message(chat.id, "assistant", "hi there")
+    store.close()
+
+    again = AIChatStore(tmp_path)
+    assert [h.title for h in again.headers()] == ["first"]
+    assert _contents(again, chat.id) == ["hello", "hi there"]
+    assert again.last_page(chat.id, 1) == (1, again.get_messages(chat.id, 1))
+
+
+def test_torn_last_line_is_dropped(tmp_path):
+    store = AIChatStore(tmp_path)
+    chat = store.create_chat()
+    store.add_message(chat.id, "user", "kept")
+    # a crash in the middle of the next append
+    with open(tmp_path / ai_chat_store.LOG_NAME, "ab") as f:
+        f.write(b'{"op": "msg", "chat": "' + chat.id.encode() + b'", "role": "us')
+    os.remove(tmp_path / ai_chat_store.INDEX_NAME)
+
+    again = AIChatStore(tmp_path)
+    assert _contents(again, chat.id) == ["kept"]
+    # the torn bytes are gone, so the next append starts on a fresh line
+    again.add_message(chat.id, "assistant", "after")
+    assert _contents(AIChatStore(tmp_path), chat.id) == ["kept", "after"]
+
+
+def test_compaction_keeps_live_chats(tmp_path):
+    store = AIChatStore(tmp_path)
+    keep = store.create_chat("keep")
+    gone = store.create_chat("gone")
+    for i in range(5):
+        store.add_message(keep.id, "user", f"m{i}")
+        store.add_message(gone.id, "user", f"x{i}")
+    store.set_summary(keep.id, 2, "two messages")
+    store.set_cache(keep.id, False)
+    for i in range(ai_chat_store.COMPACT_MIN_RECORDS):
+        store.rename_chat(keep.id, f"title {i}")
+    store.delete_chat(gone.id)
+    log = tmp_path / ai_chat_store.LOG_NAME
+    before = log.stat().st_size
+
+    store.compact()
+    assert log.stat().st_size < before
+    for s in (store, AIChatStore(tmp_path)):
+        header = s.get_header(keep.id)
+        assert header.title == f"title {ai_chat_store.COMPACT_MIN_RECORDS - 1}"
+        assert (header.summary_upto, header.summary, header.cache) == (2, "two messages", False)
+        assert _contents(s, keep.id) == [f"m{i}" for i in range(5)]
+        assert s.get_header(gone.id) is None
+
+
+def test_two_stores_share_the_log(tmp_path):
+    first = AIChatStore(tmp_path)
+    chat = first.create_chat()
+    second = AIChatStore(tmp_path)
+
+    def write(store, tag):
+        for i in range(60):
+            store.add_message(chat.id, "user", f"{tag}{i}")
+            if i % 20 == 0:
+                store.compact()
+
+    threads = [threading.Thread(target=write, args=(s, t)) for s, t in ((first, "a"), (second, "b"))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    expected = sorted(f"{t}{i}" for t in "ab" for i in range(60))
+    for s in (first, second, AIChatStore(tmp_path)):
+        assert sorted(_contents(s, chat.id)) == expected
+    # search positions point at the right messages
+    for s in (first, second):
+        hit = s.search("a59")[0]
+        assert _contents(s, chat.id)[hit.message_index] == "a59"
@@ -0,0 +1,126 @@
+# tests/test_command_queue.py
+"""
+CommandQueue: the three policies for a full queue, cancelling the running
+command by source, and hold() keeping the next command waiting.
+
+    python -m pytest tests
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.command_queue import CommandQueue, CommandRejected  # noqa: E402
+
+
+def _command(log, name, gate=None):
+    async def run():
+        log.append(f"start {name}")
+        if gate is not None:
+            await gate.wait()
+        log.append(f"end {name}")
+        return name
+    return run
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def _busy_queue(policy):
+    """A queue of one slot, with a command running and one waiting."""
+    queue = CommandQueue(maxsize=1, policy=policy)
+    log, gate = [], asyncio.Event()
+    running = asyncio.ensure_future(queue.submit("text", _command(log, "running", gate)))
+    await _settle()
+    waiting = asyncio.ensure_future(queue.submit("text", _command(log, "waiting")))
+    await _settle()
+    return queue, log, gate, running, waiting
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        CommandQueue(policy="drop_all")
+
+
+def test_queue_waits_for_room():
+    async def main():
+        queue, log, gate, running, waiting = await _busy_queue("queue")
+        third = asyncio.ensure_future(queue.submit("voice", _command(log, "third")))
+        await _settle()
+        assert not third.done() and len(queue) == 1
+        gate.set()
+        assert await asyncio.gather(running, waiting, third) == ["running", "waiting", "third"]
+        assert log == ["start running", "end running", "start waiting", "end waiting", "start third", "end third"]
+        assert queue.stats()["completed"] == 3
+
+    asyncio.run(main())
+
+
+def test_replace_latest_drops_the_waiting_command():
+    async def main():
+        queue, log, gate, running, waiting = await _busy_queue("replace_latest")
+        newer = asyncio.ensure_future(queue.submit("text", _command(log, "newer")))
+        await _settle()
+        assert waiting.cancelled()
+        gate.set()
+        assert await asyncio.gather(running, newer) == ["running", "newer"]
+        assert "start waiting" not in log
+        assert queue.stats()["replaced"] == 1
+
+    asyncio.run(main())
+
+
+def test_reject_refuses_the_new_command():
+    async def main():
+        queue, log, gate, running, waiting = await _busy_queue("reject")
+        with pytest.raises(CommandRejected):
+            await queue.submit("text", _command(log, "refused"))
+        gate.set()
+        assert await asyncio.gather(running, waiting) == ["running", "waiting"]
+        assert queue.stats()["rejected"] == 1
+
+    asyncio.run(main())
+
+
+def test_cancel_current_only_for_its_source():
+    async def main():
+        queue = CommandQueue()
+        log, gate = [], asyncio.Event()
+        typed = asyncio.ensure_future(queue.submit("text", _command(log, "typed", gate)))
+        await _settle()
+        # a wake word doesn't stop a typed command
+        assert not queue.cancel_current(source="voice")
+        assert queue.cancel_current(source="text")
+        with pytest.raises(asyncio.CancelledError):
+            await typed
+        # the queue keeps going
+        assert await queue.submit("voice", _command(log, "next")) == "next"
+        assert "end typed" not in log
+
+    asyncio.run(main())
+
+
+def test_hold_keeps_the_next_command_waiting():
+    async def main():
+        queue = CommandQueue()
+        log, leftover = [], asyncio.Event()
+
+        async def first():
+            queue.hold(leftover.wait())
+            return "first"
+
+        assert await queue.submit("text", first) == "first"
+        second = asyncio.ensure_future(queue.submit("text", _command(log, "second")))
+        await _settle()
+        assert log == [] and queue.busy()
+        leftover.set()
+        assert await second == "second"
+        queue.close()
+
+    asyncio.run(main())
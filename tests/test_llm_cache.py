@@ -0,0 +1,66 @@
+# tests/test_llm_cache.py
+"""
+ResponseCache: lookups, TTL, eviction and forgetting a chat's entries.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm_cache import ResponseCache  # noqa: E402
+
+QUESTION = [{"role": "user", "content": "what  is\nan orbit?"}]
+
+
+def test_hit_ignores_whitespace(tmp_path):
+    cache = ResponseCache(tmp_path)
+    cache.put("m", QUESTION, "a path around a body")
+    assert cache.get("m", [{"role": "user", "content": "what is an orbit?"}]) == "a path around a body"
+    assert cache.get("other-model", QUESTION) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_expired_entry_is_evicted_even_if_read(tmp_path):
+    cache = ResponseCache(tmp_path, ttl=0.3)
+    cache.put("m", QUESTION, "old")
+    time.sleep(0.2)
+    assert cache.get("m", QUESTION) == "old"
+    time.sleep(0.15)
+    # stored 0.35s ago, read 0.15s ago: the read doesn't keep it alive
+    cache._evict_disk()
+    assert list(tmp_path.glob("*.json")) == []
+    assert cache.stats()["disk_bytes"] == 0
+    assert cache.get("m", QUESTION) is None
+
+
+def test_overwrite_counts_the_file_once(tmp_path):
+    cache = ResponseCache(tmp_path)
+    for n in range(5):
+        cache.put("m", QUESTION, "x" * (n + 1))
+    on_disk = sum(p.stat().st_size for p in tmp_path.glob("*.json"))
+    assert cache.stats()["disk_bytes"] == on_disk
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_eviction_keeps_recently_used(tmp_path):
+    cache = ResponseCache(tmp_path, max_disk_bytes=10_000)
+    for n in range(20):
+        cache.put("m", [{"role": "user", "content": f"q{n}"}], "r" * 800)
+        # q0 stays in use
+        cache.get("m", [{"role": "user", "content": "q0"}])
+    assert cache.stats()["disk_bytes"] <= 10_000
+    assert cache.get("m", [{"role": "user", "content": "q0"}]) is not None
+    assert cache.get("m", [{"role": "user", "content": "q1"}]) is None
+
+
+def test_forget_removes_only_the_tag(tmp_path):
+    cache = ResponseCache(tmp_path)
+    cache.put("m", QUESTION, "one", tag="chat-1")
+    cache.put("m", QUESTION + QUESTION, "two", tag="chat-2")
+    cache.forget("chat-1")
+    assert cache.get("m", QUESTION) is None
+    assert cache.get("m", QUESTION + QUESTION) == "two"
@@ -0,0 +1,161 @@
+# tests/test_llm_stream.py
+"""
+LLMClient.chat_stream against a local stub server speaking the three reply
+formats it understands: server-sent events, newline-delimited JSON and a
+plain JSON body.
+
+    python -m pytest tests
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# LLMClient needs requests; the other tests don't
+pytest.importorskip("requests")
+
+from core.llm_cache import ResponseCache  # noqa: E402
+from core.llm_client import LLMClient, LLMConfig  # noqa: E402
+
+PIECES = ["Hel", "lo, ", "wor", "ld!"]
+# /stall waits this long after the first piece
+STALL = 1.0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # the path picks the format: /sse, /stall, /cut, /ndjson or /json
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.server.requests.append(json.loads(self.rfile.read(length)))
+
+        if self.path == "/stall":
+            self._start("text/event-stream")
+            self._send(f"data: {json.dumps({'response': PIECES[0]})}\n\n")
+            time.sleep(STALL)
+            self._send(f"data: {json.dumps({'response': ''.join(PIECES[1:])})}\n\n")
+            self._send("data: [DONE]\n\n")
+        elif self.path == "/cut":
+            # the connection drops before [DONE]
+            self._start("text/event-stream")
+            for piece in PIECES[:2]:
+                self._send(f"data: {json.dumps({'response': piece})}\n\n")
+        elif self.path == "/sse":
+            self._start("text/event-stream")
+            self._send(": keep-alive\n\n")
+            for piece in PIECES:
+                chunk = {"choices": [{"delta": {"content": piece}}]}
+                self._send(f"data: {json.dumps(chunk)}\n\n")
+            self._send("data: [DONE]\n\n")
+        elif self.path == "/ndjson":
+            self._start("application/x-ndjson")
+            for piece in PIECES:
+                self._send(json.dumps({"message": {"role": "assistant", "content": piece}, "done": False}) + "\n")
+            self._send(json.dumps({"message": {"role": "assistant", "content": ""}, "done": True}) + "\n")
+        else:
+            body = json.dumps({"choices": [{"message": {"role": "assistant", "content": "".join(PIECES)}}]})
+            self._start("application/json")
+            self._send(body)
+
+    def _start(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+    def _send(self, text: str):
+        self.wfile.write(text.encode("utf-8"))
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _client(server, path: str, cache=None) -> LLMClient:
+    host, port = server.server_address
+    config = LLMConfig(base_url=f"http://{host}:{port}{path}", cache=False, retries=0)
+    return LLMClient(config, cache)
+
+
+@pytest.mark.parametrize("path", ["/sse", "/ndjson"])
+def test_stream_yields_pieces(server, path):
+    client = _client(server, path)
+    try:
+        pieces = list(client.chat_stream([{"role": "user", "content": "hi"}]))
+    finally:
+        client.close()
+    assert pieces == PIECES
+    assert server.requests[0]["stream"] is True
+    assert server.requests[0]["messages"] == [{"role": "user", "content": "hi"}]
+
+
+def test_stream_yields_short_events_without_waiting(server):
+    client = _client(server, "/stall")
+    try:
+        start = time.perf_counter()
+        pieces = client.chat_stream([{"role": "user", "content": "hi"}])
+        assert next(pieces) == PIECES[0]
+        assert time.perf_counter() - start < STALL / 2
+        assert list(pieces) == ["".join(PIECES[1:])]
+    finally:
+        client.close()
+
+
+def test_stream_json_body_yields_whole_reply(server):
+    client = _client(server, "/json")
+    try:
+        pieces = list(client.chat_stream([{"role": "user", "content": "hi"}]))
+    finally:
+        client.close()
+    assert pieces == ["".join(PIECES)]
+
+
+def test_chat_reads_json_body(server):
+    client = _client(server, "/json")
+    try:
+        reply = client.chat([{"role": "user", "content": "hi"}])
+    finally:
+        client.close()
+    assert reply == "".join(PIECES)
+    assert "stream" not in server.requests[0]
+
+
+def test_stream_cached_only_when_finished(server, tmp_path):
+    cache = ResponseCache(tmp_path)
+    messages = [{"role": "user", "content": "hi"}]
+
+    client = _client(server, "/cut", cache)
+    try:
+        assert list(client.chat_stream(messages, cache_tag="chat-1")) == PIECES[:2]
+    finally:
+        client.close()
+    assert cache.get("gpt-4", messages) is None
+
+    client = _client(server, "/sse", cache)
+    try:
+        list(client.chat_stream(messages, cache_tag="chat-1"))
+    finally:
+        client.close()
+    assert cache.get("gpt-4", messages) == "".join(PIECES)
+
+    cache.forget("chat-2")
+    assert cache.get("gpt-4", messages) == "".join(PIECES)
+    cache.forget("chat-1")
+    assert cache.get("gpt-4", messages) is None
@@ -0,0 +1,41 @@
+# tests/test_phonetic_matcher.py
+"""
+The wake phrase matcher against data/wake_word_corpus.csv.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.phonetic_matcher import DEFAULT_THRESHOLD, PhoneticMatcher, evaluate, load_corpus  # noqa: E402
+
+# core/wakeword_engine.py's WAKE_WORDS (that module needs a microphone stack)
+WAKE_WORDS = ["orbit", "hey orbit", "ok orbit"]
+CORPUS = load_corpus(os.path.join(ROOT, "data", "wake_word_corpus.csv"))
+
+
+@pytest.fixture
+def matcher():
+    return PhoneticMatcher(WAKE_WORDS, DEFAULT_THRESHOLD)
+
+
+def test_corpus_has_no_false_accepts(matcher):
+    report = evaluate(matcher, CORPUS, repeats=1)
+    assert report["false_accepts"] == []
+    assert report["false_reject_rate"] <= 0.05
+
+
+@pytest.mark.parametrize("text", ["a robot", "buy a rabbit", "the orb", "a rabid dog", "orbital"])
+def test_article_or_longer_word_does_not_wake(matcher, text):
+    assert not matcher.matches(text)
+
+
+@pytest.mark.parametrize("text", ["or bit", "hey or bit", "orbits", "arbit", "okay orbit"])
+def test_split_or_misheard_wake_word_wakes(matcher, text):
+    assert matcher.matches(text)
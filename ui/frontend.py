@@ -1,4 +1,5 @@
 import sys
+from concurrent.futures import Future
 
 
 from PySide6.QtWidgets import (  # type: ignore
@@ -30,6 +31,7 @@ from PySide6.QtGui import QFont, QAction  # type: ignore
 
 
 from core.assistant_controller import AssistantController
+from core.ai_chat_store import PAGE_SIZE
 from core.speech_engine import toggle_mute, stop_speaking, replay_last
 
 
@@ -138,6 +140,7 @@ class ChatBubble(QFrame):
         label = QLabel(text)
         label.setWordWrap(True)
         label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.label = label
 
         label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
         label.setMaximumWidth(
@@ -183,9 +186,22 @@ class ChatBubble(QFrame):
             layout.addWidget(label)
             layout.addStretch()
 
+    def text(self) -> str:
+        return self.label.text()
+
+    def set_text(self, text: str):
+        self.label.setText(text)
+
 
 class OrbitOS(QWidget):
     voiceResult = Signal(str, str)
+    textReply = Signal(str)
+    aiVoiceHeard = Signal(str)
+    # streamed AI reply: a piece of text, then the end (error text or "")
+    aiDelta = Signal(str, str)
+    aiDone = Signal(str, str)
+    # chat search results (query, hits), computed off the UI thread
+    aiSearchDone = Signal(str, object)
 
     def __init__(self):
         super().__init__()
@@ -193,6 +209,16 @@ class OrbitOS(QWidget):
         self.controller = AssistantController()
         self.current_mode = "assistant"
         self.current_ai_chat_id: str | None = None
+        # index of the oldest message shown; older pages load on scroll up
+        self._ai_loaded_from = 0
+        # one past the newest message shown, None if that is the last one;
+        # newer pages load on scroll down (after jumping to a search hit)
+        self._ai_loaded_to: int | None = None
+        # (chat id, bubble) of the reply being streamed
+        self._ai_stream: tuple[str, ChatBubble] | None = None
+        # chats with a reply in flight, and its future (cancelled when the
+        # chat is deleted); one reply per chat at a time
+        self._ai_inflight: dict[str, Future] = {}
         self.sidebar_collapsed = False
         self.sidebar_expanded_width = 220
         self.theme = "dark"
@@ -201,17 +227,20 @@ class OrbitOS(QWidget):
             lambda heard, reply: self.voiceResult.emit(heard, reply)
         )
 
-        self.controller.on_state_change = lambda s: self.ui_safe(
-            lambda: self.on_state_change(s)
-        )
-        self.controller.on_directory_change = lambda: self.ui_safe(
-            self._update_directory
-        )
-        self.controller.on_message = (
-            lambda text: self.ui_safe(lambda: self.add_assistant_message(text))
-        )
+        # controller signals come from its loop/worker threads; bound slots
+        # make Qt queue them onto the UI thread
+        bridge = self.controller.bridge
+        bridge.stateChanged.connect(self.on_state_change)
+        bridge.directoryChanged.connect(self._update_directory)
+        bridge.message.connect(self.add_assistant_message)
+        bridge.voicePartial.connect(self._on_voice_partial)
 
         self.voiceResult.connect(self._on_voice_result)
+        self.textReply.connect(self.add_assistant_message)
+        self.aiVoiceHeard.connect(self._on_ai_voice_heard)
+        self.aiDelta.connect(self._on_ai_delta)
+        self.aiDone.connect(self._on_ai_done)
+        self.aiSearchDone.connect(self._on_ai_search_done)
 
         self.ui_safe(self._update_directory)
 
@@ -375,6 +404,9 @@ class OrbitOS(QWidget):
         if reply:
             self.add_assistant_message(reply)
 
+    def _on_voice_partial(self, text: str):
+        self.status.setText(f"Hearing: {text}…")
+
     def _pulse_visualizer(self, duration_ms: int = 1800):
         self.visualizer.start()
         QTimer.singleShot(duration_ms, self.visualizer.stop)
@@ -572,6 +604,16 @@ class OrbitOS(QWidget):
             self._on_ai_sidebar_context_menu
         )
 
+        self.ai_search = QLineEdit()
+        self.ai_search.setPlaceholderText("🔍 Search chats")
+        self.ai_search.setFixedWidth(220)
+        # search once typing pauses
+        self._ai_search_timer = QTimer(self)
+        self._ai_search_timer.setSingleShot(True)
+        self._ai_search_timer.setInterval(150)
+        self._ai_search_timer.timeout.connect(self._load_ai_sidebar)
+        self.ai_search.textChanged.connect(lambda _: self._ai_search_timer.start())
+
         self.ai_new_chat_btn = QPushButton("➕ New Chat")
 
         self.ai_new_chat_btn.clicked.connect(self._create_new_ai_chat)
@@ -584,6 +626,7 @@ class OrbitOS(QWidget):
         ai_chats_label.setStyleSheet("font-size: 11px; color: #888;")
 
         ai_left_layout.addWidget(ai_chats_label)
+        ai_left_layout.addWidget(self.ai_search)
         ai_left_layout.addWidget(self.ai_new_chat_btn)
         ai_left_layout.addWidget(self.ai_sidebar)
 
@@ -601,6 +644,7 @@ class OrbitOS(QWidget):
         self.ai_chat_layout.addStretch()
 
         self.ai_scroll.setWidget(self.ai_chat_host)
+        self.ai_scroll.verticalScrollBar().valueChanged.connect(self._on_ai_scrolled)
 
         ai_root.addWidget(ai_left_widget)
         ai_root.addWidget(self.ai_scroll, 1)
@@ -667,32 +711,91 @@ class OrbitOS(QWidget):
         self.add_user_message(f"[Text] {text}")
         self.assistant_input.clear()
         self._pulse_visualizer()
-        result = self.controller.handle_text_command(text)
+        future = self.controller.submit_text_command(text)
+        future.add_done_callback(self._on_text_done)
+
+    def _on_text_done(self, future):
+        # runs on the controller's loop thread
+        if future.cancelled():
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            print("Text command error:", repr(e))
+            return
         if result:
-            self.add_assistant_message(result)
+            self.textReply.emit(result)
 
-    def send_ai_message(self):
+    def send_ai_message(self, speak_reply: bool = False):
         text = self.ai_input.text().strip()
         if not text:
             return
-        self.ai_input.clear()
-        self.run_ai_text_with_text(text)
+        if self.run_ai_text_with_text(text, speak_reply):
+            self.ai_input.clear()
 
-    def run_ai_text_with_text(self, text: str):
+    def run_ai_text_with_text(self, text: str, speak_reply: bool = False) -> bool:
+        """Send `text` to the current chat; False while it is still answering."""
         if not self.current_ai_chat_id:
             self._create_new_ai_chat()
         assert self.current_ai_chat_id is not None
         chat_id = self.current_ai_chat_id
+        if chat_id in self._ai_inflight:
+            # keep the text for later
+            return False
+        if self._ai_loaded_to is not None:
+            # looking at a search hit: the new message goes below the newest
+            self._load_ai_chat(chat_id)
         self._add_ai_message(text, is_user=True)
-        reply = self.controller.run_ai_chat(chat_id, text, model=None)
-        self._add_ai_message(reply, is_user=False)
+
+        bubble = ChatBubble("…", is_user=False)
+        self.ai_chat_layout.insertWidget(self.ai_chat_layout.count() - 1, bubble)
+        self._ai_stream = (chat_id, bubble)
+
+        # the reply streams in on the controller's loop; signals bring it here
+        future = self.controller.submit_ai_chat(
+            chat_id,
+            text,
+            lambda delta: self.aiDelta.emit(chat_id, delta),
+            speak_reply=speak_reply,
+        )
+        self._ai_inflight[chat_id] = future
+        future.add_done_callback(lambda f: self.aiDone.emit(chat_id, self._ai_error(f)))
+        return True
+
+    @staticmethod
+    def _ai_error(future) -> str:
+        if future.cancelled():
+            return "Cancelled."
+        error = future.exception()
+        if error is None:
+            return ""
+        print("AI chat error:", repr(error))
+        return "Sorry, I could not reach the AI service."
+
+    def _on_ai_delta(self, chat_id: str, delta: str):
+        if self._ai_stream is None or self._ai_stream[0] != chat_id:
+            return
+        bubble = self._ai_stream[1]
+        text = bubble.text()
+        bubble.set_text((text if text != "…" else "") + delta)
+        QTimer.singleShot(0, self._scroll_ai_to_bottom)
+
+    def _on_ai_done(self, chat_id: str, error: str):
+        self._ai_inflight.pop(chat_id, None)
+        if self._ai_stream is None or self._ai_stream[0] != chat_id:
+            return
+        bubble = self._ai_stream[1]
+        self._ai_stream = None
+        if error:
+            text = bubble.text()
+            bubble.set_text(error if text == "…" else f"{text}\n\n({error})")
 
     def run_ai_text(self):
         text = self.ai_input.text().strip()
         if not text:
             return
-        self.ai_input.clear()
-        self.run_ai_text_with_text(text)
+        if self.run_ai_text_with_text(text):
+            self.ai_input.clear()
 
     def run_voice(self):
         if self.current_mode == "ai":
@@ -701,10 +804,8 @@ class OrbitOS(QWidget):
 
             def voice_callback(heard, reply):
                 if heard:
-                    self.set_mode("ai")
-                    self.ai_input.setText(heard)
-                    self.send_ai_message()
-                QTimer.singleShot(0, self.controller.resume_wake_word)
+                    self.aiVoiceHeard.emit(heard)
+                self.controller.resume_wake_word()
 
             self.controller.handle_voice_command_async(voice_callback)
             return
@@ -715,10 +816,16 @@ class OrbitOS(QWidget):
         def voice_callback(heard, reply):
             print("VOICE CALLBACK RAW:", heard, "||", reply)
             self.controller.bridge.voiceResult.emit(heard or "", reply or "")
-            QTimer.singleShot(0, self.controller.resume_wake_word)
+            self.controller.resume_wake_word()
 
         self.controller.handle_voice_command_async(voice_callback)
 
+    def _on_ai_voice_heard(self, heard: str):
+        self.set_mode("ai")
+        self.ai_input.setText(heard)
+        # asked by voice: answer by voice too
+        self.send_ai_message(speak_reply=True)
+
     def on_state_change(self, state: str):
         states = {
             "idle": "Listening for wake word…",
@@ -797,42 +904,132 @@ class OrbitOS(QWidget):
             self.ai_container_widget.show()
             self.visualizer.hide()
             self._load_ai_sidebar()
+            # ready before the first search
+            self.controller.ai_store.warm_search()
 
     def _load_ai_sidebar(self):
         self.ai_sidebar.clear()
-        for chat in self.controller.ai_store.chats:
+        query = self.ai_search.text().strip()
+        if query:
+            self._show_ai_search_results(query)
+            return
+
+        headers = self.controller.ai_store.headers()
+        for chat in headers:
             item = QListWidgetItem(chat.title)
             item.setData(Qt.UserRole, chat.id)
             self.ai_sidebar.addItem(item)
 
-        if self.controller.ai_store.chats and not self.current_ai_chat_id:
-            first = self.controller.ai_store.chats[0]
+        if headers and not self.current_ai_chat_id:
+            first = headers[0]
             self.current_ai_chat_id = first.id
             self._load_ai_chat(first.id)
 
+    def _show_ai_search_results(self, query: str):
+        # the first search builds the index: never on the UI thread
+        item = QListWidgetItem("Searching…")
+        item.setFlags(Qt.NoItemFlags)
+        self.ai_sidebar.addItem(item)
+        loop = self.controller.loop
+        future = loop.submit(loop.run_blocking(self.controller.ai_store.search, query))
+        future.add_done_callback(lambda f: self.aiSearchDone.emit(query, self._search_hits(f)))
+
+    @staticmethod
+    def _search_hits(future) -> list:
+        if future.cancelled():
+            return []
+        error = future.exception()
+        if error is not None:
+            print("Chat search error:", repr(error))
+            return []
+        return future.result()
+
+    def _on_ai_search_done(self, query: str, hits: list):
+        if query != self.ai_search.text().strip():
+            # typing went on; a newer search is coming
+            return
+        self.ai_sidebar.clear()
+        for hit in hits:
+            snippet = " ".join(hit.snippet.split())
+            if len(snippet) > 60:
+                snippet = snippet[:57] + "..."
+            item = QListWidgetItem(f"{hit.title}\n  {snippet}")
+            item.setData(Qt.UserRole, hit.chat_id)
+            item.setData(Qt.UserRole + 1, hit.message_index)
+            self.ai_sidebar.addItem(item)
+        if not self.ai_sidebar.count():
+            item = QListWidgetItem("No matches")
+            item.setFlags(Qt.NoItemFlags)
+            self.ai_sidebar.addItem(item)
+
     def _create_new_ai_chat(self):
         chat = self.controller.ai_store.create_chat("New chat")
         self.current_ai_chat_id = chat.id
         self._load_ai_sidebar()
         self._load_ai_chat(chat.id)
 
-    def _load_ai_chat(self, chat_id: str):
-        chat = self.controller.ai_store.get_chat(chat_id)
-        if not chat:
+    def _load_ai_chat(self, chat_id: str, show_index: int | None = None):
+        store = self.controller.ai_store
+        header = store.get_header(chat_id)
+        if not header:
             return
 
-        while self.ai_chat_layout.count() > 1:
-            item = self.ai_chat_layout.takeAt(0)
-            w = item.widget()
-            if w is not None:
-                w.deleteLater()
+        self._clear_ai_messages()
+
+        # newest page, or a page around a search hit
+        start = max(header.count - PAGE_SIZE, 0)
+        self._ai_loaded_to = None
+        if show_index is not None and 0 <= show_index < start:
+            start = max(show_index - PAGE_SIZE // 2, 0)
+            self._ai_loaded_to = start + PAGE_SIZE
+        self._ai_loaded_from = start
+        target = None
+        for i, msg in enumerate(store.get_messages(chat_id, start, PAGE_SIZE)):
+            bubble = ChatBubble(msg.content, is_user=(msg.role == "user"))
+            self.ai_chat_layout.insertWidget(self.ai_chat_layout.count() - 1, bubble)
+            if start + i == show_index:
+                target = bubble
+
+        if target is None:
+            QTimer.singleShot(0, self._scroll_ai_to_bottom)
+        else:
+            QTimer.singleShot(0, lambda: self.ai_scroll.ensureWidgetVisible(target))
 
-        for msg in chat.messages:
+    def _on_ai_scrolled(self, value: int):
+        if value == self.ai_scroll.verticalScrollBar().maximum() and self._ai_loaded_to is not None:
+            self._load_newer_ai_page()
+            return
+        if value != 0 or self._ai_loaded_from == 0 or not self.current_ai_chat_id:
+            return
+        start = max(self._ai_loaded_from - PAGE_SIZE, 0)
+        messages = self.controller.ai_store.get_messages(
+            self.current_ai_chat_id, start, self._ai_loaded_from - start
+        )
+        self._ai_loaded_from = start
+
+        bar = self.ai_scroll.verticalScrollBar()
+        before = bar.maximum()
+        for i, msg in enumerate(messages):
+            self.ai_chat_layout.insertWidget(i, ChatBubble(msg.content, is_user=(msg.role == "user")))
+        self.ai_chat_host.adjustSize()
+        # keep the message that was at the top in place
+        QTimer.singleShot(0, lambda: bar.setValue(bar.maximum() - before))
+
+    def _load_newer_ai_page(self):
+        chat_id = self.current_ai_chat_id
+        header = self.controller.ai_store.get_header(chat_id) if chat_id else None
+        if header is None or self._ai_loaded_to is None:
+            return
+        start = self._ai_loaded_to
+        messages = self.controller.ai_store.get_messages(header.id, start, PAGE_SIZE)
+        self._ai_loaded_to = start + len(messages)
+        if self._ai_loaded_to >= header.count:
+            self._ai_loaded_to = None
+        for msg in messages:
             self.ai_chat_layout.insertWidget(
-                self.ai_chat_layout.count() - 1,
-                ChatBubble(msg.content, is_user=(msg.role == "user")),
+                self.ai_chat_layout.count() - 1, ChatBubble(msg.content, is_user=(msg.role == "user"))
             )
-        QTimer.singleShot(0, self._scroll_ai_to_bottom)
+        self.ai_chat_host.adjustSize()
 
     def _add_ai_message(self, text: str, is_user: bool):
         self.ai_chat_layout.insertWidget(
@@ -848,17 +1045,23 @@ class OrbitOS(QWidget):
 
     def _on_ai_chat_selected(self, item: QListWidgetItem):
         chat_id = item.data(Qt.UserRole)
+        if not chat_id:
+            return
         self.current_ai_chat_id = chat_id
-        self._load_ai_chat(chat_id)
+        self._load_ai_chat(chat_id, item.data(Qt.UserRole + 1))
 
     def _on_ai_sidebar_context_menu(self, pos):
         item = self.ai_sidebar.itemAt(pos)
-        if not item:
+        if not item or not item.data(Qt.UserRole):
             return
         chat_id = item.data(Qt.UserRole)
 
         menu = QMenu(self)
         rename_action = menu.addAction("✏️ Rename")
+        cache_action = menu.addAction("⚡ Reuse cached answers")
+        cache_action.setCheckable(True)
+        header = self.controller.ai_store.get_header(chat_id)
+        cache_action.setChecked(bool(header and header.cache))
         delete_action = menu.addAction("🗑️ Delete")
         action = menu.exec_(self.ai_sidebar.mapToGlobal(pos))
 
@@ -869,14 +1072,23 @@ class OrbitOS(QWidget):
             if ok and new_title.strip():
                 self.controller.ai_store.rename_chat(chat_id, new_title.strip())
                 self._load_ai_sidebar()
+        elif action == cache_action:
+            self.controller.ai_store.set_cache(chat_id, cache_action.isChecked())
         elif action == delete_action:
-            self.controller.ai_store.delete_chat(chat_id)
+            future = self._ai_inflight.pop(chat_id, None)
+            if future is not None:
+                future.cancel()
+            self.controller.delete_ai_chat(chat_id)
             if self.current_ai_chat_id == chat_id:
                 self.current_ai_chat_id = None
             self._load_ai_sidebar()
             self._clear_ai_messages()
 
     def _clear_ai_messages(self):
+        self._ai_loaded_from = 0
+        self._ai_loaded_to = None
+        # a reply still streaming keeps going into the store, not the view
+        self._ai_stream = None
         while self.ai_chat_layout.count() > 1:
             item = self.ai_chat_layout.takeAt(0)
             w = item.widget()